@@ -0,0 +1,136 @@
+import bisect
+import heapq
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from api.catalog import TrackCatalog
+
+TOP_TRACKS = 500  # Ranked entries kept materialized; get_top_tracks never asks for more
+
+def _rank_key(track: Dict) -> Tuple[float, str]:
+    return (-(track.get('popularity') or 0), track['id'])
+
+class BrowseViews:
+    # Browse lists kept in step with the catalog as tracks come and go, so a page costs
+    # O(page size) to serve instead of a pass over the whole catalog
+    def __init__(self, catalog: TrackCatalog, top_size: int = TOP_TRACKS):
+        self.catalog = catalog
+        self.top_size = top_size
+        self.genres: List[str] = []
+        self.genre_ids: Dict[Optional[str], List[str]] = {}
+        self.top: List[Tuple[float, str]] = []  # Sorted rank keys of the best `top_size` tracks
+        self.playlists: Dict[str, Dict] = {}
+        self.playlist_membership: Dict[str, Set[str]] = {}  # Track id -> playlists holding it
+        for track in catalog.tracks:
+            self._add_to_genre(track)
+        self._rank_all()
+        catalog.listeners.append(self.on_catalog_change)
+
+    def on_catalog_change(self, event: str, track: Dict, previous: Optional[Dict] = None) -> None:
+        if event == 'add':
+            self.track_added(track)
+        elif event == 'update':
+            self.track_updated(previous, track)
+        else:
+            self.track_removed(track)
+
+    def track_added(self, track: Dict) -> None:
+        self._add_to_genre(track)
+        self._rank(_rank_key(track))
+
+    def track_updated(self, previous: Dict, track: Dict) -> None:
+        # Same id, so playlists need nothing; only the genre lists and the ranking may move
+        if previous.get('genre') != track.get('genre'):
+            self._remove_from_genre(previous)
+            self._add_to_genre(track)
+        old_key, key = _rank_key(previous), _rank_key(track)
+        if key != old_key:
+            self._unrank(old_key)
+            self._rank(key)
+            self._refill()
+
+    def _rank(self, key: Tuple[float, str]) -> None:
+        # The ranking always holds the best len(top) tracks, so a key past its end may only be
+        # appended when no other track sits outside it
+        if (self.top and key < self.top[-1]) or len(self.top) == len(self.catalog) - 1:
+            bisect.insort(self.top, key)
+            if len(self.top) > self.top_size:
+                self.top.pop()
+
+    def _unrank(self, key: Tuple[float, str]) -> None:
+        position = bisect.bisect_left(self.top, key)
+        if position < len(self.top) and self.top[position] == key:
+            del self.top[position]
+
+    def _refill(self) -> None:
+        # Refill once enough of the ranking is gone that the next few pages would come up short
+        if len(self.top) < self.top_size // 2 and len(self.top) < len(self.catalog):
+            self._rank_all()
+
+    def _add_to_genre(self, track: Dict) -> None:
+        genre = track.get('genre')
+        ids = self.genre_ids.get(genre)
+        if ids is None:
+            ids = self.genre_ids[genre] = []
+            if genre is not None:
+                self.genres.append(genre)
+        ids.append(track['id'])
+
+    def _remove_from_genre(self, track: Dict) -> None:
+        # Removal is rare compared to browsing, so the linear list updates are acceptable here
+        genre = track.get('genre')
+        ids = self.genre_ids.get(genre)
+        if ids is not None:
+            ids.remove(track['id'])
+            if not ids:
+                del self.genre_ids[genre]
+                if genre is not None:
+                    self.genres.remove(genre)
+
+    def _rank_all(self) -> None:
+        self.top = heapq.nsmallest(self.top_size, map(_rank_key, self.catalog.tracks))
+
+    def track_removed(self, track: Dict) -> None:
+        self._remove_from_genre(track)
+        self._unrank(_rank_key(track))
+        self._refill()
+        for playlist_id in self.playlist_membership.pop(track['id'], ()):
+            track_ids = self.playlists[playlist_id]['track_ids']
+            track_ids[:] = [track_id for track_id in track_ids if track_id != track['id']]
+
+    def add_playlist(self, playlist_id: str, name: str, track_ids: Iterable[str]) -> Dict:
+        if playlist_id in self.playlists:
+            self.remove_playlist(playlist_id)
+        playlist = {'id': playlist_id, 'name': name, 'track_ids': [track_id for track_id in track_ids if track_id in self.catalog]}
+        self.playlists[playlist_id] = playlist
+        for track_id in playlist['track_ids']:
+            self.playlist_membership.setdefault(track_id, set()).add(playlist_id)
+        return playlist
+
+    def remove_playlist(self, playlist_id: str) -> Optional[Dict]:
+        playlist = self.playlists.pop(playlist_id, None)
+        if playlist is None:
+            return None
+        for track_id in playlist['track_ids']:
+            members = self.playlist_membership.get(track_id)
+            if members is not None:
+                members.discard(playlist_id)
+                if not members:
+                    del self.playlist_membership[track_id]
+        return playlist
+
+    def resolve(self, track_ids: List[str]) -> List[Dict]:
+        return [self.catalog.by_id[track_id] for track_id in track_ids]
+
+    def top_tracks(self, limit: int) -> List[Dict]:
+        # Removals only refill below half the ranking; a page reaching past what is left re-ranks
+        if min(limit, self.top_size) > len(self.top) and len(self.top) < len(self.catalog):
+            self._rank_all()
+        return self.resolve([track_id for _, track_id in self.top[:limit]])
+
+    def genre_page(self, genre: str, offset: int, limit: int) -> List[Dict]:
+        return self.resolve(self.genre_ids.get(genre, [])[offset:offset + limit])
+
+    def playlist_page(self, playlist_id: str, offset: int, limit: int) -> List[Dict]:
+        playlist = self.playlists.get(playlist_id)
+        if playlist is None:
+            return []
+        return self.resolve(playlist['track_ids'][offset:offset + limit])
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from typing import Any, Dict, Hashable, List, Optional
+from api.sample_api import sample_api, SampleAPI
+from utils.cache import TTLCache, MISSING
+from utils.metrics import metrics
+
+# Seconds each endpoint result stays fresh; endpoints not listed are passed through uncached
+DEFAULT_TTLS: Dict[str, float] = {
+    'get_track_details': 3600.0,
+    'get_top_tracks': 300.0,
+    'get_genres': 3600.0,
+    'get_genre_tracks': 300.0,
+    'get_radio_stations': 3600.0,
+    'get_user_playlists': 120.0,
+    'get_playlist_tracks': 120.0,
+}
+
+def _retrieve(future: asyncio.Future) -> None:
+    # Callers may all have been cancelled; mark the error seen so asyncio doesn't log it as lost
+    if not future.cancelled():
+        future.exception()
+
+class EndpointStats:
+    __slots__ = ('hits', 'misses', 'coalesced', 'errors', 'total_latency', 'max_latency')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record_latency(self, seconds: float) -> None:
+        self.total_latency += seconds
+        if seconds > self.max_latency:
+            self.max_latency = seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            'avg_latency': self.total_latency / self.misses if self.misses else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+class CachedAPI:
+    def __init__(self, api: SampleAPI, ttls: Optional[Dict[str, float]] = None, maxsize: int = 1024):
+        self.api = api
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.caches: Dict[str, TTLCache] = {name: TTLCache(maxsize=maxsize, ttl=ttl) for name, ttl in self.ttls.items()}
+        self.stats: Dict[str, EndpointStats] = {name: EndpointStats() for name in self.ttls}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.api, name)
+        if name not in self.ttls:
+            if not asyncio.iscoroutinefunction(attr):
+                return attr
+            histogram = metrics.histogram(f'api.{name}')
+
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await attr(*args, **kwargs)
+                finally:
+                    histogram.record(time.perf_counter() - start)
+            timed.__name__ = name
+            return timed
+
+        async def cached(*args, **kwargs):
+            return await self._call(name, args, kwargs)
+        cached.__name__ = name
+        return cached
+
+    async def _call(self, name: str, args: tuple, kwargs: dict) -> Any:
+        key = (name, args, tuple(sorted(kwargs.items())))
+        stats = self.stats[name]
+        value = self.caches[name].get(key, MISSING)
+        if value is not MISSING:
+            stats.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            stats.coalesced += 1
+            # Shield so one cancelled caller doesn't cancel the fetch for everyone else
+            return await asyncio.shield(inflight)
+
+        stats.misses += 1
+        future = asyncio.ensure_future(self._fetch(name, key, args, kwargs))
+        future.add_done_callback(_retrieve)
+        self._inflight[key] = future
+        return await asyncio.shield(future)
+
+    async def _fetch(self, name: str, key: Hashable, args: tuple, kwargs: dict) -> Any:
+        stats = self.stats[name]
+        start = time.perf_counter()
+        try:
+            value = await getattr(self.api, name)(*args, **kwargs)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.record_latency(elapsed)
+            metrics.observe(f'api.{name}', elapsed)
+            self._inflight.pop(key, None)
+        if value is not None:
+            self.caches[name].set(key, value)
+        return value
+
+    async def get_tracks_details(self, track_ids: List[str]) -> List[Optional[Dict]]:
+        # Serve what the per-track cache already has and batch-fetch only the rest
+        cache = self.caches.get('get_track_details')
+        if cache is None:
+            return await self.api.get_tracks_details(track_ids)
+        stats = self.stats['get_track_details']
+        results: List[Optional[Dict]] = []
+        missing: Dict[str, List[int]] = {}
+        for position, track_id in enumerate(track_ids):
+            value = cache.get(('get_track_details', (track_id,), ()), MISSING)
+            if value is MISSING:
+                missing.setdefault(track_id, []).append(position)
+                value = None
+            else:
+                stats.hits += 1
+            results.append(value)
+        if missing:
+            stats.misses += len(missing)
+            start = time.perf_counter()
+            try:
+                fetched = await self.api.get_tracks_details(list(missing))
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                stats.record_latency(elapsed)
+                metrics.observe('api.get_tracks_details', elapsed)
+            for (track_id, positions), value in zip(missing.items(), fetched):
+                if value is not None:
+                    cache.set(('get_track_details', (track_id,), ()), value)
+                for position in positions:
+                    results[position] = value
+        return results
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        for endpoint, cache in self.caches.items():
+            if name is None or endpoint == name:
+                cache.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+cached_api = CachedAPI(sample_api)
+metrics.add_source('cache', cached_api.get_stats)
+__all__ = ['cached_api', 'CachedAPI']
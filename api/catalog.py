@@ -0,0 +1,84 @@
+from typing import Callable, Dict, Iterable, List, Optional
+
+class TrackCatalog:
+    def __init__(self, tracks: Optional[Iterable[Dict]] = None):
+        self.tracks: List[Dict] = []
+        self.by_id: Dict[str, Dict] = {}
+        self.by_genre: Dict[str, List[Dict]] = {}
+        self.by_artist: Dict[str, List[Dict]] = {}
+        # Called with ('add' | 'remove', track, None) or ('update', track, previous) so derived views
+        # can follow changes incrementally
+        self.listeners: List[Callable[[str, Dict, Optional[Dict]], None]] = []
+        if tracks:
+            self.add_tracks(tracks)
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def __contains__(self, track_id: str) -> bool:
+        return track_id in self.by_id
+
+    def add_track(self, track: Dict) -> None:
+        existing = self.by_id.get(track['id'])
+        if existing is not None:
+            self._replace(existing, track)
+            return
+        self.tracks.append(track)
+        self.by_id[track['id']] = track
+        self.by_genre.setdefault(track.get('genre'), []).append(track)
+        self.by_artist.setdefault(track.get('artist'), []).append(track)
+        for listener in self.listeners:
+            listener('add', track, None)
+
+    def _replace(self, previous: Dict, track: Dict) -> None:
+        # A new version of a known id is swapped in where the old one was, and reported as a single
+        # update so views keyed by id (playlists) keep it
+        self.tracks[self.tracks.index(previous)] = track
+        self.by_id[track['id']] = track
+        for index, field in ((self.by_genre, 'genre'), (self.by_artist, 'artist')):
+            key = previous.get(field)
+            bucket = index[key]
+            if track.get(field) == key:
+                bucket[bucket.index(previous)] = track
+            else:
+                bucket.remove(previous)
+                if not bucket:
+                    del index[key]
+                index.setdefault(track.get(field), []).append(track)
+        for listener in self.listeners:
+            listener('update', track, previous)
+
+    def add_tracks(self, tracks: Iterable[Dict]) -> None:
+        for track in tracks:
+            self.add_track(track)
+
+    def remove_track(self, track_id: str) -> Optional[Dict]:
+        track = self.by_id.pop(track_id, None)
+        if track is None:
+            return None
+        # Removal is rare compared to lookups, so the linear list updates are acceptable here
+        self.tracks.remove(track)
+        for index, key in ((self.by_genre, track.get('genre')), (self.by_artist, track.get('artist'))):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.remove(track)
+                if not bucket:
+                    del index[key]
+        for listener in self.listeners:
+            listener('remove', track, None)
+        return track
+
+    def get(self, track_id: str) -> Optional[Dict]:
+        return self.by_id.get(track_id)
+
+    def by_genre_name(self, genre: str) -> List[Dict]:
+        return self.by_genre.get(genre, [])
+
+    def by_artist_name(self, artist: str) -> List[Dict]:
+        return self.by_artist.get(artist, [])
+
+    def genres(self) -> List[str]:
+        return list(self.by_genre)
+
+    def artists(self) -> List[str]:
+        return list(self.by_artist)
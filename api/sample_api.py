@@ -1,54 +1,128 @@
 import random
 import asyncio
-from typing import List, Dict
+import threading
+from typing import List, Dict, Iterable, Optional
+from api.browse_views import BrowseViews
+from api.catalog import TrackCatalog
+from utils.search_index import SearchIndex
+
+GENRES = ["pop", "rock", "hip-hop", "electronic", "classical"]
 
 class SampleAPI:
-    def __init__(self):
-        self.tracks = [
-            {"id": f"track_{i}", "title": f"Sample Track {i}", "artist": f"Artist {i}", 
-             "genre": random.choice(["pop", "rock", "hip-hop", "electronic", "classical"])} 
-            for i in range(1, 101)
-        ]
-        self.playlists = [
-            {"id": f"playlist_{i}", "name": f"Playlist {i}", 
-             "tracks": random.sample(self.tracks, random.randint(5, 20))}
-            for i in range(1, 11)
-        ]
+    def __init__(self, simulate_latency: bool = True):
+        self.simulate_latency = simulate_latency
+        # The catalog is built on first use (or by load() from an executor) so importing is cheap
+        self._catalog: Optional[TrackCatalog] = None
+        self._search_index: Optional[SearchIndex] = None
+        self._views: Optional[BrowseViews] = None
+        self._load_lock = threading.Lock()
         self.radio_stations = [
             {"id": f"station_{i}", "name": f"Station {i}", "genre": genre}
-            for i, genre in enumerate(["pop", "rock", "hip-hop", "electronic", "classical"], 1)
+            for i, genre in enumerate(GENRES, 1)
         ]
 
+    def load(self) -> None:
+        with self._load_lock:
+            if self._catalog is not None:
+                return
+            catalog = TrackCatalog(
+                {"id": f"track_{i}", "title": f"Sample Track {i}", "artist": f"Artist {i}",
+                 "genre": random.choice(GENRES), "popularity": random.randint(0, 100)}
+                for i in range(1, 101)
+            )
+            search_index = SearchIndex()
+            search_index.add_many((track['id'], track) for track in catalog.tracks)
+            views = BrowseViews(catalog)
+            for i in range(1, 11):
+                # Playlists hold track ids; the tracks are resolved a page at a time when one is opened
+                views.add_playlist(f"playlist_{i}", f"Playlist {i}",
+                                   [track['id'] for track in random.sample(catalog.tracks, random.randint(5, 20))])
+            self._views = views
+            self._search_index = search_index
+            self._catalog = catalog
+
+    @property
+    def catalog(self) -> TrackCatalog:
+        if self._catalog is None:
+            self.load()
+        return self._catalog
+
+    @property
+    def search_index(self) -> SearchIndex:
+        if self._catalog is None:
+            self.load()
+        return self._search_index
+
+    @property
+    def views(self) -> BrowseViews:
+        if self._catalog is None:
+            self.load()
+        return self._views
+
+    @property
+    def playlists(self) -> List[Dict]:
+        return list(self.views.playlists.values())
+
+    @property
+    def tracks(self) -> List[Dict]:
+        return self.catalog.tracks
+
+    def add_tracks(self, tracks: Iterable[Dict]) -> None:
+        for track in tracks:
+            self.catalog.add_track(track)
+            self.search_index.add(track['id'], track)
+
+    async def _network_delay(self, seconds: float) -> None:
+        if self.simulate_latency:
+            await asyncio.sleep(seconds)  # Simulate network delay
+
     async def search_tracks(self, query: str, limit: int = 10) -> List[Dict]:
-        await asyncio.sleep(0.1)  # Simulate network delay
-        return random.sample([track for track in self.tracks if query.lower() in track['title'].lower()], min(limit, 10))
+        await self._network_delay(0.1)
+        return [self.catalog.get(track_id) for track_id in self.search_index.search(query, limit)]
 
     async def get_track_details(self, track_id: str) -> Dict:
-        await asyncio.sleep(0.05)  # Simulate network delay
-        track = next((track for track in self.tracks if track['id'] == track_id), None)
+        await self._network_delay(0.05)
+        return self._details(self.catalog.get(track_id))
+
+    async def get_tracks_details(self, track_ids: List[str]) -> List[Optional[Dict]]:
+        await self._network_delay(0.05)  # One round trip for the whole batch
+        return [self._details(self.catalog.get(track_id)) for track_id in track_ids]
+
+    def _details(self, track: Optional[Dict]) -> Optional[Dict]:
         if track:
             return {**track, "duration": random.randint(180, 300), "album": f"Album {random.randint(1, 10)}"}
         return None
 
     async def get_recommendations(self, track_id: str, limit: int = 5) -> List[Dict]:
-        await asyncio.sleep(0.1)  # Simulate network delay
-        return random.sample([track for track in self.tracks if track['id'] != track_id], limit)
+        await self._network_delay(0.1)
+        # Sample one spare track so the seed can be dropped without copying the catalog
+        tracks = self.catalog.tracks
+        sample = random.sample(tracks, min(limit + 1, len(tracks)))
+        return [track for track in sample if track['id'] != track_id][:limit]
 
     async def get_top_tracks(self, limit: int = 20) -> List[Dict]:
-        await asyncio.sleep(0.1)  # Simulate network delay
-        return random.sample(self.tracks, limit)
+        await self._network_delay(0.1)
+        return self.views.top_tracks(limit)
 
     async def get_genres(self) -> List[str]:
-        await asyncio.sleep(0.05)  # Simulate network delay
-        return list(set(track['genre'] for track in self.tracks))
+        await self._network_delay(0.05)
+        return list(self.views.genres)
+
+    async def get_genre_tracks(self, genre: str, offset: int = 0, limit: int = 50) -> List[Dict]:
+        await self._network_delay(0.05)
+        return self.views.genre_page(genre, offset, limit)
 
     async def get_radio_stations(self) -> List[Dict]:
-        await asyncio.sleep(0.05)  # Simulate network delay
+        await self._network_delay(0.05)
         return self.radio_stations
 
     async def get_user_playlists(self) -> List[Dict]:
-        await asyncio.sleep(0.05)  # Simulate network delay
+        await self._network_delay(0.05)
         return self.playlists
 
+    async def get_playlist_tracks(self, playlist_id: str, offset: int = 0, limit: int = 50) -> List[Dict]:
+        await self._network_delay(0.05)
+        return self.views.playlist_page(playlist_id, offset, limit)
+
 sample_api = SampleAPI()
-__all__ = ['sample_api']
\ No newline at end of file
+__all__ = ['sample_api']
@@ -0,0 +1,28 @@
+import asyncio
+import random
+import time
+from bench.synthetic import make_tracks
+from api.sample_api import SampleAPI
+
+SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+LOOKUPS = 10_000
+
+async def time_lookups(api: SampleAPI, size: int) -> float:
+    ids = [f"track_{random.randint(1, size)}" for _ in range(LOOKUPS)]
+    start = time.perf_counter()
+    for track_id in ids:
+        await api.get_track_details(track_id)
+    return (time.perf_counter() - start) / LOOKUPS
+
+async def main() -> None:
+    api = SampleAPI(simulate_latency=False)
+    print(f"{'tracks':>10} {'get_track_details (us)':>24}")
+    for size in SIZES:
+        missing = size - len(api.catalog)
+        if missing > 0:
+            api.add_tracks(make_tracks(len(api.catalog) + 1, missing))
+        per_call = await time_lookups(api, size)
+        print(f"{size:>10} {per_call * 1e6:>24.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from player.library_scanner import LibraryScanner
+from utils.offline_store import OfflineStore
+
+def make_library(root: str, count: int) -> None:
+    # Artist/Album/Track layout; every other file carries an ID3v1 tag
+    for i in range(count):
+        directory = os.path.join(root, f"Artist {i % 500}", f"Album {i % 5000}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"Track {i}.mp3"), 'wb') as f:
+            f.write(b'\0' * 256)
+            if i % 2 == 0:
+                f.write(b'TAG' + f"Title {i}".encode().ljust(30, b'\0') + f"Artist {i % 500}".encode().ljust(30, b'\0')
+                        + f"Album {i % 5000}".encode().ljust(30, b'\0') + b'\0' * 35)
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark library scans")
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        music = os.path.join(path, 'music')
+        start = time.perf_counter()
+        make_library(music, args.files)
+        print(f"generated {args.files} files in {time.perf_counter() - start:.1f}s")
+
+        scanner = LibraryScanner(OfflineStore(os.path.join(path, 'library.db')), workers=args.workers)
+        print(f"full scan ({scanner.workers} workers): {(await scanner.scan([music])).summary()}")
+        print(f"no-change rescan: {(await scanner.scan([music])).summary()}")
+        os.remove(os.path.join(music, "Artist 1", "Album 1", "Track 1.mp3"))
+        with open(os.path.join(music, "Artist 2", "Album 2", "Track 2.mp3"), 'ab') as f:
+            f.write(b'\0')
+        print(f"rescan after 2 changes: {(await scanner.scan([music])).summary()}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+import asyncio
+import random
+import time
+from typing import Dict, List
+from bench.synthetic import make_tracks
+from player.recommendation_engine import RecommendationEngine
+
+SIZES = [10_000, 100_000, 1_000_000]
+HISTORY = 50
+REPEATS = 50
+
+async def time_recommendations(engine: RecommendationEngine, history: List[Dict], repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        await engine.get_recommendations(history)
+    return (time.perf_counter() - start) / repeats
+
+async def main() -> None:
+    remote = RecommendationEngine()
+    local = RecommendationEngine(local=True)
+    print(f"{'tracks':>10} {'build (s)':>10} {'local (ms)':>12} {'remote (ms)':>12}")
+    for size in SIZES:
+        tracks = make_tracks(1, size)
+        history = random.sample(tracks, HISTORY)
+        start = time.perf_counter()
+        local.build_local_model(tracks)
+        build = time.perf_counter() - start
+        local_ms = await time_recommendations(local, history, REPEATS) * 1e3
+        remote_ms = await time_recommendations(remote, history, 5) * 1e3
+        print(f"{size:>10} {build:>10.2f} {local_ms:>12.3f} {remote_ms:>12.3f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
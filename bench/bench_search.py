@@ -0,0 +1,45 @@
+import asyncio
+import random
+import time
+from typing import Dict, List
+from bench.synthetic import make_tracks
+from api.sample_api import SampleAPI
+from utils.search_index import SearchIndex
+
+CACHE_SIZE = 500_000
+QUERIES = ["sample", "s", "track 12345", "artist 42", "12", "sample track 4999", "album 7 track", "zzz"]
+REPEATS = 20
+
+def time_query(search, query: str) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        search(query)
+    return (time.perf_counter() - start) / REPEATS
+
+def linear_search(tracks: List[Dict], query: str) -> List[Dict]:
+    return [track for track in tracks if query.lower() in track['title'].lower()]
+
+async def main() -> None:
+    tracks = make_tracks(1, CACHE_SIZE)
+
+    start = time.perf_counter()
+    index = SearchIndex()
+    index.add_many((track['title'], track) for track in tracks)
+    index.search("warm")  # Sorts the vocabulary once
+    print(f"indexed {CACHE_SIZE} tracks in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':>20} {'index (ms)':>12} {'linear (ms)':>12}")
+    for query in QUERIES:
+        indexed = time_query(lambda q: index.search(q), query)
+        linear = time_query(lambda q: linear_search(tracks, q), query)
+        print(f"{query:>20} {indexed * 1e3:>12.3f} {linear * 1e3:>12.3f}")
+
+    api = SampleAPI(simulate_latency=False)
+    api.add_tracks(make_tracks(101, CACHE_SIZE - 100))
+    start = time.perf_counter()
+    for query in random.choices(QUERIES, k=200):
+        await api.search_tracks(query)
+    print(f"SampleAPI.search_tracks: {(time.perf_counter() - start) / 200 * 1e3:.3f} ms/query")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROFILE_PREFIX = "STARTUP_PROFILE "
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(cwd: str, timeout: float) -> dict:
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py"), "--profile-startup"], cwd=cwd, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    deadline = time.monotonic() + timeout
+    try:
+        for line in process.stdout:
+            if line.startswith(PROFILE_PREFIX):
+                return json.loads(line[len(PROFILE_PREFIX):])
+            if time.monotonic() > deadline:
+                break
+        raise RuntimeError("main.py exited or timed out before reporting its startup profile")
+    finally:
+        process.kill()
+        process.wait()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure PyMusicPlayer time-to-first-paint")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--cwd", default=ROOT, help="Working directory (config, assets and caches) for the player")
+    parser.add_argument("--max-first-paint", type=float, default=None,
+                        help="Fail (exit 1) if the median time to a visible window exceeds this many ms")
+    args = parser.parse_args()
+
+    first_paint = []
+    ready = []
+    for _ in range(args.runs):
+        profile = measure(args.cwd, args.timeout)
+        first_paint.append(profile['marks']['window visible'] * 1e3)
+        ready.append(profile['marks']['player ready'] * 1e3)
+    first_paint.sort()
+    ready.sort()
+    median_paint = first_paint[len(first_paint) // 2]
+    print(f"window visible: median {median_paint:.1f} ms (min {first_paint[0]:.1f}, max {first_paint[-1]:.1f})")
+    print(f"player ready:   median {ready[len(ready) // 2]:.1f} ms")
+    if args.max_first_paint is not None and median_paint > args.max_first_paint:
+        print(f"REGRESSION: first paint {median_paint:.1f} ms > {args.max_first_paint:.1f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import tempfile
+import time
+from utils.config import Config
+from utils.offline_store import OfflineStore
+from bench.synthetic import make_offline_cache, make_offline_entry
+
+LIBRARY_SIZE = 100_000
+SAMPLE_WRITES = 200
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as path:
+        store = OfflineStore(os.path.join(path, 'library.db'))
+        start = time.perf_counter()
+        store.put_tracks(make_offline_entry(i) for i in range(LIBRARY_SIZE))
+        print(f"bulk import of {LIBRARY_SIZE} tracks: {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        for i in range(LIBRARY_SIZE, LIBRARY_SIZE + SAMPLE_WRITES):
+            store.put_track(make_offline_entry(i))
+        print(f"store append per download: {(time.perf_counter() - start) / SAMPLE_WRITES * 1e3:.3f} ms")
+
+        start = time.perf_counter()
+        store.load_tracks()
+        print(f"store full load: {time.perf_counter() - start:.2f}s")
+        store.close()
+
+        config = Config(os.path.join(path, 'config.json'))
+        config.set('offline_cache', make_offline_cache(LIBRARY_SIZE))
+        start = time.perf_counter()
+        for _ in range(5):
+            await config.save()
+            await config.flush()
+        print(f"config.json rewrite holding the same cache: {(time.perf_counter() - start) / 5 * 1e3:.1f} ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
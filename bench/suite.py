@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from api.cached_api import cached_api
+from api.sample_api import sample_api
+from bench.synthetic import make_offline_cache, scale_catalog
+from player.music_player import MusicPlayer
+from player.recommendation_engine import RecommendationEngine
+from utils.config import Config
+from utils.search_index import SearchIndex
+
+QUERIES = ["sample", "s", "track 12345", "artist 42", "12", "sample track 4999", "album 7 track", "zzz"]
+BENCHMARKS = ['catalog', 'track_details', 'search', 'browse', 'recommend', 'train', 'config']
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) * 1e3,
+        'median_ms': ordered[len(ordered) // 2] * 1e3,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e3,
+        'min_ms': ordered[0] * 1e3,
+    }
+
+async def measure(fn: Callable[[int], Awaitable[Any]], runs: int) -> Dict[str, float]:
+    samples = []
+    for run in range(runs):
+        start = time.perf_counter()
+        await fn(run)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+class Suite:
+    def __init__(self, args: argparse.Namespace, workdir: str):
+        self.args = args
+        self.workdir = workdir
+        self.results: List[Dict[str, Any]] = []
+        self.rng = random.Random(args.seed)
+        # With latency on, every API call sleeps like a network round trip; keep those runs short
+        self.calls = 20 if args.latency else 1_000
+
+    def record(self, name: str, size: int, stats: Dict[str, float]) -> None:
+        self.results.append({'name': name, 'size': size, **stats})
+        print(f"{name:<28} {size:>10} {stats['median_ms']:>12.3f} {stats['p95_ms']:>12.3f} {stats['runs']:>6}")
+
+    async def run(self, sizes: List[int], selected: List[str]) -> None:
+        sample_api.simulate_latency = self.args.latency
+        config = Config(os.path.join(self.workdir, 'config.json'))
+        config.set('library_db', os.path.join(self.workdir, 'library.db'))
+        player = MusicPlayer(config)
+        await player.offline_cache_loaded
+
+        print(f"{'benchmark':<28} {'tracks':>10} {'median (ms)':>12} {'p95 (ms)':>12} {'runs':>6}")
+        for size in sorted(sizes):
+            start = time.perf_counter()
+            scale_catalog(sample_api, size)
+            if 'catalog' in selected:
+                self.record('catalog.scale', size, summarize([time.perf_counter() - start]))
+            ids = [f"track_{self.rng.randint(1, size)}" for _ in range(self.calls)]
+            if 'track_details' in selected:
+                await self.bench_track_details(size, ids)
+            if 'search' in selected:
+                await self.bench_search(player, size)
+            if 'browse' in selected:
+                await self.bench_browse(size)
+            if 'recommend' in selected:
+                await self.bench_recommend(size, ids)
+            if 'train' in selected:
+                await self.bench_train(size)
+            if 'config' in selected:
+                await self.bench_config(size)
+
+    async def bench_track_details(self, size: int, ids: List[str]) -> None:
+        self.record('get_track_details', size, await measure(lambda run: sample_api.get_track_details(ids[run]), len(ids)))
+        cached_api.invalidate('get_track_details')
+        for track_id in ids:
+            await cached_api.get_track_details(track_id)
+        self.record('get_track_details.cached', size,
+                    await measure(lambda run: cached_api.get_track_details(ids[run]), len(ids)))
+
+    async def bench_search(self, player: MusicPlayer, size: int) -> None:
+        queries = [QUERIES[run % len(QUERIES)] for run in range(self.calls)]
+        player.offline_mode = False
+        self.record('search.online', size, await measure(lambda run: player.search(queries[run]), len(queries)))
+
+        start = time.perf_counter()
+        player.offline_cache = make_offline_cache(size)
+        player.offline_index = SearchIndex()
+        player.offline_index.add_many(player.offline_cache.items())
+        player.offline_index.search("warm")  # Sorts the vocabulary once
+        self.record('search.offline.index', size, summarize([time.perf_counter() - start]))
+        player.offline_mode = True
+        self.record('search.offline', size, await measure(lambda run: player.search(queries[run]), len(queries)))
+        player.offline_mode = False
+        player.offline_cache = {}
+        player.offline_index = SearchIndex()
+
+    async def bench_browse(self, size: int) -> None:
+        # Uncached endpoints: the materialized views should keep these flat as the catalog grows
+        genres = await sample_api.get_genres()
+        pages = [(genres[run % len(genres)], run * 50 % max(1, size // len(genres))) for run in range(self.calls)]
+        self.record('browse.top_tracks', size, await measure(lambda run: sample_api.get_top_tracks(), self.calls))
+        self.record('browse.genres', size, await measure(lambda run: sample_api.get_genres(), self.calls))
+        self.record('browse.genre_page', size,
+                    await measure(lambda run: sample_api.get_genre_tracks(*pages[run]), len(pages)))
+
+    async def bench_recommend(self, size: int, ids: List[str]) -> None:
+        histories = [[{'id': track_id}] for track_id in ids]
+        remote = RecommendationEngine()
+        self.record('recommend.remote', size,
+                    await measure(lambda run: remote.get_recommendations(histories[run]), len(histories)))
+
+        local = RecommendationEngine(local=True)
+        start = time.perf_counter()
+        local.build_local_model(sample_api.catalog.tracks)
+        self.record('recommend.local.build', size, summarize([time.perf_counter() - start]))
+        self.record('recommend.local', size,
+                    await measure(lambda run: local.get_recommendations(histories[run]), len(histories)))
+
+    async def bench_train(self, size: int) -> None:
+        training = self.rng.sample(sample_api.catalog.tracks, min(size, self.args.train_size))
+
+        async def train(run: int) -> None:
+            # Measure the fetches too, not just cache hits from the previous run
+            cached_api.invalidate('get_track_details')
+            await RecommendationEngine().train_model(training)
+        self.record('train_model', len(training), await measure(train, self.args.repeats))
+
+    async def bench_config(self, size: int) -> None:
+        config = Config(os.path.join(self.workdir, 'bench_config.json'), save_delay=0)
+        config.set('offline_cache', make_offline_cache(size))
+
+        async def save(run: int) -> None:
+            config.set('volume', run)
+            await config.save()
+            await config.flush()
+        self.record('config.save', size, await measure(save, self.args.repeats))
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> List[str]:
+    with open(baseline_path, 'r') as f:
+        baseline = {(entry['name'], entry['size']): entry for entry in json.load(f)['results']}
+    regressions = []
+    for entry in results:
+        previous = baseline.get((entry['name'], entry['size']))
+        if previous and previous['median_ms'] > 0 and entry['median_ms'] > previous['median_ms'] * (1 + threshold):
+            regressions.append(f"{entry['name']} @ {entry['size']}: "
+                               f"{previous['median_ms']:.3f} ms -> {entry['median_ms']:.3f} ms")
+    return regressions
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PyMusicPlayer benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000],
+                        help="Catalog sizes to run at (up to 1000000)")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--latency", action="store_true", help="Keep SampleAPI's simulated network delays")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs for the slower whole-operation benchmarks")
+    parser.add_argument("--train-size", type=int, default=10_000, help="Tracks passed to train_model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative median slowdown counted as a regression")
+    return parser.parse_args()
+
+async def main() -> None:
+    args = parse_arguments()
+    with tempfile.TemporaryDirectory() as workdir:
+        suite = Suite(args, workdir)
+        await suite.run(args.sizes, args.only)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'latency': args.latency,
+            'timestamp': time.time(),
+        },
+        'results': suite.results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(suite.results, args.compare, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
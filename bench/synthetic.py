@@ -0,0 +1,29 @@
+import os
+from typing import Dict, Iterator, List
+from api.sample_api import SampleAPI, GENRES
+
+# Deterministic synthetic catalog: track i always has the same metadata, so runs are comparable
+def make_track(i: int) -> Dict:
+    return {"id": f"track_{i}", "title": f"Sample Track {i}", "artist": f"Artist {i % 5000}",
+            "album": f"Album {i % 300}", "genre": GENRES[i % len(GENRES)], "duration": 180 + i % 120}
+
+def iter_tracks(start: int, count: int) -> Iterator[Dict]:
+    return (make_track(i) for i in range(start, start + count))
+
+def make_tracks(start: int, count: int) -> List[Dict]:
+    return list(iter_tracks(start, count))
+
+def scale_catalog(api: SampleAPI, size: int) -> None:
+    # Grows SampleAPI's 100-track catalog in place; ids continue where the built-in ones stop
+    missing = size - len(api.catalog)
+    if missing > 0:
+        api.add_tracks(iter_tracks(len(api.catalog) + 1, missing))
+
+def make_offline_entry(i: int) -> Dict:
+    track = make_track(i)
+    return {'title': track['title'], 'id': track['id'], 'artist': track['artist'], 'album': track['album'],
+            'file_path': os.path.join("offline_cache", f"{track['id']}.mp3")}
+
+def make_offline_cache(count: int) -> Dict[str, Dict]:
+    entries = (make_offline_entry(i) for i in range(1, count + 1))
+    return {entry['title']: entry for entry in entries}
@@ -0,0 +1,71 @@
+import sys
+import json
+import argparse
+import asyncio
+import contextlib
+from typing import TextIO
+from utils.config import Config
+from player.service import PlayerService
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="PyMusicPlayer headless mode: reads JSON-lines commands, writes one JSON response per line",
+        epilog='Example: {"id": 1, "cmd": "search", "query": "rock", "limit": 5}. '
+               'Commands: search, enqueue, download, recommend, similar, stats, scan, pin, quota.')
+    parser.add_argument("commands", nargs="?", default="-", help="JSON-lines command file (default: stdin)")
+    parser.add_argument("--config", default="config.json", help="Config file to use")
+    parser.add_argument("--offline", action="store_true", help="Search the offline library only")
+    parser.add_argument("--playback", action="store_true", help="Enable libVLC playback and media prefetching")
+    parser.add_argument("--debug", action="store_true", help="Monitor loop lag, sample cProfile and dump metrics to the metrics file")
+    return parser.parse_args()
+
+async def run(args: argparse.Namespace, source: TextIO, out: TextIO) -> int:
+    config = Config(args.config)
+    await config.load()
+    service = PlayerService(config, playback=args.playback)
+    if args.offline:
+        service.music_player.offline_mode = True
+    if args.debug:
+        service.enable_debug()
+    await service.warm_up()
+
+    loop = asyncio.get_running_loop()
+    failures = 0
+    try:
+        while True:
+            line = await loop.run_in_executor(None, source.readline)
+            if not line:
+                break
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                command = json.loads(line)
+                if not isinstance(command, dict):
+                    raise ValueError("a command must be a JSON object")
+            except ValueError as e:
+                response = {'ok': False, 'error': f"Invalid command: {e}"}
+            else:
+                response = await service.handle(command)
+            failures += not response['ok']
+            out.write(json.dumps(response, separators=(',', ':')) + "\n")
+            out.flush()
+    finally:
+        await service.close()
+    return 1 if failures else 0
+
+def main() -> None:
+    args = parse_arguments()
+    out = sys.stdout
+    source = sys.stdin if args.commands == "-" else open(args.commands, 'r')
+    try:
+        # The player reports errors with print(); keep them out of the JSON stream
+        with contextlib.redirect_stdout(sys.stderr):
+            exit_code = asyncio.run(run(args, source, out))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
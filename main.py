@@ -1,13 +1,18 @@
+from utils.startup_profiler import startup_profiler
 import sys
 import argparse
 import logging
 import asyncio
-from PyQt6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
-from PyQt6.QtGui import QIcon
-from PyQt6.QtCore import QTimer
-from ui.main_window import MainWindow
+from typing import TYPE_CHECKING, Optional
+with startup_profiler.phase("import PyQt6/qasync"):
+    from PyQt6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
+    from PyQt6.QtGui import QIcon
+    from PyQt6.QtCore import QTimer
+    from qasync import QEventLoop, asyncSlot, asyncClose
 from utils.config import Config
-from qasync import QEventLoop, asyncSlot, asyncClose
+
+if TYPE_CHECKING:
+    from ui.main_window import MainWindow
 
 def setup_logging(debug_mode: bool) -> None:
     level = logging.DEBUG if debug_mode else logging.INFO
@@ -23,7 +28,7 @@ def setup_logging(debug_mode: bool) -> None:
     console.setFormatter(formatter)
     logging.getLogger('').addHandler(console)
 
-def create_system_tray(app: QApplication, window: MainWindow) -> QSystemTrayIcon:
+def create_system_tray(app: QApplication, window: "MainWindow") -> QSystemTrayIcon:
     tray_icon = QSystemTrayIcon(QIcon("assets/app_icon.png"), app)
     tray_menu = QMenu()
     
@@ -43,48 +48,83 @@ def create_system_tray(app: QApplication, window: MainWindow) -> QSystemTrayIcon
 
 def parse_arguments() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="PyMusicPlayer - A Python-based music player")
-    parser.add_argument("--debug", action="store_true", help="Enable debug mode")
+    parser.add_argument("--debug", action="store_true",
+                        help="Enable debug logging, loop lag monitoring, sampled profiling and periodic metrics dumps")
     parser.add_argument("--offline", action="store_true", help="Start in offline mode")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print an import/initialization timing breakdown once startup finishes")
     return parser.parse_args()
 
 @asyncClose
-async def cleanup(window: MainWindow, config: Config) -> None:
+async def cleanup(window: "MainWindow") -> None:
     logging.info("Shutting down PyMusicPlayer...")
-    await window.music_player.stop()
-    await window.music_player.save_offline_cache()
-    await config.save()
+    await window.service.close()
+
+async def start(app: QApplication, args: argparse.Namespace) -> Optional["MainWindow"]:
+    try:
+        with startup_profiler.phase("config load"):
+            config = Config()
+            await config.load()
+
+        with startup_profiler.phase("import ui.main_window"):
+            from ui.main_window import MainWindow
+        with startup_profiler.phase("MainWindow()"):
+            window = MainWindow(config)
+
+        if args.offline:
+            await window.toggle_offline_mode()
+    except Exception as e:
+        logging.error(f"An error occurred during startup: {str(e)}")
+        app.exit(1)
+        return None
+
+    with startup_profiler.phase("first paint"):
+        window.show()
+        await asyncio.sleep(0)  # Yield so Qt lays out and paints the window
+    startup_profiler.mark("window visible")
+
+    window.tray_icon = create_system_tray(app, window)
+
+    # Graceful shutdown
+    app.aboutToQuit.connect(lambda: cleanup(window))
+
+    # Everything the first frame doesn't need is built after it is on screen
+    asyncio.create_task(finish_startup(window, args))
+    return window
+
+async def finish_startup(window: "MainWindow", args: argparse.Namespace) -> None:
+    try:
+        await window.service.warm_up()
+    except Exception as e:
+        logging.error(f"Deferred startup failed: {str(e)}")
+    startup_profiler.mark("player ready")
+    if window.config.get('library_folders'):
+        asyncio.create_task(window.rescan_library())
+    if args.debug:
+        window.service.enable_debug()
+    if args.profile_startup:
+        print(startup_profiler.report())
+        print(f"STARTUP_PROFILE {startup_profiler.to_json()}", flush=True)
 
-async def main() -> None:
+def main() -> None:
     args = parse_arguments()
     
     setup_logging(args.debug)
     
     try:
-        app = QApplication(sys.argv)
+        with startup_profiler.phase("QApplication"):
+            app = QApplication(sys.argv)
         loop = QEventLoop(app)
         asyncio.set_event_loop(loop)
 
-        config = Config()
-        await config.load()
-        
-        window = MainWindow(config)
-        
-        if args.offline:
-            await window.toggle_offline_mode()
-        
-        window.show()
-        
-        tray_icon = create_system_tray(app, window)
-        
-        # Graceful shutdown
-        app.aboutToQuit.connect(lambda: asyncio.create_task(cleanup(window, config)))
-        
         with loop:
-            loop.run_forever()
+            loop.create_task(start(app, args))
+            exit_code = loop.run_forever()
     
     except Exception as e:
         logging.error(f"An error occurred during startup: {str(e)}")
         sys.exit(1)
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
\ No newline at end of file
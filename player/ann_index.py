@@ -0,0 +1,107 @@
+import json
+import os
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Inverted-file index: vectors are bucketed by their nearest k-means centroid and a
+# query only scans the buckets of its `nprobe` closest centroids
+class IVFIndex:
+    def __init__(self, nprobe: int = 8):
+        self.nprobe = nprobe
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)  # Rows grouped by list
+        self.offsets = np.zeros(1, dtype=np.int64)  # List i spans vectors[offsets[i]:offsets[i + 1]]
+        self.ids = np.zeros(0, dtype=str)
+        self._positions: Optional[Dict[str, int]] = None
+        self.fingerprint: Optional[int] = None  # Of the data it was built from, to spot a stale saved index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, ids: Sequence[str], vectors: np.ndarray, nlist: Optional[int] = None,
+              iterations: int = 10, sample_size: int = 100_000, seed: int = 0) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        nlist = max(1, min(n, nlist or int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+
+        # Centroids are trained on a sample; assigning the full set is one pass afterwards
+        sample = vectors[rng.choice(n, min(n, sample_size), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+            empty = counts == 0
+            # Reseed empty lists from random samples so every centroid stays useful
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        assignment = self._assign(vectors, centroids)
+        order = np.argsort(assignment, kind='stable')
+        self.centroids = centroids
+        self.vectors = vectors[order]
+        self.ids = np.asarray(ids)[order]
+        self.offsets = np.searchsorted(assignment[order], np.arange(nlist + 1)).astype(np.int64)
+        self._positions = None
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65_536) -> np.ndarray:
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            assignment[start:start + chunk_size] = np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+        return assignment
+
+    def query(self, vector: np.ndarray, k: int = 10, nprobe: Optional[int] = None,
+              exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        if nprobe <= 0:
+            return []
+        lists = np.argpartition(self.centroids @ vector, -nprobe)[-nprobe:]
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+        if rows.size == 0:
+            return []
+        scores = np.asarray(self.vectors[rows] @ vector)
+        if exclude is not None:
+            scores[self.ids[rows] == exclude] = -np.inf
+        k = min(k, rows.size)
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(-scores[top])]
+        return [(str(self.ids[rows[i]]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def position(self, track_id: str) -> Optional[int]:
+        if self._positions is None:
+            self._positions = {str(track_id): row for row, track_id in enumerate(self.ids)}
+        return self._positions.get(track_id)
+
+    def query_by_id(self, track_id: str, k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        row = self.position(track_id)
+        if row is None:
+            return []
+        return self.query(np.asarray(self.vectors[row]), k, nprobe, exclude=track_id)
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'centroids.npy'), self.centroids)
+        np.save(os.path.join(path, 'vectors.npy'), self.vectors)
+        np.save(os.path.join(path, 'offsets.npy'), self.offsets)
+        np.save(os.path.join(path, 'ids.npy'), self.ids)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'nprobe': self.nprobe, 'size': len(self.ids), 'fingerprint': self.fingerprint}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'IVFIndex':
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        index = cls(nprobe=meta['nprobe'])
+        index.fingerprint = meta.get('fingerprint')
+        index.centroids = np.load(os.path.join(path, 'centroids.npy'))
+        index.offsets = np.load(os.path.join(path, 'offsets.npy'))
+        # The bulk arrays stay on disk and are paged in only for the lists a query touches
+        index.vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode=mode)
+        index.ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode=mode)
+        return index
@@ -0,0 +1,139 @@
+import json
+import os
+import zlib
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+ARTIST_DIMS = 16
+ALBUM_DIMS = 8
+
+# Relative importance of each feature block in the similarity score
+GENRE_WEIGHT = 1.0
+ARTIST_WEIGHT = 0.8
+ALBUM_WEIGHT = 0.5
+DURATION_WEIGHT = 0.3
+
+# Score added to the strongest externally boosted track (e.g. co-occurrence neighbours)
+BOOST_WEIGHT = 0.5
+
+def _bucket(value: Optional[str], dims: int) -> int:
+    return zlib.crc32(str(value).encode('utf-8')) % dims
+
+def encode_tracks(tracks: List[Dict], genres: Dict[str, int]) -> np.ndarray:
+    # genres is filled in place with any genre not seen before
+    for track in tracks:
+        genres.setdefault(track.get('genre'), len(genres))
+
+    n = len(tracks)
+    artist_offset = len(genres)
+    album_offset = artist_offset + ARTIST_DIMS
+    duration_column = album_offset + ALBUM_DIMS
+
+    genre_codes = np.fromiter((genres[track.get('genre')] for track in tracks), dtype=np.int32, count=n)
+    artist_codes = np.fromiter((_bucket(track.get('artist'), ARTIST_DIMS) for track in tracks), dtype=np.int32, count=n)
+    album_codes = np.fromiter((_bucket(track.get('album'), ALBUM_DIMS) for track in tracks), dtype=np.int32, count=n)
+    durations = np.fromiter((track.get('duration') or 240 for track in tracks), dtype=np.float32, count=n)
+
+    matrix = np.zeros((n, duration_column + 1), dtype=np.float32)
+    rows = np.arange(n)
+    matrix[rows, genre_codes] = GENRE_WEIGHT
+    matrix[rows, artist_offset + artist_codes] = ARTIST_WEIGHT
+    matrix[rows, album_offset + album_codes] = ALBUM_WEIGHT
+    matrix[:, duration_column] = np.clip((durations - 180.0) / 120.0, 0.0, 1.0) * DURATION_WEIGHT
+
+    # Unit rows turn the dot product against a unit profile into cosine similarity
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+def fingerprint(tracks: List[Dict]) -> int:
+    # Changes whenever a track or any of its encoded features does, so a saved model can be reused
+    checksum = 0
+    for track in tracks:
+        key = f"{track['id']}\0{track.get('genre')}\0{track.get('artist')}\0{track.get('album')}\0{track.get('duration')}\n"
+        checksum = zlib.crc32(key.encode('utf-8', 'surrogateescape'), checksum)
+    return checksum
+
+class ContentRecommender:
+    def __init__(self, history_decay: float = 0.9, history_window: int = 200):
+        self.history_decay = history_decay
+        self.history_window = history_window
+        self.genres: Dict[str, int] = {}
+        self.track_ids: List[str] = []
+        self.tracks: List[Dict] = []
+        self.rows: Dict[str, int] = {}
+        self.matrix = np.zeros((0, 0), dtype=np.float32)  # dims x tracks
+        self.fingerprint: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.track_ids)
+
+    def build(self, tracks: Iterable[Dict]) -> None:
+        self.tracks = list(tracks)
+        self.track_ids = [track['id'] for track in self.tracks]
+        self.rows = {track_id: row for row, track_id in enumerate(self.track_ids)}
+        self.genres = {}
+        # Stored feature-major (dims x tracks) so scoring streams each feature column contiguously
+        self.matrix = np.ascontiguousarray(encode_tracks(self.tracks, self.genres).T)
+        self.fingerprint = fingerprint(self.tracks)
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        meta = {'fingerprint': self.fingerprint, 'genres': list(self.genres.items()), 'tracks': self.tracks}
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, matrix=self.matrix, meta=np.array(json.dumps(meta, separators=(',', ':'))))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ContentRecommender':
+        model = cls()
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            model.matrix = np.ascontiguousarray(data['matrix'])
+        model.fingerprint = meta['fingerprint']
+        model.genres = {genre: column for genre, column in meta['genres']}
+        model.tracks = meta['tracks']
+        model.track_ids = [track['id'] for track in model.tracks]
+        model.rows = {track_id: row for row, track_id in enumerate(model.track_ids)}
+        return model
+
+    def user_profile(self, play_history: List[Dict]) -> Optional[np.ndarray]:
+        rows = [self.rows[track['id']] for track in play_history[-self.history_window:] if track['id'] in self.rows]
+        if not rows:
+            return None
+        # Most recent play gets weight 1, older plays decay geometrically
+        weights = self.history_decay ** np.arange(len(rows) - 1, -1, -1, dtype=np.float32)
+        profile = self.matrix[:, rows] @ weights
+        return profile if np.linalg.norm(profile) else None
+
+    def vector(self, track_id: str) -> Optional[np.ndarray]:
+        row = self.rows.get(track_id)
+        return None if row is None else self.matrix[:, row].copy()
+
+    def recommend(self, play_history: List[Dict], num_recommendations: int = 5) -> List[Dict]:
+        profile = self.user_profile(play_history)
+        if profile is None:
+            return []
+        return self.rank(profile, [track['id'] for track in play_history], num_recommendations)
+
+    def rank(self, profile: np.ndarray, exclude: List[str], num_recommendations: int = 5,
+             boosts: Optional[Dict[str, float]] = None) -> List[Dict]:
+        norm = np.linalg.norm(profile)
+        if not norm or profile.shape[0] != self.matrix.shape[0]:
+            return []
+        scores = (profile / norm) @ self.matrix
+        if boosts:
+            top_boost = max(boosts.values())
+            for track_id, boost in boosts.items():
+                row = self.rows.get(track_id)
+                if row is not None and top_boost > 0:
+                    scores[row] += BOOST_WEIGHT * boost / top_boost
+        played = [self.rows[track_id] for track_id in exclude if track_id in self.rows]
+        scores[played] = -np.inf
+        k = min(num_recommendations, len(self.track_ids) - len(set(played)))
+        if k <= 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(-scores[top])]
+        return [self.tracks[row] for row in top]
@@ -0,0 +1,291 @@
+import asyncio
+import hashlib
+import os
+import ssl
+import time
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from utils.metrics import metrics, THROUGHPUT_BOUNDS
+
+CHUNK_SIZE = 64 * 1024
+
+class DownloadError(Exception):
+    pass
+
+class TransportResponse:
+    def __init__(self, offset: int, total: Optional[int], chunks: AsyncIterator[bytes],
+                 sha256: Optional[str] = None, close: Optional[Callable[[], None]] = None):
+        self.offset = offset  # Byte position the body starts at; 0 if a resume was refused
+        self.total = total
+        self.chunks = chunks
+        self.sha256 = sha256
+        self._close = close
+
+    def close(self) -> None:
+        if self._close:
+            self._close()
+
+class Transport(ABC):
+    @abstractmethod
+    async def fetch(self, url: str, offset: int = 0) -> TransportResponse:
+        ...
+
+class HTTPTransport(Transport):
+    def __init__(self, chunk_size: int = CHUNK_SIZE, timeout: float = 30.0):
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+    async def fetch(self, url: str, offset: int = 0) -> TransportResponse:
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise DownloadError(f"Unsupported URL scheme: {parts.scheme}")
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        context = ssl.create_default_context() if parts.scheme == 'https' else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=context), self.timeout)
+        path = parts.path or '/'
+        if parts.query:
+            path += f"?{parts.query}"
+        request = f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n"
+        if offset:
+            request += f"Range: bytes={offset}-\r\n"
+        writer.write((request + "\r\n").encode('latin-1'))
+        await writer.drain()
+
+        try:
+            status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+            status = int(status_line.split()[1])
+            headers: Dict[str, str] = {}
+            while True:
+                line = (await asyncio.wait_for(reader.readline(), self.timeout)).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        except Exception:
+            writer.close()
+            raise
+
+        if status == 416:
+            # The partial file already holds every byte the server has
+            writer.close()
+            return TransportResponse(offset, offset, self._empty(), headers.get('x-checksum-sha256'))
+        if status not in (200, 206):
+            writer.close()
+            raise DownloadError(f"HTTP {status} for {url}")
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            writer.close()
+            raise DownloadError("Chunked transfer encoding is not supported")
+
+        start = offset if status == 206 else 0
+        length = headers.get('content-length')
+        total = start + int(length) if length is not None else None
+        return TransportResponse(start, total, self._body(reader), headers.get('x-checksum-sha256'), writer.close)
+
+    async def _body(self, reader: asyncio.StreamReader) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await asyncio.wait_for(reader.read(self.chunk_size), self.timeout)
+            if not chunk:
+                return
+            yield chunk
+
+    async def _empty(self) -> AsyncIterator[bytes]:
+        return
+        yield
+
+class SimulatedTransport(Transport):
+    # Serves deterministic bytes per URL so downloads work against placeholder stream URLs
+    def __init__(self, size: int = 512 * 1024, chunk_size: int = CHUNK_SIZE, bandwidth: Optional[float] = None):
+        self.size = size
+        self.chunk_size = chunk_size
+        self.bandwidth = bandwidth  # Bytes per second, None for unthrottled
+
+    def payload(self, url: str) -> bytes:
+        seed = hashlib.sha256(url.encode('utf-8')).digest()
+        return (seed * (self.size // len(seed) + 1))[:self.size]
+
+    async def fetch(self, url: str, offset: int = 0) -> TransportResponse:
+        payload = self.payload(url)
+        return TransportResponse(offset, len(payload), self._body(payload, offset),
+                                 hashlib.sha256(payload).hexdigest())
+
+    async def _body(self, payload: bytes, offset: int) -> AsyncIterator[bytes]:
+        for start in range(offset, len(payload), self.chunk_size):
+            chunk = payload[start:start + self.chunk_size]
+            if self.bandwidth:
+                await asyncio.sleep(len(chunk) / self.bandwidth)
+            yield chunk
+
+class DownloadJob:
+    __slots__ = ('track_id', 'url', 'file_path', 'sha256', 'future', 'waiters')
+
+    def __init__(self, track_id: str, url: str, file_path: str, sha256: Optional[str],
+                 future: asyncio.Future):
+        self.track_id = track_id
+        self.url = url
+        self.file_path = file_path
+        self.sha256 = sha256
+        self.future = future
+        self.waiters = 1  # Callers sharing this job
+
+class DownloadManager:
+    def __init__(self, directory: str = 'offline_cache', transport: Optional[Transport] = None,
+                 workers: int = 4, queue_size: int = 256, retries: int = 3):
+        self.directory = directory
+        self.transport = transport or HTTPTransport()
+        self.worker_count = workers
+        self.retries = retries
+        self.queue: 'asyncio.Queue[DownloadJob]' = asyncio.Queue(maxsize=queue_size)
+        self.active: Dict[str, DownloadJob] = {}
+        self.progress_listeners: List[Callable[[str, int, Optional[int]], None]] = []
+        self._workers: List[asyncio.Task] = []
+        self._pending_puts: Set[asyncio.Task] = set()
+
+    def add_progress_listener(self, listener: Callable[[str, int, Optional[int]], None]) -> None:
+        self.progress_listeners.append(listener)
+
+    def _report(self, track_id: str, downloaded: int, total: Optional[int]) -> None:
+        for listener in self.progress_listeners:
+            try:
+                listener(track_id, downloaded, total)
+            except Exception as e:
+                print(f"Error in download progress listener: {e}")
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        for task in [*self._workers, *self._pending_puts]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._pending_puts, return_exceptions=True)
+        self._workers = []
+
+    def path_for(self, track_id: str) -> str:
+        return os.path.join(self.directory, f"{track_id}.mp3")
+
+    async def enqueue(self, track_id: str, url: str, sha256: Optional[str] = None) -> asyncio.Future:
+        # Repeated requests for a track already queued share the same future
+        job = self.active.get(track_id)
+        if job is not None:
+            job.waiters += 1
+            return job.future
+        self.start()
+        file_path = self.path_for(track_id)
+        job = DownloadJob(track_id, url, file_path, sha256, asyncio.get_running_loop().create_future())
+        self.active[track_id] = job
+        try:
+            await self.queue.put(job)  # Blocks callers once the queue is full
+        except asyncio.CancelledError:
+            if job.waiters > 1:
+                # Other callers joined while this one waited for room; queue it on their behalf
+                put = asyncio.ensure_future(self._put_later(job))
+                self._pending_puts.add(put)
+                put.add_done_callback(self._pending_puts.discard)
+            else:
+                # Never reached the queue, so no worker would ever finish it
+                if self.active.get(track_id) is job:
+                    del self.active[track_id]
+                job.future.cancel()
+            raise
+        return job.future
+
+    async def _put_later(self, job: DownloadJob) -> None:
+        try:
+            await self.queue.put(job)
+        except asyncio.CancelledError:
+            if self.active.get(job.track_id) is job:
+                del self.active[job.track_id]
+            job.future.cancel()
+            raise
+
+    async def download(self, track_id: str, url: str, sha256: Optional[str] = None) -> str:
+        return await asyncio.shield(await self.enqueue(track_id, url, sha256))
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                if not job.future.done():
+                    job.future.set_result(await self._download(job))
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.active.pop(job.track_id, None)
+                self.queue.task_done()
+
+    async def _download(self, job: DownloadJob) -> str:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: os.makedirs(self.directory, exist_ok=True))
+        part_path = f"{job.file_path}.part"
+        last_error: Optional[Exception] = None
+        for _ in range(self.retries):
+            try:
+                return await self._attempt(job, part_path)
+            except (OSError, asyncio.TimeoutError, DownloadError) as e:
+                metrics.incr('download.retries')
+                last_error = e
+        metrics.incr('download.failed')
+        raise DownloadError(f"Download of {job.track_id} failed: {last_error}")
+
+    async def _attempt(self, job: DownloadJob, part_path: str) -> str:
+        loop = asyncio.get_running_loop()
+        # Resume from whatever an earlier attempt or session left in the .part file
+        offset, digest = await loop.run_in_executor(None, self._hash_partial, part_path)
+        started = time.perf_counter()
+        response = await self.transport.fetch(job.url, offset)
+        if response.total is not None and offset > response.total:
+            # Longer than the whole file, so it can't be a prefix of it; start over from zero
+            response.close()
+            await loop.run_in_executor(None, os.remove, part_path)
+            offset, digest = 0, hashlib.sha256()
+            response = await self.transport.fetch(job.url, 0)
+        try:
+            if response.offset != offset:
+                offset, digest = 0, hashlib.sha256()
+            downloaded = offset
+            with open(part_path, 'r+b' if offset else 'wb') as f:
+                f.seek(offset)
+                f.truncate()
+                async for chunk in response.chunks:
+                    await loop.run_in_executor(None, f.write, chunk)
+                    digest.update(chunk)
+                    downloaded += len(chunk)
+                    self._report(job.track_id, downloaded, response.total)
+                await loop.run_in_executor(None, os.fsync, f.fileno())
+        finally:
+            response.close()
+
+        if response.total is not None and downloaded != response.total:
+            raise DownloadError(f"Expected {response.total} bytes, got {downloaded}")
+        expected = job.sha256 or response.sha256
+        if expected and digest.hexdigest() != expected.lower():
+            # A corrupt partial file can't be resumed, so start over on the next attempt
+            await loop.run_in_executor(None, os.remove, part_path)
+            raise DownloadError(f"Checksum mismatch for {job.track_id}")
+        await loop.run_in_executor(None, os.replace, part_path, job.file_path)
+        elapsed = time.perf_counter() - started
+        metrics.incr('download.completed')
+        metrics.incr('download.bytes', downloaded - offset)
+        metrics.observe('download.time', elapsed)
+        if elapsed > 0:
+            metrics.histogram('download.throughput', THROUGHPUT_BOUNDS).record((downloaded - offset) / elapsed)
+        return job.file_path
+
+    @staticmethod
+    def _hash_partial(part_path: str) -> Tuple[int, Any]:
+        digest = hashlib.sha256()
+        if not os.path.exists(part_path):
+            return 0, digest
+        offset = 0
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                offset += len(chunk)
+        return offset, digest
@@ -0,0 +1,159 @@
+import heapq
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple, Type
+
+class EvictionPolicy(ABC):
+    # Orders cache keys for eviction; sizes and quota bookkeeping live in the cache that owns it
+    @abstractmethod
+    def insert(self, key: Hashable, hits: int = 0) -> None:
+        ...
+
+    @abstractmethod
+    def access(self, key: Hashable) -> None:
+        ...
+
+    @abstractmethod
+    def remove(self, key: Hashable, evicted: bool = False) -> None:
+        ...
+
+    @abstractmethod
+    def candidate(self, exclude: Set[Hashable]) -> Optional[Hashable]:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+class LRUPolicy(EvictionPolicy):
+    def __init__(self):
+        self._order: 'OrderedDict[Hashable, None]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def insert(self, key: Hashable, hits: int = 0) -> None:
+        self._order[key] = None
+        self._order.move_to_end(key)
+
+    def access(self, key: Hashable) -> None:
+        if key in self._order:
+            self._order.move_to_end(key)
+
+    def remove(self, key: Hashable, evicted: bool = False) -> None:
+        self._order.pop(key, None)
+
+    def candidate(self, exclude: Set[Hashable]) -> Optional[Hashable]:
+        return next((key for key in self._order if key not in exclude), None)
+
+class LFUPolicy(EvictionPolicy):
+    # Min-heap of (hits, tick, key) with lazy deletion; ties go to the least recently used
+    def __init__(self):
+        self._hits: Dict[Hashable, Tuple[int, int]] = {}
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._tick = 0
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+    def _push(self, key: Hashable, hits: int) -> None:
+        self._tick += 1
+        self._hits[key] = (hits, self._tick)
+        heapq.heappush(self._heap, (hits, self._tick, key))
+        if len(self._heap) > 4 * len(self._hits) + 64:
+            # Too many stale entries; rebuild from the live ones
+            self._heap = [(hits, tick, key) for key, (hits, tick) in self._hits.items()]
+            heapq.heapify(self._heap)
+
+    def insert(self, key: Hashable, hits: int = 0) -> None:
+        self._push(key, hits)
+
+    def access(self, key: Hashable) -> None:
+        if key in self._hits:
+            self._push(key, self._hits[key][0] + 1)
+
+    def remove(self, key: Hashable, evicted: bool = False) -> None:
+        self._hits.pop(key, None)
+
+    def candidate(self, exclude: Set[Hashable]) -> Optional[Hashable]:
+        skipped = []
+        found = None
+        while self._heap:
+            hits, tick, key = self._heap[0]
+            if self._hits.get(key) != (hits, tick):
+                heapq.heappop(self._heap)  # Stale
+            elif key in exclude:
+                skipped.append(heapq.heappop(self._heap))
+            else:
+                found = key
+                break
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return found
+
+class ARCPolicy(EvictionPolicy):
+    # Adaptive Replacement Cache: T1 holds tracks played once, T2 tracks played again. Ghost lists
+    # B1/B2 remember recent evictions so re-downloading one shifts the balance towards its list
+    def __init__(self):
+        self.t1: 'OrderedDict[Hashable, None]' = OrderedDict()
+        self.t2: 'OrderedDict[Hashable, None]' = OrderedDict()
+        self.b1: 'OrderedDict[Hashable, None]' = OrderedDict()
+        self.b2: 'OrderedDict[Hashable, None]' = OrderedDict()
+        self.p = 0.0  # Target share of entries for T1
+
+    def __len__(self) -> int:
+        return len(self.t1) + len(self.t2)
+
+    def insert(self, key: Hashable, hits: int = 0) -> None:
+        capacity = max(1, len(self) + 1)
+        if key in self.b1:
+            self.p = min(capacity, self.p + max(len(self.b2) / len(self.b1), 1.0))
+            del self.b1[key]
+            self.t2[key] = None
+        elif key in self.b2:
+            self.p = max(0.0, self.p - max(len(self.b1) / len(self.b2), 1.0))
+            del self.b2[key]
+            self.t2[key] = None
+        elif hits > 1:
+            self.t2[key] = None
+        else:
+            self.t1[key] = None
+
+    def access(self, key: Hashable) -> None:
+        if key in self.t1:
+            del self.t1[key]
+            self.t2[key] = None
+        elif key in self.t2:
+            self.t2.move_to_end(key)
+
+    def remove(self, key: Hashable, evicted: bool = False) -> None:
+        if key in self.t1:
+            del self.t1[key]
+            if evicted:
+                self.b1[key] = None
+        elif key in self.t2:
+            del self.t2[key]
+            if evicted:
+                self.b2[key] = None
+        # Ghosts only need to cover about as many entries as the cache holds
+        capacity = max(1, len(self))
+        while len(self.b1) > capacity:
+            self.b1.popitem(last=False)
+        while len(self.b2) > capacity:
+            self.b2.popitem(last=False)
+
+    def candidate(self, exclude: Set[Hashable]) -> Optional[Hashable]:
+        first, second = (self.t1, self.t2) if self.t1 and (len(self.t1) > self.p or not self.t2) else (self.t2, self.t1)
+        for entries in (first, second):
+            key = next((key for key in entries if key not in exclude), None)
+            if key is not None:
+                return key
+        return None
+
+POLICIES: Dict[str, Type[EvictionPolicy]] = {'lru': LRUPolicy, 'lfu': LFUPolicy, 'arc': ARCPolicy}
+
+def make_policy(name: str) -> EvictionPolicy:
+    try:
+        return POLICIES[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown eviction policy: {name}")
@@ -0,0 +1,121 @@
+import json
+import os
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import numpy as np
+from player.content_recommender import ContentRecommender
+
+# Profile weight each event type contributes for the track it concerns
+EVENT_WEIGHTS = {'play': 1.0, 'replay': 1.5, 'skip': -0.5}
+
+class IncrementalModel:
+    def __init__(self, content_model: ContentRecommender, decay: float = 0.9,
+                 cooccurrence_window: int = 5, max_neighbours: int = 100, recent_size: int = 200):
+        self.content_model = content_model
+        self.decay = decay
+        self.cooccurrence_window = cooccurrence_window
+        self.max_neighbours = max_neighbours
+        self.cooccurrence: Dict[str, Dict[str, float]] = {}
+        self.tracks: Dict[str, Dict] = {}
+        self.recent: Deque[Tuple[str, str]] = deque(maxlen=recent_size)
+        self.profile: Optional[np.ndarray] = None
+
+    def record(self, event: str, track: Dict) -> None:
+        weight = EVENT_WEIGHTS[event]
+        track_id = track['id']
+        self.tracks.setdefault(track_id, {'id': track_id, 'title': track.get('title')})
+        self._update_cooccurrence(track_id, weight)
+        self.recent.append((event, track_id))
+        self._update_profile(track_id, weight)
+
+    def _update_cooccurrence(self, track_id: str, weight: float) -> None:
+        seen = set()
+        # Only the last few listened tracks are paired with the new one, so this is O(window)
+        for event, previous in reversed(self.recent):
+            if len(seen) >= self.cooccurrence_window:
+                break
+            if event == 'skip' or previous == track_id or previous in seen:
+                continue
+            seen.add(previous)
+            self._bump(previous, track_id, weight)
+            self._bump(track_id, previous, weight)
+
+    def _bump(self, source: str, target: str, weight: float) -> None:
+        neighbours = self.cooccurrence.setdefault(source, {})
+        count = neighbours.get(target, 0.0) + weight
+        if count <= 0:
+            neighbours.pop(target, None)
+            return
+        neighbours[target] = count
+        if len(neighbours) > self.max_neighbours:
+            del neighbours[min(neighbours, key=neighbours.get)]
+
+    def _update_profile(self, track_id: str, weight: float) -> None:
+        vector = self.content_model.vector(track_id)
+        if vector is None:
+            return
+        if self.profile is None or self.profile.shape != vector.shape:
+            self.rebuild_profile()
+            return
+        self.profile *= self.decay
+        self.profile += weight * vector
+
+    def rebuild_profile(self) -> None:
+        # Needed after the content model is rebuilt with a different feature layout
+        self.profile = None
+        for event, track_id in self.recent:
+            vector = self.content_model.vector(track_id)
+            if vector is None:
+                continue
+            if self.profile is None:
+                self.profile = np.zeros_like(vector)
+            self.profile *= self.decay
+            self.profile += EVENT_WEIGHTS[event] * vector
+
+    def neighbour_scores(self, limit: int = 50) -> Dict[str, float]:
+        scores: Dict[str, float] = {}
+        recent_ids = [track_id for event, track_id in reversed(self.recent) if event != 'skip']
+        for age, track_id in enumerate(recent_ids[:self.cooccurrence_window]):
+            for neighbour, count in self.cooccurrence.get(track_id, {}).items():
+                scores[neighbour] = scores.get(neighbour, 0.0) + count * self.decay ** age
+        if len(scores) > limit:
+            scores = dict(sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit])
+        return scores
+
+    def recommend(self, exclude: List[str], num_recommendations: int = 5) -> List[Dict]:
+        neighbours = self.neighbour_scores()
+        if self.profile is not None and len(self.content_model):
+            return self.content_model.rank(self.profile, exclude, num_recommendations, boosts=neighbours)
+        excluded = set(exclude)
+        ranked = sorted((item for item in neighbours.items() if item[0] not in excluded),
+                        key=lambda item: item[1], reverse=True)
+        return [self.tracks[track_id] for track_id, _ in ranked[:num_recommendations] if track_id in self.tracks]
+
+    def to_dict(self) -> Dict:
+        return {
+            'cooccurrence': self.cooccurrence,
+            'tracks': self.tracks,
+            'recent': list(self.recent),
+            'profile': None if self.profile is None else self.profile.tolist(),
+        }
+
+    def load_dict(self, state: Dict) -> None:
+        self.cooccurrence = state.get('cooccurrence', {})
+        self.tracks = state.get('tracks', {})
+        self.recent.clear()
+        self.recent.extend(tuple(item) for item in state.get('recent', []))
+        profile = state.get('profile')
+        self.profile = None if profile is None else np.asarray(profile, dtype=np.float32)
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        with open(path, 'r') as f:
+            self.load_dict(json.load(f))
+        return True
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from utils.offline_store import OfflineStore
+
+try:
+    import mutagen
+except ImportError:  # Optional: without it only ID3v1 tags and folder names are used
+    mutagen = None
+
+AUDIO_EXTENSIONS = {'.mp3', '.flac', '.ogg', '.oga', '.opus', '.m4a', '.aac', '.wav', '.wma', '.aiff', '.ape'}
+
+# Worker processes only import this module, so keep its imports light and its functions module-level
+def local_track_id(path: str) -> str:
+    return "local_" + hashlib.sha1(path.encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+
+def walk(root: str) -> Iterator[Tuple[str, float, int]]:
+    # Iterative scandir: one syscall per directory, and DirEntry caches the file type
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                            stat = entry.stat()
+                            yield entry.path, stat.st_mtime, stat.st_size
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Error scanning {directory}: {e}")
+
+def _tags_from_id3v1(path: str) -> Dict:
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < 128:
+            return {}
+        f.seek(-128, os.SEEK_END)
+        block = f.read(128)
+    if block[:3] != b'TAG':
+        return {}
+
+    def text(raw: bytes) -> Optional[str]:
+        value = raw.split(b'\0', 1)[0].decode('latin-1').strip()
+        return value or None
+    return {'title': text(block[3:33]), 'artist': text(block[33:63]), 'album': text(block[63:93])}
+
+def read_tags(path: str) -> Dict:
+    tags: Dict = {}
+    try:
+        if mutagen is None:
+            tags = _tags_from_id3v1(path)
+        else:
+            audio = mutagen.File(path, easy=True)
+            if audio is not None:
+                for field in ('title', 'artist', 'album', 'genre'):
+                    values = audio.get(field) if audio.tags is not None else None
+                    if values:
+                        tags[field] = str(values[0])
+                if audio.info is not None:
+                    tags['duration'] = float(audio.info.length)
+    except Exception:
+        pass  # Unreadable tags shouldn't keep the file out of the library
+
+    # Untagged files fall back to the usual Artist/Album/Track.ext layout
+    parent = os.path.dirname(path)
+    tags['title'] = tags.get('title') or os.path.splitext(os.path.basename(path))[0]
+    tags['album'] = tags.get('album') or os.path.basename(parent) or None
+    tags['artist'] = tags.get('artist') or os.path.basename(os.path.dirname(parent)) or None
+    return tags
+
+def read_batch(files: List[Tuple[str, float, int]]) -> List[Dict]:
+    tracks = []
+    for path, mtime, size in files:
+        track = read_tags(path)
+        track.update({'id': local_track_id(path), 'file_path': path, 'mtime': mtime, 'size': size})
+        tracks.append(track)
+    return tracks
+
+class ScanResult:
+    __slots__ = ('tracks', 'removed', 'added', 'updated', 'unchanged', 'seconds')
+
+    def __init__(self):
+        self.tracks: List[Dict] = []  # New or changed tracks, ready to index
+        self.removed: List[str] = []  # Ids of tracks whose files are gone
+        self.added = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.seconds = 0.0
+
+    def summary(self) -> Dict:
+        return {'added': self.added, 'updated': self.updated, 'removed': len(self.removed),
+                'unchanged': self.unchanged, 'seconds': self.seconds}
+
+class LibraryScanner:
+    def __init__(self, store: OfflineStore, workers: Optional[int] = None, batch_size: int = 256):
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+    async def scan(self, folders: Iterable[str],
+                   progress: Optional[Callable[[int, int], None]] = None) -> ScanResult:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        roots = sorted({os.path.abspath(folder) for folder in folders})
+        # Nested folders would otherwise be walked twice
+        roots = [root for i, root in enumerate(roots) if not any(self._under(root, other) for other in roots[:i])]
+        result, changed = await loop.run_in_executor(None, self._diff, roots)
+        if changed:
+            result.tracks = await self._read_tags(changed, progress)
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def _diff(self, roots: List[str]) -> Tuple[ScanResult, List[Tuple[str, float, int]]]:
+        # Only files whose mtime or size moved since the last scan get their tags read again
+        known = self.store.local_file_state()
+        result = ScanResult()
+        changed: List[Tuple[str, float, int]] = []
+        for root in roots:
+            for path, mtime, size in walk(root):
+                state = known.pop(path, None)
+                if state is None:
+                    result.added += 1
+                    changed.append((path, mtime, size))
+                elif state[0] != mtime or state[1] != size:
+                    result.updated += 1
+                    changed.append((path, mtime, size))
+                else:
+                    result.unchanged += 1
+
+        # Whatever is left under the scanned roots wasn't found on disk any more
+        gone = [path for path in known if any(self._under(path, root) for root in roots)]
+        if gone:
+            self.store.remove_local_tracks(gone)
+            result.removed = [known[path][2] for path in gone]
+        return result, changed
+
+    @staticmethod
+    def _under(path: str, root: str) -> bool:
+        return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+    async def _read_tags(self, changed: List[Tuple[str, float, int]],
+                         progress: Optional[Callable[[int, int], None]]) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        batches = [changed[i:i + self.batch_size] for i in range(0, len(changed), self.batch_size)]
+        tracks: List[Dict] = []
+        # Tag parsing is CPU-bound Python, so it gets real processes rather than threads. Workers
+        # are started fresh instead of forked from a process that already runs Qt and libVLC threads
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        pool = ProcessPoolExecutor(max_workers=min(self.workers, len(batches)), mp_context=context)
+        try:
+            pending = [loop.run_in_executor(pool, read_batch, batch) for batch in batches]
+            for future in asyncio.as_completed(pending):
+                batch = await future
+                # Commit as batches arrive so an interrupted scan keeps what it already parsed
+                await loop.run_in_executor(None, self.store.put_local_tracks, batch)
+                tracks.extend(batch)
+                if progress:
+                    progress(len(tracks), len(changed))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        for track in tracks:
+            del track['mtime'], track['size']
+        return tracks
@@ -1,34 +1,138 @@
-import vlc
-from ytmusicapi import YTMusic
 import os
 import json
-from api.sample_api import sample_api
+from api.cached_api import cached_api
 from utils.config import Config
+from utils.search_index import SearchIndex
+from utils.offline_store import OfflineStore
+from player.download_manager import DownloadManager, HTTPTransport, SimulatedTransport
+from player.prefetcher import MediaPrefetcher
+from player.play_queue import PlayQueue
+from player.playback_state import PlaybackState
+from player.library_scanner import LibraryScanner
+from player.offline_cache import OfflineCacheManager, DEFAULT_QUOTA
+from utils.startup_profiler import startup_profiler
+from utils.metrics import metrics
 import asyncio
-from typing import List, Dict
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Deque, List, Dict, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    import vlc
+    from ytmusicapi import YTMusic
+
+def _build_index(items: List[Tuple[str, dict]]) -> SearchIndex:
+    index = SearchIndex()
+    index.add_many(items)
+    return index
 
 class MusicPlayer:
     def __init__(self, config: Config):
-        self.instance = vlc.Instance()
-        self.player = self.instance.media_player_new()
+        # libVLC and YTMusic are slow to start; they are built by warm_up() or on first use
+        self._instance = None
+        self._player = None
+        self._ytmusic = None
+        self._instance_lock = threading.Lock()
         self.current_media = None
-        self.ytmusic = YTMusic()
-        self.playlist: List[dict] = []
-        self.current_track_index = 0
+        self.config = config
+        self.queue = PlayQueue(max_size=self.config.get('queue_max_size', 10_000))
         self.offline_mode = False
-        self.play_history: List[dict] = []
+        # Ring buffer; the full history lives in the offline store
+        self.play_history: Deque[dict] = deque(maxlen=self.config.get('history_size', 1000))
         self.offline_cache: Dict[str, dict] = {}
-        self.config = config
-        asyncio.create_task(self.load_offline_cache())
+        # Built on the first offline search instead of at startup; most sessions never search offline
+        self.offline_index: Optional[SearchIndex] = None
+        self._offline_index_task: Optional[asyncio.Future] = None
+        self.offline_ids: Dict[str, str] = {}  # track id -> offline_cache key
+        self._downloading: List[Tuple[str, str]] = []  # (title, track id) of downloads in flight
+        self.offline_store = OfflineStore(self.config.get('library_db', 'library.db'))
+        self.offline_manager = OfflineCacheManager(
+            self.offline_store,
+            quota=self.config.get('offline_cache_quota', DEFAULT_QUOTA),
+            policy=self.config.get('offline_cache_policy', 'lru'),
+            on_evict=self._forget_offline,
+            protected=self._protected_offline,
+        )
+        metrics.add_source('offline_cache', self.offline_manager.snapshot)
+        # Files found under the configured library folders, keyed by their path-derived id
+        self.local_tracks: Dict[str, dict] = {}
+        self.local_index = SearchIndex()
+        self.library_scanner = LibraryScanner(self.offline_store, workers=self.config.get('scan_workers'))
+        # Without a real stream endpoint configured, downloads use deterministic simulated audio
+        self.stream_base_url = self.config.get('stream_base_url')
+        self.download_manager = DownloadManager(
+            directory="offline_cache",
+            transport=HTTPTransport() if self.stream_base_url else SimulatedTransport(),
+            workers=self.config.get('download_workers', 4),
+        )
+        self.event_listeners: List[Callable[[str, dict], None]] = []
+        self.prefetch_depth = self.config.get('prefetch_depth', 2)
+        self.prefetcher = MediaPrefetcher(self.prepare_media)
+        self.switch_latencies: Deque[float] = deque(maxlen=100)
+        self.playback = PlaybackState()
+        self.playback.end_listeners.append(self._on_end_reached)
+        metrics.add_source('prefetch', lambda: {'hits': self.prefetcher.hits, 'misses': self.prefetcher.misses})
+        self.offline_cache_loaded = asyncio.create_task(self.load_offline_cache())
+
+    def _create_instance(self) -> "vlc.Instance":
+        with self._instance_lock:
+            if self._instance is None:
+                import vlc
+                self._instance = vlc.Instance()
+            return self._instance
+
+    @property
+    def instance(self) -> "vlc.Instance":
+        return self._instance or self._create_instance()
+
+    @property
+    def player(self) -> "vlc.MediaPlayer":
+        if self._player is None:
+            self._player = self.instance.media_player_new()
+            self.playback.attach(self._player)
+        return self._player
+
+    @property
+    def ytmusic(self) -> "YTMusic":
+        if self._ytmusic is None:
+            from ytmusicapi import YTMusic
+            self._ytmusic = YTMusic()
+        return self._ytmusic
 
-    async def search(self, query: str) -> List[dict]:
+    async def warm_up(self) -> None:
+        # Runs after the window is shown: the slow constructors go to an executor
+        loop = asyncio.get_running_loop()
+        with startup_profiler.phase("vlc.Instance"):
+            await loop.run_in_executor(None, self._create_instance)
+        with startup_profiler.phase("vlc media player"):
+            self.player  # Must be created on the loop thread so events can be bridged
+        with startup_profiler.phase("sample catalog"):
+            await loop.run_in_executor(None, cached_api.api.load)
+
+    async def search(self, query: str, limit: int = 10) -> List[dict]:
         if self.offline_mode:
-            return [track for track in self.offline_cache.values() if query.lower() in track['title'].lower()]
+            with metrics.timer('search.offline'):
+                offline_index = await self._get_offline_index()
+                results = [self.offline_cache[title] for title in offline_index.search(query, limit)]
+                return results + self.search_local(query, limit - len(results))
         try:
-            return await sample_api.search_tracks(query)
-        except Exception as e:
-            print(f"Error searching: {e}")
+            with metrics.timer('search.online'):
+                # The user's own files come first; the catalog fills the rest
+                results = self.search_local(query, limit)
+                if len(results) < limit:
+                    results += await cached_api.search_tracks(query, limit - len(results))
+                return results
+        except Exception:
+            # Let callers see the failure; an empty list would be cached as a real answer
+            metrics.incr('search.errors')
+            raise
+
+    def search_local(self, query: str, limit: int = 10) -> List[dict]:
+        if limit <= 0 or not self.local_tracks:
             return []
+        return [self.local_tracks[track_id] for track_id in self.local_index.search(query, limit)]
 
     async def play_title(self, title: str) -> None:
         if self.offline_mode:
@@ -37,54 +141,189 @@ class MusicPlayer:
             else:
                 raise Exception("This track is not available offline.")
         else:
-            track = await sample_api.get_track_details(title)
+            track = await cached_api.get_track_details(title)
+            if track:
+                await self.play_online(track)
+            else:
+                raise Exception("Track not found")
+
+    async def play_track(self, track_id: str) -> None:
+        # Ids stay unambiguous where several tracks share a title
+        local_track = self.local_tracks.get(track_id)
+        if local_track is not None:
+            await self.play_file(local_track)
+        elif self.offline_mode:
+            title = self.offline_ids.get(track_id)
+            if title is None:
+                raise Exception("This track is not available offline.")
+            await self.play_offline(title)
+        else:
+            track = await cached_api.get_track_details(track_id)
             if track:
-                try:
-                    url = f"https://example.com/stream/{track['id']}"  # Placeholder URL
-                    self.current_media = self.instance.media_new(url)
-                    self.player.set_media(self.current_media)
-                    await self.play()
-                    self.playlist.append(track)
-                    self.current_track_index = len(self.playlist) - 1
-                    self.play_history.append(track)
-                except Exception as e:
-                    print(f"Error playing title: {e}")
-                    raise
+                await self.play_online(track)
             else:
                 raise Exception("Track not found")
 
+    async def play_online(self, track: dict) -> None:
+        try:
+            self.current_media = self.instance.media_new(self.stream_url(track))
+            self.player.set_media(self.current_media)
+            await self.play()
+            self.queue.enqueue(track)
+            self.queue.jump_to(track['id'])
+            self.record_play(track)
+            self.schedule_prefetch()
+        except Exception as e:
+            print(f"Error playing title: {e}")
+            raise
+
     async def play_offline(self, title: str) -> None:
+        offline_track = self.offline_cache.get(title)
+        if offline_track is None:
+            raise Exception("This track is not available offline.")
+        await self.play_file(offline_track)
+
+    async def play_file(self, track: dict) -> None:
         try:
-            offline_track = self.offline_cache[title]
-            self.current_media = self.instance.media_new(offline_track['file_path'])
+            self.current_media = self.instance.media_new(track['file_path'])
             self.player.set_media(self.current_media)
             await self.play()
-            self.playlist.append(offline_track)
-            self.current_track_index = len(self.playlist) - 1
-            self.play_history.append(offline_track)
+            self.queue.enqueue(track)
+            self.queue.jump_to(track['id'])
+            self.record_play(track)
+            self.schedule_prefetch()
         except Exception as e:
-            print(f"Error playing offline title: {e}")
+            print(f"Error playing file: {e}")
             raise
 
+    def add_event_listener(self, listener: Callable[[str, dict], None]) -> None:
+        self.event_listeners.append(listener)
+
+    def emit_event(self, event: str, track: dict) -> None:
+        for listener in self.event_listeners:
+            try:
+                listener(event, track)
+            except Exception as e:
+                print(f"Error in playback event listener: {e}")
+
+    def record_play(self, track: dict) -> None:
+        replay = bool(self.play_history) and self.play_history[-1]['id'] == track['id']
+        event = 'replay' if replay else 'play'
+        self.play_history.append(track)
+        self.offline_store.append_play(track, event)
+        title = self.offline_ids.get(track['id'])
+        if title is not None:
+            self.offline_manager.played(title)
+        self.emit_event(event, track)
+
+    def record_skip(self) -> None:
+        # Leaving a track before it is half way through counts as a skip
+        track = self.queue.current
+        if track is not None and self._player is not None and self.player.is_playing() \
+                and self.player.get_position() < 0.5:
+            self.offline_store.append_play(track, 'skip')
+            self.emit_event('skip', track)
+
     async def play(self) -> None:
         if self.current_media:
             self.player.play()
 
+    def stream_url(self, track: dict) -> str:
+        base_url = self.stream_base_url or "https://example.com/stream"  # Placeholder URL
+        return f"{base_url.rstrip('/')}/{track['id']}"
+
     async def pause(self) -> None:
-        self.player.pause()
+        if self._player is not None:
+            self._player.pause()
 
     async def stop(self) -> None:
-        self.player.stop()
+        if self._player is not None:
+            self._player.stop()
+
+    def _on_end_reached(self) -> None:
+        # libVLC must not be driven from its own callback, so advance from a fresh loop task
+        asyncio.create_task(self._advance())
+
+    async def _advance(self) -> None:
+        # Nobody awaits auto-advance, so a track that fails to load is logged and skipped rather
+        # than stopping playback; at most one pass over the queue is tried
+        for _ in range(max(1, len(self.queue))):
+            try:
+                await self.next_track()
+                return
+            except Exception as e:
+                metrics.incr('player.switch_errors')
+                print(f"Error switching to the next track, skipping it: {e}")
 
     async def next_track(self) -> None:
-        if self.current_track_index < len(self.playlist) - 1:
-            self.current_track_index += 1
-            await self.play_title(self.playlist[self.current_track_index]['title'])
+        self.record_skip()
+        track = self.queue.next()
+        if track is not None:
+            await self.switch_to(track)
 
     async def previous_track(self) -> None:
-        if self.current_track_index > 0:
-            self.current_track_index -= 1
-            await self.play_title(self.playlist[self.current_track_index]['title'])
+        track = self.queue.previous()
+        if track is not None:
+            await self.switch_to(track)
+
+    async def enqueue(self, tracks: List[dict]) -> None:
+        self.queue.extend(tracks)
+        self.schedule_prefetch()
+
+    async def set_shuffle(self, enabled: bool) -> None:
+        self.queue.shuffle = enabled
+        self.schedule_prefetch()
+
+    async def set_repeat(self, mode: str) -> None:
+        self.queue.repeat = mode
+
+    async def prepare_media(self, track: dict) -> "vlc.Media":
+        offline_track = self.local_tracks.get(track['id']) or self.offline_cache.get(track.get('title'))
+        if offline_track and offline_track['id'] == track['id']:
+            media = self.instance.media_new(offline_track['file_path'])
+        elif self.offline_mode:
+            raise Exception("This track is not available offline.")
+        else:
+            media = self.instance.media_new(self.stream_url(track))
+        try:
+            import vlc
+            # Parsing runs inside libVLC's own threads; it only warms metadata and demuxer state
+            media.parse_with_options(vlc.MediaParseFlag.network, 0)
+        except Exception as e:
+            print(f"Error pre-parsing media: {e}")
+        return media
+
+    def schedule_prefetch(self) -> None:
+        if self.prefetch_depth <= 0:
+            return
+        upcoming = self.queue.peek(self.prefetch_depth)
+        previous = self.queue.peek_previous()
+        if previous is not None:
+            upcoming.append(previous)
+        self.prefetcher.schedule(upcoming)
+
+    async def switch_to(self, track: dict) -> None:
+        started = time.perf_counter()
+        media = await self.prefetcher.take(track) or await self.prepare_media(track)
+        self.current_media = media
+        self.player.set_media(media)
+        await self.play()
+        self.switch_latencies.append(time.perf_counter() - started)
+        metrics.observe('player.switch', self.switch_latencies[-1])
+        self.record_play(track)
+        self.schedule_prefetch()
+
+    def get_switch_latency(self) -> Optional[Dict[str, float]]:
+        if not self.switch_latencies:
+            return None
+        ordered = sorted(self.switch_latencies)
+        return {
+            'last': self.switch_latencies[-1],
+            'median': ordered[len(ordered) // 2],
+            'max': ordered[-1],
+            'prefetch_hits': self.prefetcher.hits,
+            'prefetch_misses': self.prefetcher.misses,
+        }
 
     async def seek(self, position: float) -> None:
         if self.current_media:
@@ -95,43 +334,190 @@ class MusicPlayer:
 
     async def toggle_offline_mode(self) -> None:
         self.offline_mode = not self.offline_mode
+        self.prefetcher.clear()
+        if self.offline_mode and self.offline_index is None and self._offline_index_task is None:
+            # Get a head start on the index the first offline search will need
+            self._offline_index_task = asyncio.ensure_future(self._build_offline_index())
         self.config.set('offline_mode', self.offline_mode)
         await self.config.save()
 
     async def download_for_offline(self, title: str) -> bool:
         if not self.offline_mode:
-            track = await sample_api.get_track_details(title)
+            track = await cached_api.get_track_details(title)
             if track:
-                try:
-                    file_path = os.path.join("offline_cache", f"{track['id']}.mp3")
-                    os.makedirs("offline_cache", exist_ok=True)
-                    # Simulate downloading the file
-                    open(file_path, 'w').close()
-                    self.offline_cache[title] = {'title': title, 'id': track['id'], 
-                                                 'file_path': file_path}
-                    await self.save_offline_cache()
-                    return True
-                except Exception as e:
-                    print(f"Error downloading for offline: {e}")
-                    return False
+                return await self.download_track(track, title)
         return False
 
+    async def download_track(self, track: dict, title: Optional[str] = None) -> bool:
+        if self.offline_mode:
+            return False
+        title = title or track['title']
+        # Protected from eviction until added, so an older copy can't be evicted (and the new file
+        # deleted with it) while this one downloads
+        downloading = (title, track['id'])
+        self._downloading.append(downloading)
+        try:
+            await self.offline_manager.settle(title, self.download_manager.path_for(track['id']))
+            file_path = await self.download_manager.download(
+                track['id'], self.stream_url(track), track.get('sha256'))
+            size = os.path.getsize(file_path)
+            self.offline_cache[title] = {'title': title, 'id': track['id'], 
+                                         'artist': track.get('artist'), 'album': track.get('album'),
+                                         'file_path': file_path, 'size': size}
+            if self.offline_index is not None:
+                self.offline_index.add(title, self.offline_cache[title])
+            self.offline_ids[track['id']] = title
+            self.offline_store.put_track(self.offline_cache[title])
+            self.offline_manager.add(title, size)
+            return True
+        except Exception as e:
+            print(f"Error downloading for offline: {e}")
+            return False
+        finally:
+            self._downloading.remove(downloading)
+
+    async def download_many(self, titles: List[str]) -> List[bool]:
+        # Every title is queued at once so the download workers run in parallel
+        return await asyncio.gather(*(self.download_for_offline(title) for title in titles))
+
     async def load_offline_cache(self) -> None:
+        loop = asyncio.get_running_loop()
         try:
-            self.offline_cache = self.config.get('offline_cache', {})
+            # Older versions kept the whole cache inside config.json; move it into the store once
+            legacy = self.config.get('offline_cache')
+            if legacy:
+                await loop.run_in_executor(None, self.offline_store.put_tracks, list(legacy.values()))
+                self.config.delete('offline_cache')
+                await self.config.save()
+            offline_cache = await loop.run_in_executor(None, self.offline_store.load_tracks)
+            local_tracks, local_index = await loop.run_in_executor(None, self._read_local_library)
+            history = await loop.run_in_executor(None, self.offline_store.recent_plays)
         except Exception as e:
             print(f"Error loading offline cache: {e}")
-            self.offline_cache = {}
+            return
+        # Keep anything downloaded or played while the store was being read
+        for title, track in self.offline_cache.items():
+            offline_cache[title] = track
+        self.offline_cache = offline_cache
+        self.offline_index = None
+        self.offline_ids = {track['id']: title for title, track in offline_cache.items()}
+        for track_id, track in self.local_tracks.items():
+            local_tracks[track_id] = track
+            local_index.add(track_id, track)
+        self.local_tracks = local_tracks
+        self.local_index = local_index
+        self.play_history = deque([*history, *self.play_history], maxlen=self.play_history.maxlen)
+        try:
+            await self.offline_manager.load()
+        except Exception as e:
+            print(f"Error loading offline cache usage: {e}")
 
-    async def save_offline_cache(self) -> None:
-        self.config.set('offline_cache', self.offline_cache)
+    async def _get_offline_index(self) -> SearchIndex:
+        if self.offline_index is None:
+            if self._offline_index_task is None:
+                self._offline_index_task = asyncio.ensure_future(self._build_offline_index())
+            # Shielded so a superseded search doesn't cancel the build for the next one
+            await asyncio.shield(self._offline_index_task)
+        return self.offline_index
+
+    async def _build_offline_index(self) -> None:
+        try:
+            await self.offline_cache_loaded
+            items = list(self.offline_cache.items())
+            offline_index = await asyncio.get_running_loop().run_in_executor(None, _build_index, items)
+            # Catch up with downloads and evictions that landed while the index was being built
+            built = {title for title, _ in items}
+            for title in built - self.offline_cache.keys():
+                offline_index.remove(title)
+            for title in self.offline_cache.keys() - built:
+                offline_index.add(title, self.offline_cache[title])
+            self.offline_index = offline_index
+        finally:
+            self._offline_index_task = None
+
+    def _read_local_library(self) -> Tuple[Dict[str, dict], SearchIndex]:
+        local_tracks = self.offline_store.load_local_tracks()
+        return local_tracks, self._build_local_index(local_tracks)
+
+    async def scan_library(self, folders: Optional[List[str]] = None,
+                           progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+        # Rescans only re-read files whose mtime or size changed, so this is cheap to run at startup
+        await self.offline_cache_loaded
+        folders = folders if folders is not None else self.config.get('library_folders', [])
+        with metrics.timer('library.scan'):
+            result = await self.library_scanner.scan(folders, progress)
+        if len(result.tracks) + len(result.removed) > 1000:
+            # Large changes are indexed off the loop and swapped in whole
+            local_tracks = dict(self.local_tracks)
+            for track_id in result.removed:
+                local_tracks.pop(track_id, None)
+            local_tracks.update((track['id'], track) for track in result.tracks)
+            loop = asyncio.get_running_loop()
+            local_index = await loop.run_in_executor(None, self._build_local_index, local_tracks)
+            self.local_tracks, self.local_index = local_tracks, local_index
+        else:
+            for track_id in result.removed:
+                self.local_tracks.pop(track_id, None)
+                self.local_index.remove(track_id)
+            for track in result.tracks:
+                self.local_tracks[track['id']] = track
+                self.local_index.add(track['id'], track)
+        return result.summary()
+
+    @staticmethod
+    def _build_local_index(local_tracks: Dict[str, dict]) -> SearchIndex:
+        local_index = SearchIndex()
+        local_index.add_many(local_tracks.items())
+        return local_index
+
+    async def add_library_folder(self, folder: str) -> Dict:
+        folders = self.config.get('library_folders', [])
+        if folder not in folders:
+            self.config.set('library_folders', [*folders, folder])
+            await self.config.save()
+        return await self.scan_library([folder])
+
+    def _forget_offline(self, title: str) -> Optional[str]:
+        track = self.offline_cache.pop(title, None)
+        if track is None:
+            return None
+        if self.offline_index is not None:
+            self.offline_index.remove(title)
+        if self.offline_ids.get(track['id']) == title:
+            del self.offline_ids[track['id']]
+        return track['file_path']
+
+    def _protected_offline(self) -> Set[str]:
+        # Never delete the file libVLC is reading, the ones queued up next or one being re-downloaded
+        protected = set()
+        for track in [self.queue.current, *self.queue.peek(self.prefetch_depth)]:
+            title = self.offline_ids.get(track['id']) if track else None
+            if title is not None:
+                protected.add(title)
+        for title, track_id in self._downloading:
+            protected.add(title)
+            if track_id in self.offline_ids:
+                protected.add(self.offline_ids[track_id])
+        return protected
+
+    async def pin_offline(self, title: str, pinned: bool = True) -> bool:
+        return self.offline_manager.pin(title, pinned)
+
+    async def set_offline_quota(self, quota: Optional[int]) -> None:
+        self.config.set('offline_cache_quota', quota)
         await self.config.save()
+        self.offline_manager.set_quota(quota)
+
+    async def save_offline_cache(self) -> None:
+        # Entries are committed as they are added; this just folds the WAL back into the database
+        self.offline_store.checkpoint()
 
     def get_play_history(self) -> List[dict]:
-        return self.play_history[-10:]  # Return last 10 played tracks
+        # Return last 10 played tracks
+        return list(islice(self.play_history, max(0, len(self.play_history) - 10), None))
 
     async def is_playing(self) -> bool:
-        return self.player.is_playing()
+        return self._player is not None and self._player.is_playing()
 
     async def get_position(self) -> float:
-        return self.player.get_position()
\ No newline at end of file
+        return self._player.get_position() if self._player is not None else 0.0
\ No newline at end of file
@@ -0,0 +1,178 @@
+import asyncio
+import os
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from player.eviction import make_policy
+from utils.metrics import metrics
+from utils.offline_store import OfflineStore
+
+DEFAULT_QUOTA = 2 * 1024 ** 3  # Bytes
+
+class OfflineCacheManager:
+    # Keeps downloaded tracks under a byte quota. Sizes and usage live in the offline store; eviction
+    # order comes from a pluggable policy and file deletion runs in an executor
+    def __init__(self, store: OfflineStore, quota: Optional[int] = DEFAULT_QUOTA, policy: str = 'lru',
+                 on_evict: Optional[Callable[[str], Optional[str]]] = None,
+                 protected: Optional[Callable[[], Set[str]]] = None):
+        self.store = store
+        self.quota = quota
+        self.policy_name = policy
+        self.policy = make_policy(policy)
+        self.on_evict = on_evict  # Drops the entry from the player; returns its file path
+        self.protected = protected  # Titles that must not go right now, e.g. the one playing
+        self.sizes: Dict[str, int] = {}
+        self.pinned: Set[str] = set()
+        self.used = 0
+        self.evictions = 0
+        self._task: Optional[asyncio.Task] = None
+        self._deleting: Dict[str, asyncio.Future] = {}  # Title or file path -> deletion in flight
+
+    def __contains__(self, title: str) -> bool:
+        return title in self.sizes
+
+    async def load(self) -> None:
+        loop = asyncio.get_running_loop()
+        usage = await loop.run_in_executor(None, self.store.load_usage)
+        # Entries from before sizes were tracked are measured once; vanished files are dropped
+        sizes, gone = await loop.run_in_executor(None, self._measure, usage)
+        # Downloads finished while the store was read went through add() and are newer than its rows
+        added = dict(self.sizes)
+        gone = [title for title in gone if title not in added]
+        self.policy = make_policy(self.policy_name)
+        self.sizes.clear()
+        self.used = 0
+        for title, _, _, play_count, pinned in usage:
+            if title in added or title in gone:
+                continue
+            self.sizes[title] = sizes[title]
+            self.used += sizes[title]
+            self.policy.insert(title, play_count)
+            if pinned:
+                self.pinned.add(title)
+        for title, size in added.items():
+            self.sizes[title] = size
+            self.used += size
+            self.policy.insert(title)
+        if gone:
+            for title in gone:
+                if self.on_evict:
+                    self.on_evict(title)
+            await loop.run_in_executor(None, self.store.remove_tracks, gone)
+        self.schedule_eviction()
+
+    def _measure(self, usage: List[Tuple[str, str, Optional[int], int, bool]]) -> Tuple[Dict[str, int], List[str]]:
+        sizes: Dict[str, int] = {}
+        measured: Dict[str, int] = {}
+        gone: List[str] = []
+        for title, file_path, size, _, _ in usage:
+            if size is not None:
+                sizes[title] = size
+                continue
+            try:
+                sizes[title] = measured[title] = os.path.getsize(file_path)
+            except OSError:
+                gone.append(title)
+        if measured:
+            self.store.set_sizes(measured)
+        return sizes, gone
+
+    def add(self, title: str, size: int) -> None:
+        if title in self.sizes:
+            self.used -= self.sizes[title]
+            self.policy.remove(title)
+        self.sizes[title] = size
+        self.used += size
+        self.policy.insert(title)
+        self.schedule_eviction()
+
+    def played(self, title: str) -> None:
+        if title in self.sizes:
+            self.policy.access(title)
+            asyncio.get_running_loop().run_in_executor(None, self._record_play, title)
+
+    def _record_play(self, title: str) -> None:
+        try:
+            self.store.record_offline_play(title)
+        except Exception as e:
+            print(f"Error recording offline play: {e}")
+
+    async def settle(self, title: str, file_path: Optional[str] = None) -> None:
+        # An evicted title is forgotten before its file and row are deleted; a re-download of it has
+        # to wait for that, or the deletion would take the new file and row with it
+        for key in (title, file_path):
+            deletion = self._deleting.get(key) if key else None
+            if deletion is not None:
+                await asyncio.wait([deletion])
+
+    def pin(self, title: str, pinned: bool = True) -> bool:
+        if title not in self.sizes:
+            return False
+        if pinned:
+            self.pinned.add(title)
+        else:
+            self.pinned.discard(title)
+            self.schedule_eviction()
+        self.store.set_pinned(title, pinned)
+        return True
+
+    def set_quota(self, quota: Optional[int]) -> None:
+        self.quota = quota
+        self.schedule_eviction()
+
+    def over_quota(self) -> bool:
+        return bool(self.quota) and self.used > self.quota
+
+    def schedule_eviction(self) -> None:
+        if self.over_quota() and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._evict())
+
+    async def _evict(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.over_quota():
+            exclude = self.pinned | (self.protected() if self.protected else set())
+            victims: List[Tuple[str, Optional[str]]] = []
+            # Bounded batches keep each turn on the loop short while a big quota cut is worked off
+            while self.over_quota() and len(victims) < 64:
+                title = self.policy.candidate(exclude)
+                if title is None:
+                    break
+                self.used -= self.sizes.pop(title)
+                self.policy.remove(title, evicted=True)
+                # Forget the entry before its file goes so nothing tries to play it meanwhile
+                victims.append((title, self.on_evict(title) if self.on_evict else None))
+                exclude.add(title)
+            if not victims:
+                print("Offline cache is over its quota but every remaining track is pinned or playing")
+                return
+            self.evictions += len(victims)
+            metrics.incr('offline_cache.evictions', len(victims))
+            deletion = loop.run_in_executor(None, self._delete, victims)
+            keys = [key for victim in victims for key in victim if key]
+            for key in keys:
+                self._deleting[key] = deletion
+            try:
+                await asyncio.shield(deletion)
+            except Exception as e:
+                print(f"Error evicting offline tracks: {e}")
+            finally:
+                for key in keys:
+                    if self._deleting.get(key) is deletion:
+                        del self._deleting[key]
+
+    def _delete(self, victims: List[Tuple[str, Optional[str]]]) -> None:
+        for _, file_path in victims:
+            if file_path:
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+        self.store.remove_tracks([title for title, _ in victims])
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'policy': self.policy_name,
+            'quota': self.quota,
+            'used': self.used,
+            'entries': len(self.sizes),
+            'pinned': len(self.pinned),
+            'evictions': self.evictions,
+        }
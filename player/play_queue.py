@@ -0,0 +1,234 @@
+import random
+from typing import Dict, Iterable, List, Optional
+
+REPEAT_OFF = 'off'
+REPEAT_ALL = 'all'
+REPEAT_ONE = 'one'
+
+class QueueEntry:
+    __slots__ = ('track', 'track_id', 'slot', 'removed')
+
+    def __init__(self, track: dict, slot: int):
+        self.track = track
+        self.track_id = track['id']
+        self.slot = slot
+        self.removed = False
+
+class PlayQueue:
+    def __init__(self, shuffle: bool = False, repeat: str = REPEAT_OFF, max_size: Optional[int] = 10_000,
+                 rng: Optional[random.Random] = None):
+        self.repeat = repeat
+        self.max_size = max_size
+        self.rng = rng or random.Random()
+        self._entries: List[QueueEntry] = []
+        self._by_id: Dict[str, QueueEntry] = {}
+        # Play order as slots into _entries; only order[:_fixed] is final while shuffling
+        self._order: List[int] = []
+        self._where: List[int] = []  # Inverse of _order: slot -> position
+        self._fixed = 0
+        self._position = -1
+        # Set when compaction dropped the current entry: _position is then the kept entry before it
+        self._gap = False
+        self._removed = 0
+        self._trim_from = 0
+        self._shuffle = shuffle
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, track_id: str) -> bool:
+        return track_id in self._by_id
+
+    @property
+    def shuffle(self) -> bool:
+        return self._shuffle
+
+    @shuffle.setter
+    def shuffle(self, enabled: bool) -> None:
+        if enabled == self._shuffle:
+            return
+        current = self._current_entry()
+        self._shuffle = enabled
+        self._gap = False
+        self._order = list(range(len(self._entries)))
+        self._where = list(range(len(self._entries)))
+        if current is None:
+            self._fixed = 0
+            self._position = -1
+        elif enabled:
+            # Keep the playing track first; everything after it is drawn lazily
+            self._swap(0, current.slot)
+            self._fixed = 1
+            self._position = 0
+        else:
+            self._fixed = current.slot + 1
+            self._position = current.slot
+
+    @property
+    def current(self) -> Optional[dict]:
+        entry = self._current_entry()
+        return entry.track if entry else None
+
+    def _current_entry(self) -> Optional[QueueEntry]:
+        if not self._gap and 0 <= self._position < len(self._order):
+            entry = self._entries[self._order[self._position]]
+            if not entry.removed:
+                return entry
+        return None
+
+    def tracks(self) -> List[dict]:
+        return [entry.track for entry in self._entries if not entry.removed]
+
+    def enqueue(self, track: dict) -> bool:
+        if track['id'] in self._by_id:
+            return False
+        entry = QueueEntry(track, len(self._entries))
+        self._entries.append(entry)
+        self._by_id[entry.track_id] = entry
+        self._where.append(len(self._order))
+        self._order.append(entry.slot)  # Joins the not-yet-drawn pool when shuffling
+        if self.max_size and len(self._by_id) > self.max_size:
+            self._trim_oldest()
+        return True
+
+    def _trim_oldest(self) -> None:
+        # Long sessions keep enqueueing; drop the earliest-added entry that isn't playing
+        current = self._current_entry()
+        while self._trim_from < len(self._entries):
+            entry = self._entries[self._trim_from]
+            self._trim_from += 1
+            if not entry.removed and entry is not current:
+                self.remove(entry.track_id)
+                return
+
+    def extend(self, tracks: Iterable[dict]) -> None:
+        for track in tracks:
+            self.enqueue(track)
+
+    def remove(self, track_id: str) -> bool:
+        entry = self._by_id.pop(track_id, None)
+        if entry is None:
+            return False
+        # Tombstone now, compact later so removal stays O(1) amortized
+        entry.removed = True
+        self._removed += 1
+        if self._removed > 64 and self._removed * 2 > len(self._entries):
+            self._compact()
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_id.clear()
+        self._order.clear()
+        self._where.clear()
+        self._fixed = 0
+        self._position = -1
+        self._gap = False
+        self._removed = 0
+        self._trim_from = 0
+
+    def _compact(self) -> None:
+        old_order = self._order
+        kept = [entry for entry in self._entries if not entry.removed]
+        remap = {}
+        for slot, entry in enumerate(kept):
+            remap[entry.slot] = slot
+            entry.slot = slot
+        fixed = [remap[slot] for slot in old_order[:self._fixed] if slot in remap]
+        pool = [remap[slot] for slot in old_order[self._fixed:] if slot in remap]
+        self._entries = kept
+        self._order = fixed + pool
+        self._where = [0] * len(self._order)
+        for position, slot in enumerate(self._order):
+            self._where[slot] = position
+        self._fixed = len(fixed)
+        self._removed = 0
+        self._trim_from = 0
+        if 0 <= self._position < len(old_order) and old_order[self._position] not in remap:
+            self._gap = True
+        self._position = sum(1 for slot in old_order[:self._position + 1] if slot in remap) - 1
+
+    def _swap(self, i: int, j: int) -> None:
+        order = self._order
+        order[i], order[j] = order[j], order[i]
+        self._where[order[i]] = i
+        self._where[order[j]] = j
+
+    def _draw(self, position: int) -> None:
+        # Lazy Fisher-Yates: each step only picks the slot for the next position to play
+        while self._fixed <= position:
+            if self._shuffle:
+                self._swap(self._fixed, self.rng.randrange(self._fixed, len(self._order)))
+            self._fixed += 1
+
+    def _step(self, direction: int) -> Optional[dict]:
+        if not self._by_id:
+            return None
+        position = self._position
+        if self._gap and direction < 0:
+            position += 1  # The entry at _position comes before the removed current one
+        # Skipping tombstones is amortized O(1) because compaction bounds how many there are
+        for _ in range(len(self._order) + 1):
+            position += direction
+            if position >= len(self._order):
+                if self.repeat != REPEAT_ALL:
+                    return None
+                position = 0
+                self._fixed = 0  # A new pass through the queue gets a fresh shuffle
+            elif position < 0:
+                if self.repeat != REPEAT_ALL:
+                    return None
+                position = len(self._order) - 1
+            self._draw(position)
+            entry = self._entries[self._order[position]]
+            if not entry.removed:
+                self._position = position
+                self._gap = False
+                return entry.track
+        return None
+
+    def next(self) -> Optional[dict]:
+        if self.repeat == REPEAT_ONE and self.current is not None:
+            return self.current
+        return self._step(1)
+
+    def previous(self) -> Optional[dict]:
+        if self.repeat == REPEAT_ONE and self.current is not None:
+            return self.current
+        return self._step(-1)
+
+    def peek(self, count: int) -> List[dict]:
+        upcoming: List[dict] = []
+        position = self._position
+        while len(upcoming) < count and position + 1 < len(self._order):
+            position += 1
+            self._draw(position)
+            entry = self._entries[self._order[position]]
+            if not entry.removed:
+                upcoming.append(entry.track)
+        return upcoming
+
+    def peek_previous(self) -> Optional[dict]:
+        position = self._position if self._gap else self._position - 1
+        while position >= 0:
+            entry = self._entries[self._order[position]]
+            if not entry.removed:
+                return entry.track
+            position -= 1
+        return None
+
+    def jump_to(self, track_id: str) -> Optional[dict]:
+        entry = self._by_id.get(track_id)
+        if entry is None:
+            return None
+        position = self._where[entry.slot]
+        if not self._shuffle:
+            self._fixed = max(self._fixed, position + 1)
+        elif position >= self._fixed:
+            # Pull the chosen track forward so it becomes the next drawn position
+            self._swap(self._fixed, position)
+            position = self._fixed
+            self._fixed += 1
+        self._position = position
+        self._gap = False
+        return entry.track
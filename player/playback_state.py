@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+if TYPE_CHECKING:
+    import vlc
+
+STOPPED = 'stopped'
+PLAYING = 'playing'
+PAUSED = 'paused'
+
+class PlaybackState:
+    def __init__(self, min_interval: float = 0.1):
+        self.player: Optional["vlc.MediaPlayer"] = None
+        self.min_interval = min_interval
+        self.state = STOPPED
+        self.position = 0.0
+        self.ui_active = True
+        self.position_listeners: List[Callable[[float], None]] = []
+        self.state_listeners: List[Callable[[str], None]] = []
+        self.end_listeners: List[Callable[[], None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_percent = -1
+        self._last_emit = 0.0
+        self._trailing: Optional[asyncio.TimerHandle] = None
+
+    def attach(self, player: "vlc.MediaPlayer") -> None:
+        import vlc  # Deferred with the rest of libVLC until a player actually exists
+        self.player = player
+        self._loop = asyncio.get_running_loop()
+        events = player.event_manager()
+        # libVLC calls these on its own threads; each handler only hops onto the loop
+        events.event_attach(vlc.EventType.MediaPlayerPositionChanged, self._on_vlc_position)
+        events.event_attach(vlc.EventType.MediaPlayerEndReached, self._on_vlc_state, 'ended')
+        events.event_attach(vlc.EventType.MediaPlayerPlaying, self._on_vlc_state, PLAYING)
+        events.event_attach(vlc.EventType.MediaPlayerPaused, self._on_vlc_state, PAUSED)
+        events.event_attach(vlc.EventType.MediaPlayerStopped, self._on_vlc_state, STOPPED)
+
+    def detach(self) -> None:
+        import vlc
+        if self.player is None:
+            return
+        events = self.player.event_manager()
+        for event_type in (vlc.EventType.MediaPlayerPositionChanged, vlc.EventType.MediaPlayerEndReached,
+                           vlc.EventType.MediaPlayerPlaying, vlc.EventType.MediaPlayerPaused,
+                           vlc.EventType.MediaPlayerStopped):
+            events.event_detach(event_type)
+        self._cancel_trailing()
+        self.player = None
+        self._loop = None
+
+    def _on_vlc_position(self, event) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._set_position, event.u.new_position)
+
+    def _on_vlc_state(self, event, state: str) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._set_state, state)
+
+    def set_ui_active(self, active: bool) -> None:
+        self.ui_active = active
+        if active:
+            # Catch the UI up immediately instead of waiting for the next percent change
+            self._last_percent = -1
+            self._set_position(self.position)
+
+    def _set_position(self, position: float, force: bool = False) -> None:
+        self.position = position
+        if not self.ui_active:
+            return
+        # The progress bar only shows whole percents, so anything finer is wasted repaints
+        if int(position * 100) == self._last_percent and not force:
+            return
+        wait = self.min_interval - (time.monotonic() - self._last_emit)
+        if wait > 0 and not force and self._loop is not None:
+            # Throttled, but the last position of a burst must still reach the UI
+            if self._trailing is None:
+                self._trailing = self._loop.call_later(wait, self._flush_trailing)
+            return
+        self._emit(position)
+
+    def _flush_trailing(self) -> None:
+        self._trailing = None
+        if self.ui_active and int(self.position * 100) != self._last_percent:
+            self._emit(self.position)
+
+    def _cancel_trailing(self) -> None:
+        if self._trailing is not None:
+            self._trailing.cancel()
+            self._trailing = None
+
+    def _emit(self, position: float) -> None:
+        self._cancel_trailing()
+        self._last_percent = int(position * 100)
+        self._last_emit = time.monotonic()
+        for listener in self.position_listeners:
+            listener(position)
+
+    def _set_state(self, state: str) -> None:
+        if state == 'ended':
+            self.state = STOPPED
+            self._set_position(0.0, force=True)
+            for listener in self.end_listeners:
+                listener()
+        else:
+            self.state = state
+        for listener in self.state_listeners:
+            listener(self.state)
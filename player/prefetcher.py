@@ -0,0 +1,48 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+class MediaPrefetcher:
+    def __init__(self, prepare: Callable[[dict], Awaitable[Any]], max_entries: int = 8):
+        self.prepare = prepare
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending: 'OrderedDict[str, asyncio.Task]' = OrderedDict()
+
+    def __contains__(self, track_id: str) -> bool:
+        return track_id in self._pending
+
+    def schedule(self, tracks: Iterable[dict]) -> None:
+        for track in tracks:
+            if track['id'] in self._pending:
+                self._pending.move_to_end(track['id'])
+                continue
+            self._pending[track['id']] = asyncio.create_task(self.prepare(track))
+        while len(self._pending) > self.max_entries:
+            _, task = self._pending.popitem(last=False)
+            task.cancel()
+
+    async def take(self, track: dict) -> Optional[Any]:
+        task = self._pending.pop(track['id'], None)
+        if task is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            # An in-flight preparation is still further along than starting from scratch. Shielded so
+            # the two kinds of cancellation below can be told apart
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None  # Evicted or cleared; the caller prepares the media itself
+            task.cancel()  # The caller itself was cancelled, e.g. superseded by another switch
+            raise
+        except Exception as e:
+            print(f"Error prefetching track: {e}")
+            return None
+
+    def clear(self) -> None:
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
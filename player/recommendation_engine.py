@@ -1,27 +1,208 @@
-from api.sample_api import sample_api
-from typing import List, Dict
+from api.cached_api import cached_api
+from player.content_recommender import ContentRecommender, fingerprint
+from player.ann_index import IVFIndex
+from player.incremental_model import IncrementalModel
+from typing import Callable, List, Dict, Optional, Tuple
 import asyncio
+import os
 
 class RecommendationEngine:
-    def __init__(self):
+    def __init__(self, chunk_size: int = 200, max_concurrency: int = 8, local: bool = False,
+                 state_file: Optional[str] = None, model_file: Optional[str] = None,
+                 index_dir: Optional[str] = None):
         self.track_features: Dict[str, Dict] = {}
+        self.content_model = ContentRecommender()
+        self.incremental_model = IncrementalModel(self.content_model)
+        self.similarity_index: Optional[IVFIndex] = None
+        self._similarity_build: Optional[Tuple[ContentRecommender, asyncio.Future]] = None
+        self._pending_events: Optional[List[Tuple[str, Dict]]] = None  # Recorded while load_state runs
+        self.local = local
+        self.state_file = state_file
+        self.model_file = model_file
+        self.index_dir = index_dir
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
 
     async def get_recommendations(self, play_history: List[Dict], num_recommendations: int = 5) -> List[Dict]:
         if not play_history:
             return []
 
+        if self.local:
+            recommendations = self.incremental_model.recommend(
+                [track['id'] for track in play_history], num_recommendations)
+            if not recommendations and len(self.content_model):
+                recommendations = self.content_model.recommend(play_history, num_recommendations)
+            if recommendations:
+                return recommendations
+
         # Use the most recently played track for recommendations
         last_played = play_history[-1]
-        recommendations = await sample_api.get_recommendations(last_played['id'], num_recommendations)
+        recommendations = await cached_api.get_recommendations(last_played['id'], num_recommendations)
 
         return recommendations
 
-    async def train_model(self, training_data: List[Dict]) -> None:
+    async def recommend_for_track(self, track_id: str, num_recommendations: int = 5) -> List[Dict]:
+        # Seeded by one track alone: the session's plays neither steer nor exclude anything
+        if self.local and track_id in self.content_model.rows:
+            recommendations = self.content_model.recommend([{'id': track_id}], num_recommendations)
+            if recommendations:
+                return recommendations
+        return await cached_api.get_recommendations(track_id, num_recommendations)
+
+    async def train_model(self, training_data: List[Dict],
+                          progress: Optional[Callable[[int, int], None]] = None) -> None:
         # In a real scenario, this method would train your ML model
         # For this example, we'll just populate our track_features dictionary with some dummy data
-        for track in training_data:
-            track_details = await sample_api.get_track_details(track['id'])
-            self.track_features[track['id']] = {
-                'genre': track_details['genre'],
-                # Other features would go here in a real scenario
-            }
\ No newline at end of file
+        track_ids = list(dict.fromkeys(track['id'] for track in training_data))
+        chunks = [track_ids[i:i + self.chunk_size] for i in range(0, len(track_ids), self.chunk_size)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        done = 0
+
+        async def fetch_chunk(chunk: List[str]) -> None:
+            nonlocal done
+            async with semaphore:
+                details = await cached_api.get_tracks_details(chunk)
+            for track_id, track_details in zip(chunk, details):
+                if track_details:
+                    self.track_features[track_id] = {
+                        'title': track_details['title'],
+                        'artist': track_details.get('artist'),
+                        'genre': track_details['genre'],
+                        'album': track_details.get('album'),
+                        'duration': track_details.get('duration'),
+                    }
+            done += len(chunk)
+            if progress:
+                progress(done, len(track_ids))
+
+        await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+        # A model prepare() built over the catalog already covers these tracks and more; the training
+        # set only becomes the model when there is none yet
+        if not len(self.content_model):
+            self.build_local_model()
+
+    def build_local_model(self, tracks: Optional[List[Dict]] = None) -> None:
+        if tracks is None:
+            tracks = [{'id': track_id, **features} for track_id, features in self.track_features.items()]
+        model = ContentRecommender()
+        model.build(tracks)
+        self._use_model(model)
+
+    async def prepare(self, tracks: List[Dict]) -> None:
+        # Encodes (or reloads) the content model off the loop, then swaps it in on the loop so
+        # record_event never sees a half-built model
+        loop = asyncio.get_running_loop()
+        self._use_model(await loop.run_in_executor(None, self._load_or_build, tracks))
+
+    def _use_model(self, model: ContentRecommender) -> None:
+        self.content_model = model
+        self.incremental_model.content_model = model
+        self.incremental_model.rebuild_profile()
+
+    def _load_or_build(self, tracks: List[Dict]) -> ContentRecommender:
+        if self.model_file and os.path.exists(self.model_file):
+            try:
+                model = ContentRecommender.load(self.model_file)
+                if model.fingerprint == fingerprint(tracks):
+                    return model
+            except Exception as e:
+                print(f"Error loading recommendation model: {e}")
+        model = ContentRecommender()
+        model.build(tracks)
+        if self.model_file:
+            try:
+                model.save(self.model_file)
+            except Exception as e:
+                print(f"Error saving recommendation model: {e}")
+        return model
+
+    def build_similarity_index(self, model: ContentRecommender, path: Optional[str] = None) -> IVFIndex:
+        # Built over the content model's own unit vectors, so "similar" agrees with recommendations
+        index = IVFIndex()
+        index.build(model.track_ids, model.matrix.T)
+        index.fingerprint = model.fingerprint
+        if path:
+            index.save(path)
+        return index
+
+    def load_similarity_index(self, path: str, model: ContentRecommender) -> Optional[IVFIndex]:
+        # None when there is no saved index, it can't be read or it was built from other tracks
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+        try:
+            index = IVFIndex.load(path)
+        except Exception as e:
+            print(f"Error loading similarity index: {e}")
+            return None
+        return index if index.fingerprint == model.fingerprint else None
+
+    def _load_or_build_similarity(self, model: ContentRecommender) -> IVFIndex:
+        index = self.load_similarity_index(self.index_dir, model) if self.index_dir else None
+        if index is None:
+            index = self.build_similarity_index(model)
+            if self.index_dir:
+                try:
+                    index.save(self.index_dir)
+                except Exception as e:
+                    print(f"Error saving similarity index: {e}")
+        return index
+
+    async def _get_similarity_index(self, model: ContentRecommender) -> IVFIndex:
+        # Loaded or built off the loop on the first request after each model change; concurrent
+        # requests share the one build
+        if self.similarity_index is not None and self.similarity_index.fingerprint == model.fingerprint:
+            return self.similarity_index
+        if self._similarity_build is None or self._similarity_build[0] is not model:
+            future = asyncio.get_running_loop().run_in_executor(None, self._load_or_build_similarity, model)
+            self._similarity_build = (model, future)
+        future = self._similarity_build[1]
+        try:
+            index = await asyncio.shield(future)
+        finally:
+            if self._similarity_build is not None and self._similarity_build[1] is future and future.done():
+                self._similarity_build = None
+        if model is self.content_model:
+            self.similarity_index = index
+        return index
+
+    async def similar_tracks(self, track_id: str, limit: int = 10) -> List[Dict]:
+        model = self.content_model
+        if track_id not in model.rows:
+            return []
+        index = await self._get_similarity_index(model)
+        return [model.tracks[model.rows[neighbour_id]] for neighbour_id, _ in index.query_by_id(track_id, limit)]
+
+    def record_event(self, event: str, track: Dict) -> None:
+        # Called on every play/replay/skip so recommendations follow the listener without a retrain
+        self.incremental_model.record(event, track)
+        if self._pending_events is not None:
+            self._pending_events.append((event, track))
+
+    async def load_state(self) -> None:
+        # The file is read into a fresh model off the loop and swapped in on it; anything played
+        # meanwhile went to the old model and is replayed on top of the saved history
+        if not self.state_file:
+            return
+        pending = self._pending_events = []
+        loaded = IncrementalModel(self.content_model)
+        try:
+            if not await asyncio.get_running_loop().run_in_executor(None, loaded.load, self.state_file):
+                return  # No saved history; keep what has been recorded so far
+        except Exception as e:
+            print(f"Error loading recommendation state: {e}")
+            return
+        finally:
+            self._pending_events = None
+        loaded.content_model = self.content_model
+        loaded.rebuild_profile()
+        for event, track in pending:
+            loaded.record(event, track)
+        self.incremental_model = loaded
+
+    def save_state(self) -> None:
+        if not self.state_file:
+            return
+        try:
+            self.incremental_model.save(self.state_file)
+        except Exception as e:
+            print(f"Error saving recommendation state: {e}")
@@ -0,0 +1,197 @@
+from api.cached_api import cached_api
+from player.music_player import MusicPlayer
+from player.recommendation_engine import RecommendationEngine
+from utils.config import Config
+from utils.metrics import metrics, LoopLagMonitor, ProfileSampler
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+class CommandError(Exception):
+    pass
+
+# Everything the player needs except a UI: MainWindow and the headless CLI both drive one of these
+class PlayerService:
+    def __init__(self, config: Config, playback: bool = True):
+        self.config = config
+        self.playback = playback
+        self.music_player = MusicPlayer(config)
+        if not playback:
+            # Nothing will be played, so don't build libVLC media ahead of time
+            self.music_player.prefetch_depth = 0
+        # Local mode: plays and skips feed the incremental model, backed by a content model of the
+        # catalog and library that warm_up() builds; the API is only the fallback
+        self.recommendation_engine = RecommendationEngine(
+            local=True,
+            state_file=config.get('recommendation_state_file', 'recommendation_state.json'),
+            model_file=config.get('recommendation_model_file', 'recommendation_model.npz'),
+            index_dir=config.get('recommendation_index_dir', 'recommendation_index'))
+        self.music_player.add_event_listener(self.recommendation_engine.record_event)
+        self.commands: Dict[str, Callable[[Dict], Awaitable[Any]]] = {
+            'search': self.search,
+            'enqueue': self.enqueue,
+            'download': self.download,
+            'recommend': self.recommend,
+            'similar': self.similar,
+            'stats': self.stats,
+            'scan': self.scan,
+            'pin': self.pin,
+            'quota': self.quota,
+        }
+        self.loop_monitor: Optional[LoopLagMonitor] = None
+        self.profiler: Optional[ProfileSampler] = None
+        self.metrics_file = config.get('metrics_file', 'pymusicplayer_metrics.json')
+        self._state_loaded: Optional[asyncio.Future] = None
+        self._dump_task: Optional[asyncio.Task] = None
+
+    async def warm_up(self) -> None:
+        # Listening history is read in parallel with libVLC start-up
+        loop = asyncio.get_running_loop()
+        self._state_loaded = asyncio.ensure_future(self.recommendation_engine.load_state())
+        try:
+            if self.playback:
+                await self.music_player.warm_up()
+            else:
+                await loop.run_in_executor(None, cached_api.api.load)
+        finally:
+            await self._state_loaded
+        await self.music_player.offline_cache_loaded
+        await self.refresh_recommendations()
+
+    async def refresh_recommendations(self) -> None:
+        # The user's own files are recommendable too; rerun after the library changes
+        tracks = list(self.music_player.local_tracks.values()) + cached_api.api.catalog.tracks
+        try:
+            await self.recommendation_engine.prepare(tracks)
+        except Exception as e:
+            print(f"Error building recommendation model: {e}")
+
+    def enable_debug(self, dump_interval: float = 30.0) -> None:
+        # Loop lag, sampled cProfile windows and a periodic metrics dump to metrics_file; the lag probe
+        # wakes the loop four times a second, so like the rest it only runs when asked for
+        if self.loop_monitor is None:
+            self.loop_monitor = LoopLagMonitor(metrics)
+            self.loop_monitor.start()
+        if self.profiler is None:
+            self.profiler = ProfileSampler()
+            self.profiler.start()
+            metrics.add_source('profile', self.profiler.snapshot)
+        if self._dump_task is None:
+            self._dump_task = asyncio.create_task(self._dump_periodically(dump_interval))
+
+    async def _dump_periodically(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.dump_metrics()
+
+    async def dump_metrics(self) -> None:
+        try:
+            snapshot = metrics.snapshot()
+            await asyncio.get_running_loop().run_in_executor(None, metrics.dump, self.metrics_file, snapshot)
+        except Exception as e:
+            print(f"Error dumping metrics: {e}")
+
+    async def handle(self, command: Dict) -> Dict:
+        # One JSON-lines request in, one response out; failures are reported, never raised
+        response: Dict[str, Any] = {'cmd': command.get('cmd')}
+        if 'id' in command:
+            response['id'] = command['id']
+        try:
+            handler = self.commands.get(command.get('cmd'))
+            if handler is None:
+                raise CommandError(f"Unknown command: {command.get('cmd')}")
+            response['ok'] = True
+            response['result'] = await handler(command)
+        except Exception as e:
+            response['ok'] = False
+            response['error'] = str(e)
+            response.pop('result', None)
+        return response
+
+    async def search(self, command: Dict) -> List[dict]:
+        if 'query' not in command:
+            raise CommandError("search needs a 'query'")
+        return await self.music_player.search(command['query'], command.get('limit', 10))
+
+    async def enqueue(self, command: Dict) -> Dict:
+        ids = command.get('ids', [])
+        tracks = [track for track in await cached_api.get_tracks_details(ids) if track]
+        await self.music_player.enqueue(tracks)
+        return {'enqueued': [track['id'] for track in tracks], 'queue_length': len(self.music_player.queue)}
+
+    async def download(self, command: Dict) -> Dict[str, bool]:
+        if 'titles' in command:
+            titles = command['titles']
+            return dict(zip(titles, await self.music_player.download_many(titles)))
+        ids = command.get('ids', [])
+        tracks = [track for track in await cached_api.get_tracks_details(ids) if track]
+        # Every track is handed to the download manager at once so its workers run in parallel
+        results = await asyncio.gather(*(self.music_player.download_track(track) for track in tracks))
+        downloaded = {track['id']: ok for track, ok in zip(tracks, results)}
+        return {track_id: downloaded.get(track_id, False) for track_id in ids}
+
+    async def recommend(self, command: Dict) -> List[dict]:
+        limit = command.get('limit', 5)
+        if 'track_id' in command:
+            return await self.recommendation_engine.recommend_for_track(command['track_id'], limit)
+        return await self.recommendation_engine.get_recommendations(self.music_player.get_play_history(), limit)
+
+    async def similar(self, command: Dict) -> List[dict]:
+        if 'track_id' not in command:
+            raise CommandError("similar needs a 'track_id'")
+        return await self.recommendation_engine.similar_tracks(command['track_id'], command.get('limit', 10))
+
+    async def scan(self, command: Dict) -> Dict:
+        # Without 'folders' this rescans the configured library folders
+        if 'folders' in command:
+            summary = await self.music_player.scan_library(command['folders'])
+        else:
+            summary = await self.music_player.scan_library()
+        if summary['added'] or summary['updated'] or summary['removed']:
+            await self.refresh_recommendations()
+        return summary
+
+    async def pin(self, command: Dict) -> Dict[str, bool]:
+        # Pinned downloads are never evicted to stay under the offline cache quota
+        pinned = command.get('pinned', True)
+        titles = command.get('titles', [])
+        return {title: await self.music_player.pin_offline(title, pinned) for title in titles}
+
+    async def quota(self, command: Dict) -> Dict[str, Any]:
+        # Reports the offline cache usage; with 'bytes' it sets a new quota first (null lifts it)
+        if 'bytes' in command:
+            quota = command['bytes']
+            if quota is not None and (not isinstance(quota, int) or isinstance(quota, bool) or quota < 0):
+                raise CommandError("quota 'bytes' must be a non-negative integer or null")
+            await self.music_player.set_offline_quota(quota)
+        return self.music_player.offline_manager.snapshot()
+
+    async def stats(self, command: Dict) -> Dict[str, Any]:
+        player = self.music_player
+        return {
+            'metrics': metrics.snapshot(),
+            'queue_length': len(player.queue),
+            'offline_tracks': len(player.offline_cache),
+            'local_tracks': len(player.local_tracks),
+            'active_downloads': len(player.download_manager.active),
+            'play_history': len(player.play_history),
+            'switch_latency': player.get_switch_latency(),
+        }
+
+    async def close(self) -> None:
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+            self.loop_monitor = None
+        if self._dump_task is not None:
+            self._dump_task.cancel()
+            self._dump_task = None
+        if self.profiler is not None:
+            self.profiler.stop()
+            await self.dump_metrics()
+        await self.music_player.stop()
+        await self.music_player.download_manager.stop()
+        await self.music_player.save_offline_cache()
+        # Saving before the history was ever read would overwrite it with an empty one
+        if self._state_loaded is not None:
+            await self._state_loaded
+            self.recommendation_engine.save_state()
+        await self.config.flush()
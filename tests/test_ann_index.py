@@ -0,0 +1,70 @@
+import numpy as np
+from player.ann_index import IVFIndex
+
+def make_vectors(count: int = 2000, dims: int = 16, seed: int = 0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dims)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [f"t{i}" for i in range(count)], vectors
+
+def exact(vectors: np.ndarray, row: int, k: int):
+    scores = vectors @ vectors[row]
+    scores[row] = -np.inf
+    return set(np.argsort(-scores)[:k])
+
+def test_build_groups_every_vector_into_a_list():
+    ids, vectors = make_vectors()
+    index = IVFIndex()
+    index.build(ids, vectors, nlist=20)
+    assert len(index) == len(ids) and len(index.centroids) == 20
+    assert index.offsets[0] == 0 and index.offsets[-1] == len(ids)
+    assert np.all(np.diff(index.offsets) >= 0)
+    assert sorted(map(str, index.ids)) == sorted(ids)
+    row = index.position("t7")
+    assert np.allclose(index.vectors[row], vectors[7])
+
+def test_query_by_id_matches_exact_search_when_probing_every_list():
+    ids, vectors = make_vectors()
+    index = IVFIndex()
+    index.build(ids, vectors, nlist=20)
+    for row in (0, 123, 1999):
+        result = index.query_by_id(ids[row], 10, nprobe=20)
+        assert ids[row] not in [track_id for track_id, _ in result]
+        assert {int(track_id[1:]) for track_id, _ in result} == exact(vectors, row, 10)
+        scores = [score for _, score in result]
+        assert scores == sorted(scores, reverse=True)
+
+def test_recall_against_exact_search():
+    ids, vectors = make_vectors()
+    index = IVFIndex(nprobe=8)
+    index.build(ids, vectors)
+    rows = np.random.default_rng(1).choice(len(ids), 100, replace=False)
+    hits = sum(len({int(track_id[1:]) for track_id, _ in index.query_by_id(ids[row], 10)} & exact(vectors, row, 10))
+               for row in rows)
+    assert hits / (len(rows) * 10) >= 0.8
+    # Probing fewer lists can only find fewer true neighbours
+    narrow = sum(len({int(track_id[1:]) for track_id, _ in index.query_by_id(ids[row], 10, nprobe=1)} & exact(vectors, row, 10))
+                 for row in rows)
+    assert narrow <= hits
+
+def test_unknown_id_and_empty_lists():
+    ids, vectors = make_vectors(50)
+    index = IVFIndex()
+    index.build(ids, vectors, nlist=5)
+    assert index.query_by_id("missing") == []
+    assert IVFIndex().query(vectors[0]) == []
+
+def test_save_and_mmap_load(tmp_path):
+    ids, vectors = make_vectors(500)
+    index = IVFIndex(nprobe=3)
+    index.build(ids, vectors, nlist=10)
+    index.fingerprint = 1234
+    index.save(str(tmp_path / "index"))
+
+    loaded = IVFIndex.load(str(tmp_path / "index"))
+    assert isinstance(loaded.vectors, np.memmap) and isinstance(loaded.ids, np.memmap)
+    assert loaded.nprobe == 3 and loaded.fingerprint == 1234
+    assert loaded.query_by_id("t42", 5) == index.query_by_id("t42", 5)
+
+    in_memory = IVFIndex.load(str(tmp_path / "index"), mmap=False)
+    assert not isinstance(in_memory.vectors, np.memmap)
+    assert in_memory.query_by_id("t42", 5) == index.query_by_id("t42", 5)
@@ -0,0 +1,75 @@
+import random
+from api.browse_views import BrowseViews
+from api.catalog import TrackCatalog
+
+def make_track(index: int, genre: str = 'rock', popularity: int = 0):
+    return {'id': f"t{index}", 'title': f"Track {index}", 'genre': genre, 'popularity': popularity}
+
+def ranked_ids(catalog: TrackCatalog):
+    return [track['id'] for track in sorted(catalog.tracks, key=lambda track: (-track['popularity'], track['id']))]
+
+def test_replacing_a_track_keeps_its_playlists():
+    catalog = TrackCatalog(make_track(i, popularity=i) for i in range(10))
+    views = BrowseViews(catalog)
+    views.add_playlist('p', 'P', ['t3', 't5', 't7'])
+    catalog.add_track(make_track(5, genre='jazz', popularity=99))
+    assert [track['id'] for track in views.playlist_page('p', 0, 10)] == ['t3', 't5', 't7']
+    assert views.playlist_page('p', 0, 10)[1]['genre'] == 'jazz'
+    assert views.playlist_membership['t5'] == {'p'}
+    # The genre lists and the ranking follow the new version
+    assert [track['id'] for track in views.genre_page('jazz', 0, 10)] == ['t5']
+    assert 't5' not in [track['id'] for track in views.genre_page('rock', 0, 10)]
+    assert views.genres == ['rock', 'jazz']
+    assert views.top_tracks(1)[0]['id'] == 't5'
+    # The catalog swaps it in place instead of moving it to the end
+    assert [track['id'] for track in catalog.tracks] == [f"t{i}" for i in range(10)]
+    assert catalog.by_genre_name('jazz') == [catalog.get('t5')]
+
+def test_replace_fires_a_single_update():
+    catalog = TrackCatalog([make_track(1)])
+    events = []
+    catalog.listeners.append(lambda event, track, previous: events.append((event, track['popularity'], previous and previous['popularity'])))
+    catalog.add_track(make_track(1, popularity=7))
+    catalog.add_track(make_track(2))
+    catalog.remove_track('t1')
+    assert events == [('update', 7, 0), ('add', 0, None), ('remove', 7, None)]
+
+def test_top_tracks_reranks_when_a_page_reaches_past_the_ranking():
+    catalog = TrackCatalog(make_track(i, popularity=i) for i in range(20))
+    views = BrowseViews(catalog, top_size=10)
+    for i in range(19, 14, -1):
+        catalog.remove_track(f"t{i}")
+    assert len(views.top) == 5  # Half the ranking is left, not yet refilled
+    assert [track['id'] for track in views.top_tracks(8)] == ranked_ids(catalog)[:8]
+    assert len(views.top) == 10
+
+def test_single_entry_ranking_recovers_after_its_track_goes():
+    catalog = TrackCatalog(make_track(i, popularity=i) for i in range(5))
+    views = BrowseViews(catalog, top_size=1)
+    catalog.remove_track('t4')
+    assert [track['id'] for track in views.top_tracks(1)] == ['t3']
+
+def test_views_follow_random_changes():
+    rng = random.Random(1)
+    catalog = TrackCatalog(make_track(i, rng.choice('abcd'), rng.randint(0, 50)) for i in range(300))
+    views = BrowseViews(catalog, top_size=40)
+    views.add_playlist('p', 'P', [f"t{i}" for i in range(0, 400, 7)])
+    members = set(views.playlists['p']['track_ids'])
+    for step in range(1500):
+        roll = rng.random()
+        if roll < 0.15 and len(catalog):
+            track_id = rng.choice(catalog.tracks)['id']
+            catalog.remove_track(track_id)
+            members.discard(track_id)
+        elif roll < 0.55 and len(catalog):
+            track_id = rng.choice(catalog.tracks)['id']
+            catalog.add_track(make_track(int(track_id[1:]), rng.choice('abcd'), rng.randint(0, 50)))
+        else:
+            catalog.add_track(make_track(rng.randint(0, 400), rng.choice('abcd'), rng.randint(0, 50)))
+        assert [track_id for _, track_id in views.top] == ranked_ids(catalog)[:len(views.top)], step
+        assert len(views.top) >= min(20, len(catalog)), step
+        for genre in 'abcd':
+            assert sorted(views.genre_ids.get(genre, [])) == sorted(track['id'] for track in catalog.by_genre_name(genre))
+        assert set(views.genres) == set(catalog.genres())
+        assert set(views.playlists['p']['track_ids']) == members, step
+    assert members
@@ -0,0 +1,174 @@
+import asyncio
+import gc
+import pytest
+from api.cached_api import CachedAPI
+
+class FakeAPI:
+    # Counts calls per endpoint; `gate` holds every fetch until it is set
+    def __init__(self):
+        self.calls = []
+        self.batches = []
+        self.fail = False
+        self.gate = None
+
+    async def _answer(self, name, value):
+        self.calls.append(name)
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise ConnectionError("api down")
+        return value
+
+    async def get_track_details(self, track_id):
+        return await self._answer('get_track_details', None if track_id == 'missing' else {'id': track_id})
+
+    async def get_tracks_details(self, track_ids):
+        self.batches.append(list(track_ids))
+        return [None if track_id == 'missing' else {'id': track_id} for track_id in track_ids]
+
+    async def get_top_tracks(self, limit=20):
+        return await self._answer('get_top_tracks', [{'id': f"t{i}"} for i in range(limit)])
+
+    async def search(self, query):
+        return await self._answer('search', [query])
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_api(**kwargs):
+    fake = FakeAPI()
+    return fake, CachedAPI(fake, ttls={'get_track_details': 60.0, 'get_top_tracks': 10.0}, **kwargs)
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_results_are_cached_until_they_expire():
+    async def main():
+        fake, api = make_api()
+        clock = Clock()
+        api.caches['get_top_tracks'].timer = clock
+        assert await api.get_top_tracks(3) == await api.get_top_tracks(3)
+        assert fake.calls == ['get_top_tracks']
+        await api.get_top_tracks(limit=3)  # Different key
+        assert len(fake.calls) == 2
+        clock.now = 11.0
+        await api.get_top_tracks(3)
+        assert len(fake.calls) == 3
+        stats = api.get_stats()['get_top_tracks']
+        assert (stats['hits'], stats['misses']) == (1, 3)
+        assert stats['hit_rate'] == 0.25
+    run(main())
+
+def test_cache_is_bounded_lru():
+    async def main():
+        fake, api = make_api(maxsize=2)
+        for track_id in ('a', 'b', 'a', 'c'):  # 'b' is the least recently used when 'c' arrives
+            await api.get_track_details(track_id)
+        fake.calls.clear()
+        await api.get_track_details('a')
+        await api.get_track_details('c')
+        assert fake.calls == []
+        await api.get_track_details('b')
+        assert fake.calls == ['get_track_details']
+        assert len(api.caches['get_track_details']) == 2
+    run(main())
+
+def test_concurrent_misses_share_one_fetch():
+    async def main():
+        fake, api = make_api()
+        fake.gate = asyncio.Event()
+        waiters = [asyncio.ensure_future(api.get_track_details('a')) for _ in range(5)]
+        await asyncio.sleep(0)
+        fake.gate.set()
+        results = await asyncio.gather(*waiters)
+        assert fake.calls == ['get_track_details']
+        assert all(result == {'id': 'a'} for result in results)
+        stats = api.get_stats()['get_track_details']
+        assert (stats['misses'], stats['coalesced'], stats['hits']) == (1, 4, 0)
+        assert api._inflight == {}
+    run(main())
+
+def test_cancelled_caller_does_not_cancel_shared_fetch():
+    async def main():
+        fake, api = make_api()
+        fake.gate = asyncio.Event()
+        first = asyncio.ensure_future(api.get_track_details('a'))
+        second = asyncio.ensure_future(api.get_track_details('a'))
+        await asyncio.sleep(0)
+        first.cancel()
+        fake.gate.set()
+        assert await second == {'id': 'a'}
+        assert first.cancelled()
+    run(main())
+
+def test_errors_and_none_are_not_cached():
+    async def main():
+        fake, api = make_api()
+        fake.fail = True
+        with pytest.raises(ConnectionError):
+            await api.get_track_details('a')
+        fake.fail = False
+        assert await api.get_track_details('a') == {'id': 'a'}
+        assert await api.get_track_details('missing') is None
+        assert await api.get_track_details('missing') is None
+        assert fake.calls.count('get_track_details') == 4
+        assert api.get_stats()['get_track_details']['errors'] == 1
+    run(main())
+
+def test_failed_fetch_with_only_cancelled_callers_is_not_reported_as_lost():
+    async def main():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        fake, api = make_api()
+        fake.fail = True
+        fake.gate = asyncio.Event()
+        caller = asyncio.ensure_future(api.get_track_details('a'))
+        await asyncio.sleep(0)
+        caller.cancel()
+        fake.gate.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        del caller
+        gc.collect()
+        assert errors == []
+        assert api.get_stats()['get_track_details']['errors'] == 1
+    run(main())
+
+def test_uncached_endpoints_pass_through():
+    async def main():
+        fake, api = make_api()
+        await api.search('rock')
+        await api.search('rock')
+        assert fake.calls == ['search', 'search']
+        assert 'search' not in api.get_stats()
+    run(main())
+
+def test_batch_details_fetch_only_what_is_not_cached():
+    async def main():
+        fake, api = make_api()
+        await api.get_track_details('a')
+        results = await api.get_tracks_details(['a', 'b', 'missing', 'b'])
+        assert results == [{'id': 'a'}, {'id': 'b'}, None, {'id': 'b'}]
+        assert fake.batches == [['b', 'missing']]
+        # The batch filled the per-track cache; the unknown id stays uncached
+        assert await api.get_tracks_details(['b', 'a']) == [{'id': 'b'}, {'id': 'a'}]
+        await api.get_tracks_details(['missing'])
+        assert fake.batches == [['b', 'missing'], ['missing']]
+        stats = api.get_stats()['get_track_details']
+        assert (stats['hits'], stats['misses']) == (3, 4)
+    run(main())
+
+def test_invalidate():
+    async def main():
+        fake, api = make_api()
+        await api.get_track_details('a')
+        await api.get_top_tracks(2)
+        api.invalidate('get_top_tracks')
+        assert len(api.caches['get_top_tracks']) == 0 and len(api.caches['get_track_details']) == 1
+        api.invalidate()
+        assert len(api.caches['get_track_details']) == 0
+    run(main())
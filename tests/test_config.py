@@ -0,0 +1,40 @@
+import asyncio
+import json
+from utils.config import Config
+
+def test_saves_are_coalesced(tmp_path):
+    async def run():
+        config = Config(str(tmp_path / "config.json"), save_delay=0.01)
+        writes = []
+        write = config._write_atomic
+        config._write_atomic = lambda data: (writes.append(data), write(data))
+        for volume in range(10):
+            config.set('volume', volume)
+            await config.save()
+        await config._flush_task
+        assert len(writes) == 1
+        assert json.loads((tmp_path / "config.json").read_text()) == {'volume': 9}
+    asyncio.run(run())
+
+def test_failing_writes_back_off_and_give_up(tmp_path):
+    async def run():
+        config = Config(str(tmp_path / "config.json"), save_delay=0.001, max_retries=3, max_backoff=0.01)
+        attempts = []
+
+        def fail(data):
+            attempts.append(data)
+            raise OSError("No space left on device")
+        config._write_atomic = fail
+        config.set('volume', 1)
+        await config.save()
+        await asyncio.wait_for(config._flush_task, 5)
+        assert len(attempts) == 4  # First try plus max_retries
+        assert config._dirty
+
+        # Once the disk is writable again the next save gets the pending change out
+        del config._write_atomic
+        await config.save()
+        await config._flush_task
+        assert not config._dirty
+        assert json.loads((tmp_path / "config.json").read_text()) == {'volume': 1}
+    asyncio.run(run())
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import os
+import pytest
+from player.download_manager import DownloadError, DownloadManager, SimulatedTransport, Transport
+
+URL = "sim://track_1"
+
+class RecordingTransport(SimulatedTransport):
+    # Records the offset of every fetch and can fail the first few with a transient error
+    def __init__(self, failures: int = 0, **kwargs):
+        super().__init__(size=200_000, chunk_size=16_384, **kwargs)
+        self.failures = failures
+        self.offsets = []
+
+    async def fetch(self, url, offset=0):
+        self.offsets.append(offset)
+        if len(self.offsets) <= self.failures:
+            raise ConnectionResetError("connection reset")
+        return await super().fetch(url, offset)
+
+class BlockingTransport(SimulatedTransport):
+    def __init__(self):
+        super().__init__(size=1024)
+        self.release = asyncio.Event()
+
+    async def fetch(self, url, offset=0):
+        await self.release.wait()
+        return await super().fetch(url, offset)
+
+def run(coro):
+    return asyncio.run(coro)
+
+def make_manager(tmp_path, transport, **kwargs) -> DownloadManager:
+    return DownloadManager(directory=str(tmp_path), transport=transport, **kwargs)
+
+def test_transport_is_abstract():
+    with pytest.raises(TypeError):
+        Transport()
+
+def test_download_writes_verified_file(tmp_path):
+    async def main():
+        transport = RecordingTransport()
+        manager = make_manager(tmp_path, transport)
+        try:
+            path = await manager.download("track_1", URL)
+        finally:
+            await manager.stop()
+        with open(path, 'rb') as f:
+            assert f.read() == transport.payload(URL)
+        assert not os.path.exists(f"{path}.part")
+        assert manager.active == {}
+    run(main())
+
+def test_resumes_from_partial_file(tmp_path):
+    async def main():
+        transport = RecordingTransport()
+        payload = transport.payload(URL)
+        with open(tmp_path / "track_1.mp3.part", 'wb') as f:
+            f.write(payload[:70_000])
+        manager = make_manager(tmp_path, transport)
+        try:
+            path = await manager.download("track_1", URL)
+        finally:
+            await manager.stop()
+        assert transport.offsets == [70_000]
+        with open(path, 'rb') as f:
+            assert f.read() == payload
+    run(main())
+
+def test_corrupt_partial_file_restarts_from_zero(tmp_path):
+    async def main():
+        transport = RecordingTransport()
+        payload = transport.payload(URL)
+        with open(tmp_path / "track_1.mp3.part", 'wb') as f:
+            f.write(b"x" * 70_000)
+        manager = make_manager(tmp_path, transport)
+        try:
+            path = await manager.download("track_1", URL)
+        finally:
+            await manager.stop()
+        # The resumed attempt fails its checksum, drops the .part file and the retry starts over
+        assert transport.offsets == [70_000, 0]
+        with open(path, 'rb') as f:
+            assert f.read() == payload
+    run(main())
+
+def test_oversized_partial_file_restarts_from_zero(tmp_path):
+    async def main():
+        transport = RecordingTransport()
+        payload = transport.payload(URL)
+        with open(tmp_path / "track_1.mp3.part", 'wb') as f:
+            f.write(payload + b"x" * 1000)
+        manager = make_manager(tmp_path, transport, retries=1)
+        try:
+            path = await manager.download("track_1", URL)
+        finally:
+            await manager.stop()
+        assert transport.offsets == [len(payload) + 1000, 0]
+        with open(path, 'rb') as f:
+            assert f.read() == payload
+        assert not os.path.exists(tmp_path / "track_1.mp3.part")
+    run(main())
+
+def test_checksum_mismatch_fails_after_retries(tmp_path):
+    async def main():
+        transport = RecordingTransport()
+        manager = make_manager(tmp_path, transport, retries=3)
+        try:
+            with pytest.raises(DownloadError, match="failed"):
+                await manager.download("track_1", URL, sha256=hashlib.sha256(b"other").hexdigest())
+        finally:
+            await manager.stop()
+        assert transport.offsets == [0, 0, 0]
+        assert not os.path.exists(tmp_path / "track_1.mp3")
+        assert manager.active == {}
+    run(main())
+
+def test_transient_errors_are_retried(tmp_path):
+    async def main():
+        transport = RecordingTransport(failures=2)
+        manager = make_manager(tmp_path, transport, retries=3)
+        try:
+            path = await manager.download("track_1", URL)
+        finally:
+            await manager.stop()
+        assert len(transport.offsets) == 3
+        assert os.path.exists(path)
+    run(main())
+
+def test_concurrent_requests_share_one_download(tmp_path):
+    async def main():
+        transport = RecordingTransport()
+        manager = make_manager(tmp_path, transport)
+        try:
+            paths = await asyncio.gather(*(manager.download("track_1", URL) for _ in range(5)))
+        finally:
+            await manager.stop()
+        assert len(set(paths)) == 1
+        assert transport.offsets == [0]
+    run(main())
+
+def test_cancelled_enqueue_does_not_strand_job(tmp_path):
+    async def main():
+        transport = BlockingTransport()
+        manager = make_manager(tmp_path, transport, workers=1, queue_size=1)
+        try:
+            first = asyncio.ensure_future(manager.download("a", "sim://a"))
+            await asyncio.sleep(0.01)  # The worker takes "a" and blocks on the transport
+            second = asyncio.ensure_future(manager.download("b", "sim://b"))
+            await asyncio.sleep(0.01)  # "b" fills the queue
+            third = asyncio.ensure_future(manager.download("c", "sim://c"))
+            await asyncio.sleep(0.01)  # "c" waits for room
+            third.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await third
+            assert "c" not in manager.active
+
+            transport.release.set()
+            await asyncio.gather(first, second)
+            # A later request for the cancelled track is queued afresh instead of awaiting a dead job
+            assert os.path.exists(await asyncio.wait_for(manager.download("c", "sim://c"), 5))
+        finally:
+            await manager.stop()
+    run(main())
+
+def test_cancelled_enqueue_still_serves_joined_callers(tmp_path):
+    async def main():
+        transport = BlockingTransport()
+        manager = make_manager(tmp_path, transport, workers=1, queue_size=1)
+        try:
+            first = asyncio.ensure_future(manager.download("a", "sim://a"))
+            await asyncio.sleep(0.01)
+            second = asyncio.ensure_future(manager.download("b", "sim://b"))
+            await asyncio.sleep(0.01)
+            third = asyncio.ensure_future(manager.download("c", "sim://c"))
+            await asyncio.sleep(0.01)
+            joined = asyncio.ensure_future(manager.download("c", "sim://c"))
+            await asyncio.sleep(0.01)
+            third.cancel()
+            transport.release.set()
+            assert os.path.exists(await asyncio.wait_for(joined, 5))
+            await asyncio.gather(first, second)
+        finally:
+            await manager.stop()
+    run(main())
@@ -0,0 +1,82 @@
+import pytest
+from player.eviction import ARCPolicy, EvictionPolicy, LFUPolicy, LRUPolicy, make_policy
+
+def drain(policy: EvictionPolicy, exclude=()):
+    # Eviction order: keep taking the candidate until only excluded keys are left
+    order = []
+    exclude = set(exclude)
+    while True:
+        key = policy.candidate(exclude)
+        if key is None:
+            return order
+        order.append(key)
+        policy.remove(key, evicted=True)
+
+def test_policy_is_abstract():
+    with pytest.raises(TypeError):
+        EvictionPolicy()
+
+def test_make_policy():
+    assert isinstance(make_policy('LRU'), LRUPolicy)
+    assert isinstance(make_policy('arc'), ARCPolicy)
+    with pytest.raises(ValueError):
+        make_policy('fifo')
+
+def test_lru_evicts_least_recently_played_first():
+    policy = LRUPolicy()
+    for key in 'abcd':
+        policy.insert(key)
+    policy.access('a')
+    policy.access('c')
+    assert len(policy) == 4
+    assert drain(policy) == ['b', 'd', 'a', 'c']
+
+def test_lfu_evicts_least_played_first_ties_by_age():
+    policy = LFUPolicy()
+    policy.insert('a', hits=3)
+    for key in 'bcd':
+        policy.insert(key)
+    policy.access('c')
+    policy.access('c')
+    assert drain(policy) == ['b', 'd', 'c', 'a']
+
+def test_lfu_survives_many_stale_heap_entries():
+    policy = LFUPolicy()
+    for key in range(10):
+        policy.insert(key)
+    for _ in range(50):
+        for key in range(1, 10):
+            policy.access(key)
+    policy.access(5)
+    assert drain(policy) == [0, 1, 2, 3, 4, 6, 7, 8, 9, 5]
+
+def test_arc_prefers_tracks_played_once():
+    policy = ARCPolicy()
+    for key in 'abc':
+        policy.insert(key)
+    policy.access('b')
+    policy.insert('d', hits=2)  # Loaded with a play count, so it starts out as frequent
+    assert drain(policy) == ['a', 'c', 'b', 'd']
+
+def test_arc_ghost_hit_readmits_as_frequent():
+    policy = ARCPolicy()
+    for key in 'abc':
+        policy.insert(key)
+    assert policy.candidate(set()) == 'a'
+    policy.remove('a', evicted=True)
+    assert 'a' in policy.b1
+    policy.insert('a')  # Re-downloaded soon after eviction
+    assert 'a' in policy.t2 and 'a' not in policy.b1
+    assert policy.p == 1
+    # T1 may now keep one entry, so once it is down to that the frequent list gives way
+    assert drain(policy) == ['b', 'a', 'c']
+
+def test_candidate_skips_excluded_keys():
+    for name in ('lru', 'lfu', 'arc'):
+        policy = make_policy(name)
+        for key in 'abc':
+            policy.insert(key)
+        assert drain(policy, exclude={'a', 'c'}) == ['b'], name
+        assert len(policy) == 2
+        # Excluded keys are still there afterwards, in their original order
+        assert drain(policy) == ['a', 'c'], name
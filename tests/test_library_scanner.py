@@ -0,0 +1,88 @@
+import asyncio
+import os
+from player import library_scanner
+from player.library_scanner import LibraryScanner, local_track_id, read_tags
+from utils.offline_store import OfflineStore
+
+def id3v1(title: str = '', artist: str = '', album: str = '') -> bytes:
+    def field(value: str) -> bytes:
+        return value.encode('latin-1').ljust(30, b'\0')
+    return b'TAG' + field(title) + field(artist) + field(album) + b'\0' * 35
+
+def write(path, audio: bytes = b'\xff\xfb' * 100, tag: bytes = b'') -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(audio + tag)
+    return str(path)
+
+def scan(scanner: LibraryScanner, folders):
+    return asyncio.run(scanner.scan([str(folder) for folder in folders]))
+
+def test_rescan_reads_only_new_and_changed_files(tmp_path):
+    library = tmp_path / "music"
+    kept = write(library / "Band" / "Album" / "kept.mp3", tag=id3v1("Kept"))
+    changed = write(library / "Band" / "Album" / "changed.mp3", tag=id3v1("Old title"))
+    removed = write(library / "Band" / "Album" / "removed.flac")
+    write(library / "Band" / "Album" / "cover.jpg")
+    store = OfflineStore(str(tmp_path / "library.db"))
+    scanner = LibraryScanner(store, workers=2, batch_size=1)
+
+    first = scan(scanner, [library])
+    assert first.summary()['added'] == 3 and first.removed == []
+    assert {track['title'] for track in first.tracks} == {"Kept", "Old title", "removed"}
+    assert all('mtime' not in track and 'size' not in track for track in first.tracks)
+    assert set(store.local_file_state()) == {kept, changed, removed}
+
+    write(changed, tag=id3v1("New title"), audio=b'\xff\xfb' * 150)
+    os.remove(removed)
+    second = scan(scanner, [library])
+    assert (second.added, second.updated, second.unchanged) == (0, 1, 1)
+    assert [track['title'] for track in second.tracks] == ["New title"]
+    assert second.tracks[0]['id'] == local_track_id(changed)
+    assert second.removed == [local_track_id(removed)]
+    assert set(store.local_file_state()) == {kept, changed}
+    assert store.load_local_tracks()[local_track_id(changed)]['title'] == "New title"
+
+    third = scan(scanner, [library])
+    assert (third.added, third.updated, third.unchanged, third.tracks) == (0, 0, 2, [])
+    store.close()
+
+def test_nested_roots_are_walked_once_and_other_roots_are_left_alone(tmp_path):
+    outer = tmp_path / "music"
+    inner = outer / "Band"
+    elsewhere = tmp_path / "podcasts"
+    write(outer / "top.mp3")
+    write(inner / "Album" / "deep.ogg")
+    other = write(elsewhere / "show.mp3")
+    store = OfflineStore(str(tmp_path / "library.db"))
+    scanner = LibraryScanner(store, workers=1)
+
+    result = scan(scanner, [inner, outer, str(outer) + os.sep])
+    assert result.added == 2 and len(result.tracks) == 2
+    scan(scanner, [elsewhere])
+    # Rescanning one root doesn't count files under another root as removed
+    os.remove(other)
+    result = scan(scanner, [outer])
+    assert (result.unchanged, result.removed) == (2, [])
+    assert other in store.local_file_state()
+    assert scan(scanner, [elsewhere]).removed == [local_track_id(other)]
+    store.close()
+
+def test_id3v1_tags_are_read_without_mutagen(tmp_path, monkeypatch):
+    monkeypatch.setattr(library_scanner, 'mutagen', None)
+    path = write(tmp_path / "Folder Artist" / "Folder Album" / "01 - file.mp3",
+                 tag=id3v1("Tagged Title", "Tagged Artist", ""))
+    tags = read_tags(path)
+    assert (tags['title'], tags['artist']) == ("Tagged Title", "Tagged Artist")
+    # A blank tag field still falls back to the folder name
+    assert tags['album'] == "Folder Album"
+
+def test_untagged_files_fall_back_to_folder_names(tmp_path, monkeypatch):
+    monkeypatch.setattr(library_scanner, 'mutagen', None)
+    path = write(tmp_path / "Some Artist" / "Some Album" / "Track Name.mp3")
+    assert read_tags(path) == {'title': "Track Name", 'artist': "Some Artist", 'album': "Some Album"}
+    # A trailer that isn't an ID3v1 tag and a file too short to hold one are both ignored
+    garbled = write(tmp_path / "Some Artist" / "Some Album" / "Garbled.mp3", tag=b'TAX' + b'x' * 125)
+    assert read_tags(garbled)['title'] == "Garbled"
+    tiny = write(tmp_path / "Some Artist" / "Some Album" / "Tiny.mp3", audio=b'TAG')
+    assert read_tags(tiny)['artist'] == "Some Artist"
@@ -0,0 +1,70 @@
+import asyncio
+from player.music_player import MusicPlayer
+from utils.config import Config
+
+def make_player(tmp_path) -> MusicPlayer:
+    config = Config(str(tmp_path / "config.json"))
+    config.set('library_db', str(tmp_path / "library.db"))
+    config.set('prefetch_depth', 0)
+    return MusicPlayer(config)
+
+def test_auto_advance_skips_tracks_that_fail_to_load(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        player = make_player(tmp_path)
+        await player.offline_cache_loaded
+        player.queue.extend([{'id': 'a'}, {'id': 'b'}, {'id': 'c'}])
+        player.queue.next()  # 'a' is playing
+        switched = []
+
+        async def switch_to(track):
+            if track['id'] == 'b':
+                raise RuntimeError("cannot open stream")
+            switched.append(track['id'])
+        player.switch_to = switch_to
+        await player._advance()
+        assert switched == ['c']
+        assert player.queue.current['id'] == 'c'
+        player.offline_store.close()
+    asyncio.run(main())
+
+def test_auto_advance_gives_up_after_one_pass(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        player = make_player(tmp_path)
+        await player.offline_cache_loaded
+        player.queue.extend([{'id': 'a'}, {'id': 'b'}])
+        attempts = []
+
+        async def switch_to(track):
+            attempts.append(track['id'])
+            raise RuntimeError("offline")
+        player.switch_to = switch_to
+        await player._advance()
+        assert len(attempts) == 2
+        player.offline_store.close()
+    asyncio.run(main())
+
+def test_tracks_being_downloaded_are_protected_from_eviction(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        player = make_player(tmp_path)
+        await player.offline_cache_loaded
+        player.offline_ids['id_old'] = "Old Title"  # An earlier copy of the same track
+        seen = []
+
+        async def download(track_id, url, sha256=None):
+            seen.append(player._protected_offline())
+            path = tmp_path / f"{track_id}.mp3"
+            path.write_bytes(b"x" * 10)
+            return str(path)
+        player.download_manager.download = download
+        assert await player.download_track({'id': 'id_old', 'title': "New Title"})
+        assert seen == [{"New Title", "Old Title"}]
+        assert player._downloading == []
+        assert "New Title" in player.offline_manager
+        player.offline_store.close()
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import threading
+from player.offline_cache import OfflineCacheManager
+from utils.offline_store import OfflineStore
+
+def run(coro):
+    return asyncio.run(coro)
+
+class Library:
+    # Stands in for the player: the downloaded files plus the on_evict/protected callbacks
+    def __init__(self, tmp_path):
+        self.directory = tmp_path
+        self.store = OfflineStore(str(tmp_path / 'library.db'))
+        self.paths = {}
+        self.playing = set()
+
+    def download(self, title: str, size: int = 100) -> str:
+        path = str(self.directory / f"{title}.mp3")
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        self.paths[title] = path
+        self.store.put_track({'title': title, 'id': title, 'file_path': path, 'size': size})
+        return path
+
+    def forget(self, title: str):
+        return self.paths.pop(title, None)
+
+    def manager(self, quota, **kwargs) -> OfflineCacheManager:
+        return OfflineCacheManager(self.store, quota=quota, on_evict=self.forget,
+                                   protected=lambda: set(self.playing), **kwargs)
+
+async def drain(manager: OfflineCacheManager) -> None:
+    while manager._task is not None and not manager._task.done():
+        await manager._task
+
+def test_redownload_waits_for_eviction_of_the_same_track(tmp_path):
+    async def main():
+        library = Library(tmp_path)
+        manager = library.manager(quota=250)
+        release = threading.Event()
+        delete = manager._delete
+        manager._delete = lambda victims: (release.wait(5), delete(victims))
+        for title in ('a', 'b'):
+            manager.add(title, os.path.getsize(library.download(title)))
+        manager.add('c', os.path.getsize(library.download('c')))
+        await asyncio.sleep(0.01)
+        assert 'a' not in manager and 'a' not in library.paths  # Forgotten, file not yet deleted
+
+        settled = asyncio.ensure_future(manager.settle('a', str(tmp_path / 'a.mp3')))
+        await asyncio.sleep(0.01)
+        assert not settled.done()
+        release.set()
+        await settled
+        manager.add('a', os.path.getsize(library.download('a')))
+        await drain(manager)
+        # Re-adding 'a' pushed 'b' out instead, and the new copy of 'a' survived
+        assert os.path.exists(tmp_path / 'a.mp3') and library.store.get_track('a') is not None
+        assert not os.path.exists(tmp_path / 'b.mp3') and library.store.get_track('b') is None
+        assert not manager._deleting
+    run(main())
+
+def test_settle_returns_at_once_when_nothing_is_being_deleted(tmp_path):
+    async def main():
+        manager = Library(tmp_path).manager(quota=None)
+        await asyncio.wait_for(manager.settle('a', str(tmp_path / 'a.mp3')), 1)
+    run(main())
+
+def test_played_is_recorded_off_the_loop(tmp_path):
+    async def main():
+        library = Library(tmp_path)
+        manager = library.manager(quota=None)
+        manager.add('a', os.path.getsize(library.download('a')))
+        calls = []
+        manager.store.record_offline_play = lambda title: calls.append(threading.get_ident())
+        manager.played('a')
+        manager.played('unknown')
+        await asyncio.sleep(0.05)
+        assert len(calls) == 1 and calls[0] != threading.get_ident()
+    run(main())
+
+def test_eviction_converges_under_quota_for_every_policy(tmp_path):
+    async def main(policy):
+        os.makedirs(tmp_path / policy)
+        library = Library(tmp_path / policy)
+        manager = library.manager(quota=None, policy=policy)
+        for index in range(200):
+            manager.add(f"t{index}", os.path.getsize(library.download(f"t{index}", size=10 + index % 7)))
+            if index % 3 == 0:
+                manager.played(f"t{index}")
+        total = manager.used
+        manager.set_quota(total // 4)
+        await drain(manager)
+        assert 0 < manager.used <= total // 4
+        assert manager.used == sum(manager.sizes.values())
+        # Only the survivors keep their file and row
+        remaining = set(library.paths)
+        assert remaining == set(manager.sizes)
+        assert {title for title, *_ in library.store.load_usage()} == remaining
+        files = {name for name in os.listdir(library.directory) if name.endswith('.mp3')}
+        assert files == {f"{title}.mp3" for title in remaining}
+        assert manager.evictions == 200 - len(remaining)
+    for policy in ('lru', 'lfu', 'arc'):
+        run(main(policy))
+
+def test_pinned_and_protected_tracks_are_never_evicted(tmp_path):
+    async def main():
+        library = Library(tmp_path)
+        manager = library.manager(quota=None)
+        for title in 'abcd':
+            manager.add(title, os.path.getsize(library.download(title)))
+        assert manager.pin('a')
+        assert not manager.pin('missing')
+        library.playing.add('b')
+        manager.set_quota(150)
+        await drain(manager)
+        assert set(manager.sizes) == {'a', 'b'}
+        # Still over quota, but nothing left may go until the pin is lifted
+        assert manager.over_quota()
+        manager.pin('a', False)
+        await drain(manager)
+        assert set(manager.sizes) == {'b'} and not manager.over_quota()
+    run(main())
+
+def test_load_keeps_entries_added_while_it_reads(tmp_path):
+    async def main():
+        library = Library(tmp_path)
+        for title in ('a', 'b', 'd'):
+            library.download(title)
+        # An entry from before sizes were stored, whose file vanished since the last session...
+        library.store.put_track({'title': 'd', 'id': 'd', 'file_path': library.paths['d']})
+        os.remove(library.paths['d'])
+        manager = library.manager(quota=None)
+        release = threading.Event()
+        measure = manager._measure
+
+        def slow_measure(usage):
+            measured = measure(usage)
+            release.wait(5)
+            return measured
+        manager._measure = slow_measure
+        loading = asyncio.ensure_future(manager.load())
+        await asyncio.sleep(0.01)
+        manager.add('c', os.path.getsize(library.download('c', size=50)))
+        manager.add('d', os.path.getsize(library.download('d', size=70)))  # ...but downloaded again meanwhile
+        release.set()
+        await loading
+        assert manager.sizes == {'a': 100, 'b': 100, 'c': 50, 'd': 70}
+        assert manager.used == 320
+        assert 'd' in library.paths and library.store.get_track('d') is not None
+        assert drain_order(manager) == ['a', 'b', 'c', 'd']
+    run(main())
+
+def drain_order(manager: OfflineCacheManager):
+    order = []
+    while True:
+        title = manager.policy.candidate(set(order))
+        if title is None:
+            return order
+        order.append(title)
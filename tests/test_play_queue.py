@@ -0,0 +1,164 @@
+import random
+from player.play_queue import PlayQueue, REPEAT_ALL, REPEAT_ONE
+
+def tracks(count: int, prefix: str = 't'):
+    return [{'id': f"{prefix}{i}"} for i in range(count)]
+
+def make_queue(count: int, **kwargs) -> PlayQueue:
+    queue = PlayQueue(rng=random.Random(kwargs.pop('seed', 1)), **kwargs)
+    queue.extend(tracks(count))
+    return queue
+
+def drain(queue: PlayQueue):
+    played = []
+    while True:
+        track = queue.next()
+        if track is None:
+            return played
+        played.append(track['id'])
+
+def ids(count: int):
+    return [f"t{i}" for i in range(count)]
+
+def test_linear_order_and_previous():
+    queue = make_queue(5)
+    assert drain(queue) == ids(5)
+    assert queue.current['id'] == 't4'
+    assert queue.previous()['id'] == 't3'
+    assert queue.next()['id'] == 't4'
+
+def test_duplicates_are_ignored():
+    queue = make_queue(3)
+    assert not queue.enqueue({'id': 't1'})
+    assert len(queue) == 3
+
+def test_shuffle_passes_are_permutations():
+    for seed in range(20):
+        queue = make_queue(50, shuffle=True, repeat=REPEAT_ALL, seed=seed)
+        first = [queue.next()['id'] for _ in range(50)]
+        second = [queue.next()['id'] for _ in range(50)]
+        assert sorted(first) == sorted(ids(50))
+        assert sorted(second) == sorted(ids(50))
+
+def test_shuffle_actually_shuffles():
+    orders = {tuple(drain(make_queue(20, shuffle=True, seed=seed))) for seed in range(5)}
+    assert len(orders) > 1
+
+def test_peek_matches_what_next_plays():
+    queue = make_queue(30, shuffle=True, seed=3)
+    queue.next()
+    upcoming = [track['id'] for track in queue.peek(5)]
+    assert [queue.next()['id'] for _ in range(5)] == upcoming
+
+def test_removes_during_shuffle():
+    rng = random.Random(5)
+    for seed in range(20):
+        queue = make_queue(100, shuffle=True, seed=seed)
+        played = [queue.next()['id'] for _ in range(30)]
+        unplayed = sorted(set(ids(100)) - set(played))
+        removed = set(rng.sample(unplayed, 40))
+        for track_id in removed:
+            assert queue.remove(track_id)
+        rest = drain(queue)
+        assert sorted(rest) == sorted(set(unplayed) - removed)
+        assert not removed & set(rest)
+
+def test_remove_current_moves_on():
+    queue = make_queue(5)
+    queue.next()
+    queue.next()
+    queue.remove('t1')
+    assert queue.current is None
+    assert queue.next()['id'] == 't2'
+
+def test_compaction_keeps_current_position():
+    queue = make_queue(200)
+    for _ in range(151):
+        queue.next()
+    assert queue.current['id'] == 't150'
+    removed = [f"t{i}" for i in range(200) if i % 3 and i != 150]  # Enough tombstones to compact
+    for track_id in removed:
+        queue.remove(track_id)
+    assert len(queue._entries) < 200  # Compacted
+    assert queue.current['id'] == 't150'
+    assert queue.next()['id'] == 't153'
+    assert queue.previous()['id'] == 't150'
+    assert queue.previous()['id'] == 't147'
+
+def test_compaction_after_removing_current_moves_on_the_same_way():
+    def play_and_remove(compact: bool) -> PlayQueue:
+        queue = make_queue(200)
+        for _ in range(151):
+            queue.next()
+        queue.remove('t150')
+        if compact:
+            for i in range(200):
+                if i % 3 and i not in (149, 151):
+                    queue.remove(f"t{i}")
+            assert len(queue._entries) < 200
+        return queue
+    for compact in (False, True):
+        queue = play_and_remove(compact)
+        assert queue.current is None
+        assert queue.peek_previous()['id'] == 't149'
+        assert queue.peek(1)[0]['id'] == 't151'
+        assert queue.previous()['id'] == 't149'
+        queue = play_and_remove(compact)
+        assert queue.next()['id'] == 't151'
+        assert queue.previous()['id'] == 't149'
+
+def test_compaction_during_shuffle_keeps_pass_intact():
+    for seed in range(10):
+        queue = make_queue(300, shuffle=True, seed=seed)
+        played = [queue.next()['id'] for _ in range(40)]
+        current = played[-1]
+        unplayed = [track_id for track_id in ids(300) if track_id not in set(played)]
+        removed = {track_id for i, track_id in enumerate(unplayed) if i % 3}
+        for track_id in removed:
+            queue.remove(track_id)
+        assert len(queue._entries) < 300
+        assert queue.current['id'] == current
+        assert queue.peek_previous()['id'] == played[-2]
+        rest = drain(queue)
+        assert sorted(rest) == sorted(set(unplayed) - removed)
+
+def test_jump_to_linear():
+    queue = make_queue(10)
+    queue.next()
+    assert queue.jump_to('t6')['id'] == 't6'
+    assert queue.current['id'] == 't6'
+    assert queue.next()['id'] == 't7'
+    assert queue.jump_to('missing') is None
+
+def test_jump_to_during_shuffle_keeps_pass_a_permutation():
+    for seed in range(10):
+        queue = make_queue(40, shuffle=True, seed=seed)
+        played = [queue.next()['id'] for _ in range(5)]
+        target = next(track_id for track_id in ids(40) if track_id not in played)
+        assert queue.jump_to(target)['id'] == target
+        rest = drain(queue)
+        assert sorted(played + [target] + rest) == sorted(ids(40))
+
+def test_toggling_shuffle_keeps_current():
+    queue = make_queue(20)
+    for _ in range(5):
+        queue.next()
+    queue.shuffle = True
+    assert queue.current['id'] == 't4'
+    queue.shuffle = False
+    assert queue.current['id'] == 't4'
+    assert queue.next()['id'] == 't5'
+
+def test_repeat_one():
+    queue = make_queue(3, repeat=REPEAT_ONE)
+    queue.next()
+    assert queue.next()['id'] == 't0'
+
+def test_max_size_trims_oldest_but_not_current():
+    queue = PlayQueue(max_size=5)
+    queue.extend(tracks(3))
+    queue.next()  # t0 playing
+    queue.extend(tracks(5, prefix='u'))
+    assert len(queue) == 5
+    assert 't0' in queue
+    assert 't1' not in queue and 't2' not in queue
@@ -0,0 +1,55 @@
+import asyncio
+from player.playback_state import PlaybackState, PLAYING, STOPPED
+
+def make_state(min_interval: float = 0.05):
+    state = PlaybackState(min_interval=min_interval)
+    state._loop = asyncio.get_running_loop()  # What attach() does, without a libVLC player
+    positions = []
+    state.position_listeners.append(positions.append)
+    return state, positions
+
+def test_burst_is_throttled_with_trailing_update():
+    async def main():
+        state, positions = make_state()
+        for position in (0.10, 0.11, 0.12, 0.13):
+            state._set_position(position)
+        assert positions == [0.10]
+        await asyncio.sleep(0.1)
+        assert positions == [0.10, 0.13]
+        await asyncio.sleep(0.1)
+        assert positions == [0.10, 0.13]  # Nothing new, nothing re-sent
+    asyncio.run(main())
+
+def test_same_percent_is_not_repainted():
+    async def main():
+        state, positions = make_state(min_interval=0)
+        state._set_position(0.501)
+        state._set_position(0.505)
+        assert positions == [0.501]
+    asyncio.run(main())
+
+def test_end_resets_position_immediately():
+    async def main():
+        state, positions = make_state(min_interval=10)
+        states, ended = [], []
+        state.state_listeners.append(states.append)
+        state.end_listeners.append(lambda: ended.append(True))
+        state._set_state(PLAYING)
+        state._set_position(0.98)
+        state._set_position(0.99)  # Throttled
+        state._set_state('ended')
+        assert positions == [0.98, 0.0]
+        assert states == [PLAYING, STOPPED] and ended == [True]
+        await asyncio.sleep(0)
+        assert state._trailing is None
+    asyncio.run(main())
+
+def test_hidden_ui_gets_caught_up_on_show():
+    async def main():
+        state, positions = make_state(min_interval=0)
+        state.set_ui_active(False)
+        state._set_position(0.4)
+        assert positions == []
+        state.set_ui_active(True)
+        assert positions == [0.4]
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from player.prefetcher import MediaPrefetcher
+
+def slow_prepare(delay: float = 0.05):
+    async def prepare(track):
+        await asyncio.sleep(delay)
+        return f"media:{track['id']}"
+    return prepare
+
+def test_take_returns_prepared_media():
+    async def main():
+        prefetcher = MediaPrefetcher(slow_prepare())
+        prefetcher.schedule([{'id': 'a'}])
+        assert await prefetcher.take({'id': 'a'}) == "media:a"
+        assert await prefetcher.take({'id': 'b'}) is None
+        assert (prefetcher.hits, prefetcher.misses) == (1, 1)
+    asyncio.run(main())
+
+def test_cleared_prefetch_falls_back_to_none():
+    async def main():
+        prefetcher = MediaPrefetcher(slow_prepare())
+        prefetcher.schedule([{'id': 'a'}])
+        task = prefetcher._pending['a']
+        take = asyncio.ensure_future(prefetcher.take({'id': 'a'}))
+        await asyncio.sleep(0)
+        task.cancel()  # As clear() does when switching to offline mode
+        assert await take is None
+    asyncio.run(main())
+
+def test_caller_cancellation_is_not_swallowed():
+    async def main():
+        prefetcher = MediaPrefetcher(slow_prepare(1.0))
+        prefetcher.schedule([{'id': 'a'}])
+        task = prefetcher._pending['a']
+        take = asyncio.ensure_future(prefetcher.take({'id': 'a'}))
+        await asyncio.sleep(0.01)
+        take.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await take
+        await asyncio.sleep(0)
+        assert task.cancelled()
+    asyncio.run(main())
+
+def test_failed_prefetch_returns_none():
+    async def main():
+        async def broken(track):
+            raise RuntimeError("no such stream")
+        prefetcher = MediaPrefetcher(broken)
+        prefetcher.schedule([{'id': 'a'}])
+        assert await prefetcher.take({'id': 'a'}) is None
+    asyncio.run(main())
@@ -0,0 +1,189 @@
+import asyncio
+import threading
+from api.cached_api import cached_api
+from player.ann_index import IVFIndex
+from player.content_recommender import ContentRecommender
+from player.incremental_model import IncrementalModel
+from player.recommendation_engine import RecommendationEngine
+
+def make_tracks():
+    tracks = []
+    for genre in ("rock", "jazz"):
+        for i in range(10):
+            tracks.append({'id': f"{genre}_{i}", 'title': f"{genre} {i}", 'genre': genre,
+                           'artist': f"{genre} band {i % 3}", 'album': f"{genre} album", 'duration': 200})
+    return tracks
+
+def make_engine(**kwargs) -> RecommendationEngine:
+    engine = RecommendationEngine(local=True, **kwargs)
+    engine.build_local_model(make_tracks())
+    return engine
+
+def recommend(engine: RecommendationEngine, history, limit: int = 5):
+    return asyncio.run(engine.get_recommendations(history, limit))
+
+def genres(tracks):
+    return [track['genre'] for track in tracks]
+
+def test_plays_steer_recommendations():
+    engine = make_engine()
+    for i in range(4):
+        engine.record_event('play', {'id': f"jazz_{i}"})
+    history = [{'id': f"jazz_{i}"} for i in range(4)]
+    assert genres(recommend(engine, history)) == ["jazz"] * 5
+
+    for i in range(6):
+        engine.record_event('play', {'id': f"rock_{i}"})
+    history += [{'id': f"rock_{i}"} for i in range(6)]
+    assert genres(recommend(engine, history, 3)) == ["rock"] * 3
+
+def test_skip_changes_next_recommendation():
+    engine = make_engine()
+    engine.record_event('play', {'id': "rock_0"})
+    engine.record_event('play', {'id': "jazz_0"})
+    history = [{'id': "rock_0"}, {'id': "jazz_0"}]
+    before = recommend(engine, history, 1)
+    assert genres(before) == ["jazz"]  # Most recent play weighs more
+
+    engine.record_event('skip', {'id': "jazz_1"})
+    after = recommend(engine, history, 1)
+    assert genres(after) == ["rock"]
+
+def test_cooccurring_tracks_are_boosted():
+    engine = make_engine()
+    for _ in range(3):
+        engine.record_event('play', {'id': "rock_0"})
+        engine.record_event('play', {'id': "jazz_9"})
+    engine.record_event('play', {'id': "rock_0"})
+    ids = [track['id'] for track in recommend(engine, [{'id': "rock_0"}], 10)]
+    assert "jazz_9" in ids
+
+def test_prepare_persists_and_reuses_model(tmp_path, monkeypatch):
+    model_file = str(tmp_path / "model.npz")
+    engine = RecommendationEngine(local=True, model_file=model_file)
+    asyncio.run(engine.prepare(make_tracks()))
+    assert len(engine.content_model) == 20
+
+    def no_build(self, tracks):
+        raise AssertionError("model should have been loaded from disk")
+    monkeypatch.setattr(ContentRecommender, 'build', no_build)
+    reloaded = RecommendationEngine(local=True, model_file=model_file)
+    asyncio.run(reloaded.prepare(make_tracks()))
+    assert reloaded.content_model.track_ids == engine.content_model.track_ids
+    reloaded.record_event('play', {'id': "jazz_0"})
+    assert genres(recommend(reloaded, [{'id': "jazz_0"}], 3)) == ["jazz"] * 3
+
+    monkeypatch.undo()
+    changed = make_tracks()[:-1]
+    asyncio.run(reloaded.prepare(changed))
+    assert len(reloaded.content_model) == 19
+
+class FakeDetails:
+    # Stands in for cached_api.get_tracks_details and records batch sizes and peak concurrency
+    def __init__(self, tracks):
+        self.by_id = {track['id']: track for track in tracks}
+        self.batches = []
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, track_ids):
+        self.batches.append(len(track_ids))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return [self.by_id.get(track_id) for track_id in track_ids]
+
+def test_train_model_fetches_in_bounded_chunks(monkeypatch):
+    tracks = make_tracks()
+    details = FakeDetails(tracks)
+    monkeypatch.setattr(cached_api, 'get_tracks_details', details)
+    engine = RecommendationEngine(local=True, chunk_size=3, max_concurrency=2)
+    progress = []
+    training = tracks + tracks[:5] + [{'id': "unknown"}]  # Duplicates are fetched once
+    asyncio.run(engine.train_model(training, lambda done, total: progress.append((done, total))))
+    assert details.batches == [3] * 7
+    assert details.peak == 2
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+    assert progress[-1] == (21, 21)
+    assert set(engine.track_features) == {track['id'] for track in tracks}
+    assert engine.track_features["jazz_3"]['genre'] == "jazz"
+    assert len(engine.content_model) == 20
+
+def test_train_model_keeps_prepared_catalog_model(monkeypatch):
+    tracks = make_tracks()
+    monkeypatch.setattr(cached_api, 'get_tracks_details', FakeDetails(tracks))
+    engine = RecommendationEngine(local=True)
+    asyncio.run(engine.prepare(tracks))
+    model = engine.content_model
+    asyncio.run(engine.train_model(tracks[:4]))
+    assert engine.content_model is model and len(model) == 20
+    assert len(engine.track_features) == 4
+
+def test_events_recorded_while_state_loads_are_kept(tmp_path, monkeypatch):
+    state_file = str(tmp_path / "state.json")
+    saved = make_engine(state_file=state_file)
+    for i in range(3):
+        saved.record_event('play', {'id': f"jazz_{i}"})
+    saved.save_state()
+
+    release = threading.Event()
+    load = IncrementalModel.load
+    monkeypatch.setattr(IncrementalModel, 'load', lambda self, path: release.wait(5) and load(self, path))
+
+    async def main():
+        engine = make_engine(state_file=state_file)
+        loading = asyncio.ensure_future(engine.load_state())
+        await asyncio.sleep(0.01)
+        before = engine.incremental_model
+        engine.record_event('play', {'id': "rock_0"})  # Played before the history was read
+        release.set()
+        await loading
+        assert engine.incremental_model is not before
+        return engine
+    engine = asyncio.run(main())
+    assert list(engine.incremental_model.recent) == [('play', "jazz_0"), ('play', "jazz_1"), ('play', "jazz_2"), ('play', "rock_0")]
+    assert "rock_0" in engine.incremental_model.cooccurrence["jazz_2"]
+    assert engine._pending_events is None
+    engine.record_event('play', {'id': "rock_1"})
+    assert engine.incremental_model.recent[-1] == ('play', "rock_1")
+
+def test_missing_state_file_keeps_current_model(tmp_path):
+    engine = make_engine(state_file=str(tmp_path / "absent.json"))
+    engine.record_event('play', {'id': "rock_0"})
+    asyncio.run(engine.load_state())
+    assert list(engine.incremental_model.recent) == [('play', "rock_0")]
+
+def test_similar_tracks_builds_persists_and_reuses_index(tmp_path, monkeypatch):
+    index_dir = str(tmp_path / "index")
+    engine = make_engine(index_dir=index_dir)
+    similar = asyncio.run(engine.similar_tracks("jazz_0", 5))
+    assert len(similar) == 5 and genres(similar) == ["jazz"] * 5
+    assert "jazz_0" not in [track['id'] for track in similar]
+    assert asyncio.run(engine.similar_tracks("unknown")) == []
+
+    def no_build(self, ids, vectors, **kwargs):
+        raise AssertionError("index should have been loaded from disk")
+    monkeypatch.setattr(IVFIndex, 'build', no_build)
+    reloaded = make_engine(index_dir=index_dir)
+    assert asyncio.run(reloaded.similar_tracks("jazz_0", 5)) == similar
+    monkeypatch.undo()
+
+    # A different catalog makes the saved index stale
+    reloaded.build_local_model(make_tracks()[:15])
+    assert asyncio.run(reloaded.similar_tracks("rock_0", 20))[-1]['id'].startswith("jazz")
+    assert len(IVFIndex.load(index_dir)) == 15
+
+def test_concurrent_similar_requests_share_one_build(monkeypatch):
+    builds = []
+    build = RecommendationEngine.build_similarity_index
+    monkeypatch.setattr(RecommendationEngine, 'build_similarity_index',
+                        lambda self, model, path=None: builds.append(model) or build(self, model, path))
+    engine = make_engine()
+
+    async def main():
+        return await asyncio.gather(*(engine.similar_tracks(f"rock_{i}", 3) for i in range(4)))
+    results = asyncio.run(main())
+    assert len(builds) == 1 and all(genres(result) == ["rock"] * 3 for result in results)
+    asyncio.run(engine.similar_tracks("rock_0", 3))
+    assert len(builds) == 1 and engine._similarity_build is None
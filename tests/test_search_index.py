@@ -0,0 +1,74 @@
+import random
+from utils.search_index import DEFAULT_FIELDS, SearchIndex, tokenize
+
+WORDS = ["sample", "song", "sun", "summer", "night", "nine", "blue", "blues", "red", "road"]
+
+def make_track(rng: random.Random, i: int) -> dict:
+    # Numbered words give short prefixes like "s" or "1" hundreds of vocabulary matches
+    return {'title': f"{rng.choice(WORDS)} s{rng.randint(0, 400)} {i}",
+            'artist': f"{rng.choice(WORDS)} {rng.randint(1, 300)}",
+            'album': rng.choice(WORDS)}
+
+def linear_search(tracks: list, query: str, limit: int) -> list:
+    terms = tokenize(query)
+    scored = []
+    for doc, track in enumerate(tracks):
+        weights = {}
+        for field, weight in DEFAULT_FIELDS.items():
+            for token in tokenize(track[field]):
+                weights[token] = max(weights.get(token, 0.0), weight)
+        score = 0.0
+        for term in terms:
+            if term in weights:
+                score += weights[term] * 2
+            else:
+                prefix = [weight for token, weight in weights.items() if token.startswith(term)]
+                if not prefix:
+                    break
+                score += max(prefix)
+        else:
+            scored.append((-score, doc))
+    return [tracks[doc]['id'] for _, doc in sorted(scored)[:limit]]
+
+def build(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    tracks = [dict(make_track(rng, i), id=f"t{i}") for i in range(count)]
+    index = SearchIndex()
+    index.add_many((track['id'], track) for track in tracks)
+    return tracks, index
+
+def test_short_prefixes_match_linear_scan():
+    tracks, index = build(3000)
+    for query in ["s", "1", "s1", "su", "n", "blue", "blues 2", "s 1", "sample s3", "r r", "9"]:
+        for limit in (1, 10, 200):
+            assert index.search(query, limit) == linear_search(tracks, query, limit), (query, limit)
+
+def test_random_queries_match_linear_scan():
+    tracks, index = build(1500, seed=3)
+    rng = random.Random(11)
+    for _ in range(200):
+        track = rng.choice(tracks)
+        tokens = tokenize(f"{track['title']} {track['artist']} {track['album']}")
+        query = ' '.join(token[:rng.randint(1, len(token))] for token in rng.sample(tokens, rng.randint(1, 3)))
+        assert index.search(query, 20) == linear_search(tracks, query, 20), query
+
+def test_removed_tracks_are_not_returned():
+    tracks, index = build(500)
+    for track in tracks[::2]:
+        index.remove(track['id'])
+    kept = tracks[1::2]
+    for query in ["s", "blue", "2"]:
+        assert index.search(query, 50) == linear_search(kept, query, 50)
+
+def test_no_match():
+    _, index = build(100)
+    assert index.search("zzz") == []
+    assert index.search("") == []
+
+def test_clear_starts_over():
+    tracks, index = build(300)
+    index.clear()
+    assert len(index) == 0 and index.search("s", 10) == []
+    index.add_many((track['id'], track) for track in tracks)
+    assert index._next_doc == len(tracks)
+    assert index.search("s1", 20) == linear_search(tracks, "s1", 20)
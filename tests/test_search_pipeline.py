@@ -0,0 +1,43 @@
+import asyncio
+from ui.search_pipeline import SearchPipeline
+
+class FlakySearch:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self, query: str):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("network blip")
+        return [{'id': 'track_1', 'title': query}]
+
+def make_pipeline(search):
+    results, errors = [], []
+
+    async def recommend():
+        pass
+    pipeline = SearchPipeline(search, recommend, results.append, errors.append, debounce=0)
+    return pipeline, results, errors
+
+def test_failed_search_is_not_cached():
+    async def run():
+        search = FlakySearch(failures=1)
+        pipeline, results, errors = make_pipeline(search)
+        await pipeline.submit("sample")
+        assert len(errors) == 1 and results == []
+        assert "sample" not in pipeline.cache
+        await pipeline.submit("sample")
+        assert search.calls == 2
+        assert results == [[{'id': 'track_1', 'title': 'sample'}]]
+    asyncio.run(run())
+
+def test_successful_search_is_served_from_cache():
+    async def run():
+        search = FlakySearch(failures=0)
+        pipeline, results, _ = make_pipeline(search)
+        await pipeline.submit("Sample ")
+        await pipeline.submit("sample")
+        assert search.calls == 1
+        assert len(results) == 2
+    asyncio.run(run())
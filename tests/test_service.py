@@ -0,0 +1,124 @@
+import asyncio
+import io
+import json
+import argparse
+from cli import run as run_cli
+from player.service import PlayerService
+from utils.config import Config
+
+def make_tracks():
+    return [{'id': f"{genre}_{i}", 'title': f"{genre} {i}", 'genre': genre, 'artist': f"{genre} band {i % 3}",
+             'album': f"{genre} album", 'duration': 200}
+            for genre in ("rock", "classical") for i in range(10)]
+
+def write_config(tmp_path) -> str:
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({'library_db': str(tmp_path / "library.db"),
+                                'recommendation_state_file': str(tmp_path / "state.json"),
+                                'recommendation_model_file': str(tmp_path / "model.npz"),
+                                'recommendation_index_dir': str(tmp_path / "index"),
+                                'metrics_file': str(tmp_path / "metrics.json")}))
+    return str(path)
+
+async def make_service(tmp_path) -> PlayerService:
+    config = Config(write_config(tmp_path))
+    await config.load()
+    service = PlayerService(config, playback=False)
+    await service.music_player.offline_cache_loaded
+    service.recommendation_engine.build_local_model(make_tracks())
+    return service
+
+def genres(tracks):
+    return {track['genre'] for track in tracks}
+
+def test_seeded_recommendations_ignore_session_plays(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        service = await make_service(tmp_path)
+        for i in range(5):
+            track = {'id': f"rock_{i}", 'title': f"rock {i}"}
+            service.music_player.play_history.append(track)
+            service.recommendation_engine.record_event('play', track)
+        seeded = await service.handle({'id': 1, 'cmd': 'recommend', 'track_id': "classical_0", 'limit': 5})
+        assert seeded['ok'] and seeded['id'] == 1
+        assert genres(seeded['result']) == {"classical"}
+        assert "classical_0" not in [track['id'] for track in seeded['result']]
+        session = await service.handle({'cmd': 'recommend', 'limit': 3})
+        assert genres(session['result']) == {"rock"}
+        await service.close()
+    asyncio.run(main())
+
+def test_similar_command(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        service = await make_service(tmp_path)
+        response = await service.handle({'cmd': 'similar', 'track_id': "classical_3", 'limit': 4})
+        assert response['ok'] and len(response['result']) == 4
+        assert genres(response['result']) == {"classical"}
+        assert not (await service.handle({'cmd': 'similar'}))['ok']
+        assert (tmp_path / "index" / "meta.json").exists()
+        await service.close()
+    asyncio.run(main())
+
+def test_seed_outside_the_local_model_falls_back_to_the_api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        service = await make_service(tmp_path)
+        calls = []
+
+        async def get_recommendations(track_id, limit):
+            calls.append((track_id, limit))
+            return [{'id': "remote"}]
+        monkeypatch.setattr('player.recommendation_engine.cached_api.get_recommendations', get_recommendations)
+        response = await service.handle({'cmd': 'recommend', 'track_id': "unknown", 'limit': 2})
+        assert response['result'] == [{'id': "remote"}] and calls == [("unknown", 2)]
+        await service.close()
+    asyncio.run(main())
+
+def test_command_errors_are_reported_not_raised(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        service = await make_service(tmp_path)
+        assert await service.handle({'id': 7, 'cmd': 'nope'}) == {'cmd': 'nope', 'id': 7, 'ok': False, 'error': "Unknown command: nope"}
+        assert not (await service.handle({'cmd': 'search'}))['ok']
+        for bad in (-1, 1.5, True, "10"):
+            assert not (await service.handle({'cmd': 'quota', 'bytes': bad}))['ok']
+        quota = await service.handle({'cmd': 'quota', 'bytes': 1000})
+        assert quota['ok'] and quota['result']['quota'] == 1000
+        assert service.config.get('offline_cache_quota') == 1000
+        assert (await service.handle({'cmd': 'quota', 'bytes': None}))['result']['quota'] is None
+        assert (await service.handle({'cmd': 'pin', 'titles': ["not downloaded"]}))['result'] == {"not downloaded": False}
+        await service.close()
+    asyncio.run(main())
+
+def cli_args(tmp_path) -> argparse.Namespace:
+    return argparse.Namespace(config=write_config(tmp_path), offline=False, playback=False, debug=False)
+
+def test_cli_answers_each_line(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = io.StringIO('# comment\n\n{"id": 1, "cmd": "search", "query": "Sample Track 1", "limit": 2}\n'
+                         '{"id": 2, "cmd": "stats"}\n')
+    out = io.StringIO()
+    assert asyncio.run(run_cli(cli_args(tmp_path), source, out)) == 0
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [response['id'] for response in responses] == [1, 2]
+    assert all(response['ok'] for response in responses)
+    assert len(responses[0]['result']) == 2
+    assert 'queue_length' in responses[1]['result']
+    # close() saved the listening history it read at start-up
+    assert (tmp_path / "state.json").exists()
+
+def test_cli_reports_bad_lines_and_exits_nonzero(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = io.StringIO('not json\n[1, 2]\n{"id": 3, "cmd": "nope"}\n{"id": 4, "cmd": "quota"}\n')
+    out = io.StringIO()
+    assert asyncio.run(run_cli(cli_args(tmp_path), source, out)) == 1
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [response['ok'] for response in responses] == [False, False, False, True]
+    assert responses[0]['error'].startswith("Invalid command")
+    assert "JSON object" in responses[1]['error']
+    assert responses[2] == {'cmd': 'nope', 'id': 3, 'ok': False, 'error': "Unknown command: nope"}
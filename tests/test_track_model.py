@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+
+pytest.importorskip("PyQt6.QtCore")
+from PyQt6.QtCore import QModelIndex
+from ui.track_model import TrackListModel
+
+def make_tracks(start: int, count: int):
+    return [{'id': f"t{i}", 'title': f"Track {i}"} for i in range(start, start + count)]
+
+def test_set_items_does_not_alias_callers_list():
+    cached = make_tracks(0, 3)
+    model = TrackListModel(batch_size=2)
+    model.set_items(cached)
+    model.append_items(make_tracks(3, 2))
+    assert len(cached) == 3
+    cached.append({'id': 'x', 'title': 'X'})
+    model.fetchMore(QModelIndex())
+    assert [model.item_at(row)['id'] for row in range(model.rowCount())] == ['t0', 't1', 't2', 't3']
+
+def test_rows_are_exposed_in_batches():
+    model = TrackListModel(batch_size=10)
+    model.set_items(make_tracks(0, 25))
+    assert model.rowCount() == 10
+    while model.canFetchMore(QModelIndex()):
+        model.fetchMore(QModelIndex())
+    assert model.rowCount() == 25
+
+def test_pages_are_fetched_until_a_short_page():
+    async def main():
+        requests = []
+
+        async def fetch_page(offset, limit):
+            requests.append((offset, limit))
+            return make_tracks(offset, min(limit, 25 - offset))
+        model = TrackListModel(batch_size=10)
+        model.set_items(await fetch_page(0, 10), fetch_page=fetch_page)
+        while model.canFetchMore(QModelIndex()):
+            model.fetchMore(QModelIndex())
+            await asyncio.sleep(0)
+        assert model.rowCount() == 25
+        assert requests == [(0, 10), (10, 10), (20, 10)]
+    asyncio.run(main())
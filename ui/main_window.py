@@ -1,13 +1,16 @@
 from PyQt6.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, 
-                             QListWidget, QLineEdit, QWidget, QLabel, QSlider, 
+                             QListView, QLineEdit, QWidget, QLabel, QSlider, 
                              QSplitter, QTreeWidget, QTreeWidgetItem, QMessageBox,
-                             QInputDialog, QProgressBar)
-from PyQt6.QtCore import Qt, QSize, QTimer, pyqtSignal
+                             QInputDialog, QProgressBar, QFileDialog)
+from PyQt6.QtCore import Qt, QSize, QTimer, QModelIndex, pyqtSignal
 from PyQt6.QtGui import QIcon
-from player.music_player import MusicPlayer
-from player.recommendation_engine import RecommendationEngine
-from api.sample_api import sample_api
+from qasync import asyncSlot
+from player.service import PlayerService
+from api.cached_api import cached_api
 from utils.config import Config
+from ui.search_pipeline import SearchPipeline
+from ui.track_model import TrackListModel
+from player.playback_state import PLAYING
 import asyncio
 
 class MainWindow(QMainWindow):
@@ -20,20 +23,26 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 1200, 800)
         self.load_stylesheet()
 
-        self.music_player = MusicPlayer(self.config)
-        self.recommendation_engine = RecommendationEngine()
+        self.service = PlayerService(self.config)
+        self.music_player = self.service.music_player
+        self.recommendation_engine = self.service.recommendation_engine
+        self.search_pipeline = SearchPipeline(
+            search=self.music_player.search,
+            recommend=self.update_recommendations,
+            on_results=self.show_search_results,
+            on_error=self.show_search_error,
+        )
 
         self.setup_ui()
         self.setup_connections()
 
         # Sleep timer
         self.sleep_timer = QTimer()
-        self.sleep_timer.timeout.connect(self.music_player.stop)
+        self.sleep_timer.timeout.connect(self.stop_playback)
 
-        # Update progress bar
-        self.progress_timer = QTimer()
-        self.progress_timer.timeout.connect(self.update_progress_bar)
-        self.progress_timer.start(1000)  # Update every second
+        # Progress and play state follow libVLC events instead of polling
+        self.music_player.playback.position_listeners.append(self.update_progress_bar)
+        self.music_player.playback.state_listeners.append(self.update_play_state)
 
     def load_stylesheet(self) -> None:
         with open("assets/style.qss", "r") as f:
@@ -81,9 +90,13 @@ class MainWindow(QMainWindow):
         browse = QTreeWidgetItem(self.library_tree, ["Browse"])
         radio = QTreeWidgetItem(self.library_tree, ["Radio"])
         playlists = QTreeWidgetItem(self.library_tree, ["Playlists"])
-        self.library_tree.addTopLevelItems([home, browse, radio, playlists])
+        local_files = QTreeWidgetItem(self.library_tree, ["Local Files"])
+        self.library_tree.addTopLevelItems([home, browse, radio, playlists, local_files])
         left_sidebar.addWidget(self.library_tree)
 
+        self.add_folder_button = QPushButton("Add Folder...")
+        left_sidebar.addWidget(self.add_folder_button)
+
         return left_sidebar
 
     def create_main_content(self) -> QVBoxLayout:
@@ -91,11 +104,17 @@ class MainWindow(QMainWindow):
         self.content_label = QLabel("Your Library")
         main_content.addWidget(self.content_label)
 
-        self.playlist = QListWidget()
+        self.playlist_model = TrackListModel(parent=self)
+        self.playlist = QListView()
+        self.playlist.setUniformItemSizes(True)
+        self.playlist.setModel(self.playlist_model)
         main_content.addWidget(self.playlist)
 
         # Recommendations
-        self.recommendations = QListWidget()
+        self.recommendations_model = TrackListModel(parent=self)
+        self.recommendations = QListView()
+        self.recommendations.setUniformItemSizes(True)
+        self.recommendations.setModel(self.recommendations_model)
         main_content.addWidget(QLabel("Recommendations:"))
         main_content.addWidget(self.recommendations)
 
@@ -137,42 +156,61 @@ class MainWindow(QMainWindow):
 
     def setup_connections(self) -> None:
         self.search_bar.returnPressed.connect(self.search_music)
+        self.search_bar.textChanged.connect(self.search_music)
         self.library_tree.itemClicked.connect(self.handle_tree_item_click)
-        self.playlist.itemDoubleClicked.connect(self.play_selected)
-        self.recommendations.itemDoubleClicked.connect(self.play_recommended)
+        self.add_folder_button.clicked.connect(self.add_library_folder)
+        self.playlist.doubleClicked.connect(self.play_selected)
+        self.recommendations.doubleClicked.connect(self.play_recommended)
         self.play_button.clicked.connect(self.toggle_play_pause)
-        self.next_button.clicked.connect(self.music_player.next_track)
-        self.prev_button.clicked.connect(self.music_player.previous_track)
+        self.next_button.clicked.connect(self.next_track)
+        self.prev_button.clicked.connect(self.previous_track)
         self.sleep_timer_button.clicked.connect(self.set_sleep_timer)
         self.offline_mode_button.clicked.connect(self.toggle_offline_mode)
-        self.volume_slider.valueChanged.connect(self.music_player.set_volume)
+        self.volume_slider.valueChanged.connect(self.set_volume)
         self.update_progress.connect(self.progress_bar.setValue)
-
-    async def search_music(self) -> None:
-        query = self.search_bar.text()
-        try:
-            results = await self.music_player.search(query)
-            self.playlist.clear()
-            for result in results:
-                self.playlist.addItem(result['title'])
-            await self.update_recommendations()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An error occurred while searching: {str(e)}")
-
-    async def play_selected(self, item) -> None:
-        title = item.text()
+        self.music_player.download_manager.add_progress_listener(self.show_download_progress)
+
+    def search_music(self) -> None:
+        self.search_pipeline.submit(self.search_bar.text())
+
+    def show_search_results(self, results) -> None:
+        self.playlist_model.set_items(results)
+
+    def show_search_error(self, e: Exception) -> None:
+        QMessageBox.critical(self, "Error", f"An error occurred while searching: {str(e)}")
+
+    @asyncSlot(QModelIndex)
+    async def play_selected(self, index) -> None:
+        item = self.playlist_model.item_at(index.row())
+        if item is None:
+            return
+        if self.playlist_model.kind == 'playlist':
+            self.content_label.setText(item['name'])
+            await self.show_pages(lambda offset, limit: cached_api.get_playlist_tracks(item['id'], offset, limit))
+            return
+        if self.playlist_model.kind == 'genre':
+            self.content_label.setText(item['name'])
+            await self.show_pages(lambda offset, limit: cached_api.get_genre_tracks(item['id'], offset, limit))
+            return
+        if self.playlist_model.kind != 'track':
+            return
+        title = item['title']
         try:
-            await self.music_player.play_title(title)
+            await self.music_player.play_track(item['id'])
             self.now_playing.setText(f"Now Playing: {title}")
             await self.update_recommendations()
             self.play_button.setIcon(QIcon("assets/pause_icon.png"))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred while playing the selected track: {str(e)}")
 
-    async def play_recommended(self, item) -> None:
-        title = item.text()
+    @asyncSlot(QModelIndex)
+    async def play_recommended(self, index) -> None:
+        item = self.recommendations_model.item_at(index.row())
+        if item is None:
+            return
+        title = item['title']
         try:
-            await self.music_player.play_title(title)
+            await self.music_player.play_track(item['id'])
             self.now_playing.setText(f"Now Playing: {title}")
             self.play_button.setIcon(QIcon("assets/pause_icon.png"))
         except Exception as e:
@@ -184,21 +222,48 @@ class MainWindow(QMainWindow):
             self.sleep_timer.start(minutes * 60 * 1000)  # Convert minutes to milliseconds
             QMessageBox.information(self, "Sleep Timer", f"Sleep timer set for {minutes} minutes.")
 
+    @asyncSlot()
     async def toggle_offline_mode(self) -> None:
         await self.music_player.toggle_offline_mode()
+        self.search_pipeline.clear_cache()
         mode = "Offline" if self.music_player.offline_mode else "Online"
         self.offline_mode_button.setIcon(QIcon(f"assets/offline_{'on' if self.music_player.offline_mode else 'off'}_icon.png"))
         QMessageBox.information(self, "Mode Changed", f"Switched to {mode} mode.")
 
+    @asyncSlot()
+    async def add_library_folder(self) -> None:
+        folder = QFileDialog.getExistingDirectory(self, "Add Music Folder")
+        if not folder:
+            return
+        self.now_playing.setText(f"Scanning {folder}...")
+        try:
+            summary = await self.music_player.add_library_folder(folder)
+        except Exception as e:
+            QMessageBox.warning(self, "Warning", f"Could not scan folder: {str(e)}")
+            return
+        self.search_pipeline.clear_cache()
+        await self.service.refresh_recommendations()
+        QMessageBox.information(self, "Library Updated",
+                                f"Added {summary['added']} and updated {summary['updated']} tracks.")
+
+    async def rescan_library(self) -> None:
+        try:
+            summary = await self.music_player.scan_library()
+        except Exception as e:
+            print(f"Error rescanning library: {e}")
+            return
+        if summary['added'] or summary['updated'] or summary['removed']:
+            self.search_pipeline.clear_cache()
+            await self.service.refresh_recommendations()
+
     async def update_recommendations(self) -> None:
         try:
             recommendations = await self.recommendation_engine.get_recommendations(self.music_player.get_play_history())
-            self.recommendations.clear()
-            for recommendation in recommendations:
-                self.recommendations.addItem(recommendation['title'])
+            self.recommendations_model.set_items(recommendations)
         except Exception as e:
             QMessageBox.warning(self, "Warning", f"Could not update recommendations: {str(e)}")
 
+    @asyncSlot()
     async def toggle_play_pause(self) -> None:
         if await self.music_player.is_playing():
             await self.music_player.pause()
@@ -207,27 +272,68 @@ class MainWindow(QMainWindow):
             await self.music_player.play()
             self.play_button.setIcon(QIcon("assets/pause_icon.png"))
 
-    async def update_progress_bar(self) -> None:
-        if await self.music_player.is_playing():
-            progress = int(await self.music_player.get_position() * 100)
-            self.update_progress.emit(progress)
+    # Qt calls slots synchronously; these run the player's coroutines as tasks on the qasync loop
+    @asyncSlot()
+    async def next_track(self) -> None:
+        await self.music_player.next_track()
+
+    @asyncSlot()
+    async def previous_track(self) -> None:
+        await self.music_player.previous_track()
+
+    @asyncSlot(int)
+    async def set_volume(self, volume: int) -> None:
+        await self.music_player.set_volume(volume)
+
+    @asyncSlot()
+    async def stop_playback(self) -> None:
+        await self.music_player.stop()
+
+    def show_download_progress(self, track_id: str, downloaded: int, total) -> None:
+        if total:
+            self.update_progress.emit(int(downloaded * 100 / total))
+
+    def update_progress_bar(self, position: float) -> None:
+        self.update_progress.emit(int(position * 100))
+
+    def update_play_state(self, state: str) -> None:
+        icon = "assets/pause_icon.png" if state == PLAYING else "assets/play_icon.png"
+        self.play_button.setIcon(QIcon(icon))
+
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+        self.music_player.playback.set_ui_active(True)
+
+    def hideEvent(self, event) -> None:
+        # Hidden to the tray: stop repainting progress until the window comes back
+        self.music_player.playback.set_ui_active(False)
+        super().hideEvent(event)
+
+    async def show_pages(self, fetch_page) -> None:
+        # Only the first page is fetched up front; the model asks for more as the list scrolls
+        limit = self.playlist_model.batch_size
+        try:
+            tracks = await fetch_page(0, limit)
+        except Exception as e:
+            QMessageBox.warning(self, "Warning", f"Could not load tracks: {str(e)}")
+            return
+        self.playlist_model.set_items(tracks, fetch_page=fetch_page if len(tracks) >= limit else None)
 
+    @asyncSlot(QTreeWidgetItem, int)
     async def handle_tree_item_click(self, item, column) -> None:
         self.content_label.setText(item.text(column))
-        self.playlist.clear()
+        self.playlist_model.clear()
         if item.text(column) == "Home":
-            tracks = await sample_api.get_top_tracks()
-            for track in tracks:
-                self.playlist.addItem(track['title'])
+            tracks = await cached_api.get_top_tracks()
+            self.playlist_model.set_items(tracks)
         elif item.text(column) == "Browse":
-            genres = await sample_api.get_genres()
-            for genre in genres:
-                self.playlist.addItem(genre)
+            genres = await cached_api.get_genres()
+            self.playlist_model.set_labels(genres, 'genre')
         elif item.text(column) == "Radio":
-            stations = await sample_api.get_radio_stations()
-            for station in stations:
-                self.playlist.addItem(station['name'])
+            stations = await cached_api.get_radio_stations()
+            self.playlist_model.set_items(stations, 'station', 'name')
         elif item.text(column) == "Playlists":
-            playlists = await sample_api.get_user_playlists()
-            for playlist in playlists:
-                self.playlist.addItem(playlist['name'])
\ No newline at end of file
+            playlists = await cached_api.get_user_playlists()
+            self.playlist_model.set_items(playlists, 'playlist', 'name')
+        elif item.text(column) == "Local Files":
+            self.playlist_model.set_items(list(self.music_player.local_tracks.values()))
\ No newline at end of file
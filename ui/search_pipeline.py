@@ -0,0 +1,78 @@
+import asyncio
+from typing import Awaitable, Callable, List, Dict, Optional
+from utils.cache import TTLCache, MISSING
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+class SearchPipeline:
+    def __init__(self,
+                 search: Callable[[str], Awaitable[List[Dict]]],
+                 recommend: Callable[[], Awaitable[None]],
+                 on_results: Callable[[List[Dict]], None],
+                 on_error: Callable[[Exception], None],
+                 debounce: float = 0.3, cache_ttl: float = 300.0, cache_size: int = 256):
+        self.search = search
+        self.recommend = recommend
+        self.on_results = on_results
+        self.on_error = on_error
+        self.debounce = debounce
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._task: Optional[asyncio.Task] = None
+        self._pending_query: Optional[str] = None
+
+    def clear_cache(self) -> None:
+        self.cache.clear()
+
+    def cancel(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._pending_query = None
+
+    def submit(self, query: str) -> Optional[asyncio.Task]:
+        key = normalize_query(query)
+        if not key:
+            self.cancel()
+            return None
+        if key == self._pending_query and self._task and not self._task.done():
+            return self._task
+
+        self.cancel()
+        cached = self.cache.get(key, MISSING)
+        if cached is not MISSING:
+            # Cache hits render synchronously; only the recommendations go back to the loop
+            self.on_results(cached)
+            self._task = asyncio.create_task(self._refresh_recommendations())
+            return self._task
+
+        self._pending_query = key
+        self._task = asyncio.create_task(self._run(key))
+        return self._task
+
+    async def _refresh_recommendations(self) -> None:
+        try:
+            await self.recommend()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.on_error(e)
+
+    async def _run(self, key: str) -> None:
+        recommendations = None
+        try:
+            await asyncio.sleep(self.debounce)
+            recommendations = asyncio.create_task(self._refresh_recommendations())
+            results = await self.search(key)
+            self.cache.set(key, results)
+            self.on_results(results)
+            await recommendations
+        except asyncio.CancelledError:
+            if recommendations is not None:
+                recommendations.cancel()
+            raise
+        except Exception as e:
+            self.on_error(e)
+        finally:
+            if self._pending_query == key:
+                self._pending_query = None
@@ -0,0 +1,98 @@
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+
+ItemIdRole = Qt.ItemDataRole.UserRole + 1
+ItemKindRole = Qt.ItemDataRole.UserRole + 2
+
+class TrackListModel(QAbstractListModel):
+    def __init__(self, batch_size: int = 200, parent=None):
+        super().__init__(parent)
+        self.batch_size = batch_size
+        self.kind = 'track'
+        self.label_key = 'title'
+        # A private copy of the caller's list (appends must not leak back into cached API results);
+        # rows are exposed batch by batch via fetchMore
+        self._items: List[Dict] = []
+        self._loaded = 0
+        # Optional (offset, limit) -> page coroutine for lists served by the API a page at a time
+        self._fetch_page: Optional[Callable[[int, int], Awaitable[List[Dict]]]] = None
+        self._fetching: Optional[asyncio.Task] = None
+
+    def set_items(self, items: List[Dict], kind: str = 'track', label_key: str = 'title',
+                  fetch_page: Optional[Callable[[int, int], Awaitable[List[Dict]]]] = None) -> None:
+        if self._fetching is not None:
+            self._fetching.cancel()
+            self._fetching = None
+        self.beginResetModel()
+        self._items = list(items)
+        self.kind = kind
+        self.label_key = label_key
+        self._loaded = min(self.batch_size, len(items))
+        self._fetch_page = fetch_page
+        self.endResetModel()
+
+    def set_labels(self, labels: List[str], kind: str) -> None:
+        self.set_items([{'id': label, 'name': label} for label in labels], kind, 'name')
+
+    def append_items(self, items: List[Dict]) -> None:
+        if not items:
+            return
+        fully_loaded = self._loaded == len(self._items)
+        self._items.extend(items)
+        if fully_loaded:
+            count = min(self.batch_size, len(items))
+            self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+            self._loaded += count
+            self.endInsertRows()
+
+    def clear(self) -> None:
+        self.set_items([])
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._loaded
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and (self._loaded < len(self._items) or self._fetch_page is not None)
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        if parent.isValid():
+            return
+        count = min(self.batch_size, len(self._items) - self._loaded)
+        if count <= 0:
+            if self._fetch_page is not None and self._fetching is None:
+                self._fetching = asyncio.ensure_future(self._fetch_more())
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    async def _fetch_more(self) -> None:
+        try:
+            items = await self._fetch_page(len(self._items), self.batch_size)
+        except Exception as e:
+            print(f"Error fetching more items: {e}")
+            items = []
+        finally:
+            if self._fetching is asyncio.current_task():
+                self._fetching = None
+        if len(items) < self.batch_size:
+            self._fetch_page = None  # Short page: the list is exhausted
+        self.append_items(items)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        item = self._items[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return item.get(self.label_key)
+        if role == ItemIdRole:
+            return item.get('id')
+        if role == ItemKindRole:
+            return self.kind
+        return None
+
+    def item_at(self, row: int) -> Optional[Dict]:
+        if 0 <= row < self._loaded:
+            return self._items[row]
+        return None
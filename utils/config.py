@@ -1,33 +1,95 @@
 import json
 import os
 import asyncio
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 class Config:
-    def __init__(self, config_file: str = 'config.json'):
+    def __init__(self, config_file: str = 'config.json', save_delay: float = 0.5,
+                 max_retries: int = 5, max_backoff: float = 30.0):
         self.config_file = config_file
         self.config: Dict[str, Any] = {}
+        self.save_delay = save_delay
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock: Optional[asyncio.Lock] = None
 
     async def load(self) -> None:
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    self.config = json.load(f)
-            else:
-                self.config = {}
+            loop = asyncio.get_running_loop()
+            self.config = await loop.run_in_executor(None, self._read)
         except Exception as e:
             print(f"Error loading config: {e}")
             self.config = {}
 
+    def _read(self) -> Dict[str, Any]:
+        if not os.path.exists(self.config_file):
+            return {}
+        with open(self.config_file, 'r') as f:
+            return json.load(f)
+
     async def save(self) -> None:
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-        except Exception as e:
-            print(f"Error saving config: {e}")
+        # Saves are coalesced: bursts of set()+save() produce one write after save_delay
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        failures = 0
+        delay = self.save_delay
+        while self._dirty:
+            await asyncio.sleep(delay)
+            if await self.flush():
+                failures = 0
+                delay = self.save_delay
+                continue
+            failures += 1
+            if failures > self.max_retries:
+                # Still dirty: the next save() or an explicit flush() tries again
+                print(f"Giving up saving config after {failures} attempts")
+                return
+            # A full or read-only disk won't fix itself in half a second
+            delay = min(self.max_backoff, max(self.save_delay, 0.1) * 2 ** failures)
+
+    async def flush(self) -> bool:
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            if not self._dirty:
+                return True
+            self._dirty = False
+            # Serialize on the loop so the executor never sees the dict mid-mutation
+            data = json.dumps(self.config, separators=(',', ':'))
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write_atomic, data)
+            except Exception as e:
+                self._dirty = True
+                print(f"Error saving config: {e}")
+                return False
+            return True
+
+    def _write_atomic(self, data: str) -> None:
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        tmp_path = f"{self.config_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # rename is atomic, so readers see either the old file or the complete new one
+        os.replace(tmp_path, self.config_file)
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(directory, os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
 
     def get(self, key: str, default: Any = None) -> Any:
         return self.config.get(key, default)
 
     def set(self, key: str, value: Any) -> None:
-        self.config[key] = value
\ No newline at end of file
+        self.config[key] = value
+
+    def delete(self, key: str) -> None:
+        self.config.pop(key, None)
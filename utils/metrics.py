@@ -0,0 +1,194 @@
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+# Seconds: 10us doubling up to ~80s
+LATENCY_BOUNDS = [1e-5 * 2 ** i for i in range(24)]
+# Bytes per second: 1 KiB/s doubling up to ~8 GiB/s
+THROUGHPUT_BOUNDS = [1024.0 * 2 ** i for i in range(24)]
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+class Histogram:
+    # Fixed buckets keep record() O(log buckets) with no allocation, whatever the sample count
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BOUNDS):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> float:
+        # Upper bound of the bucket holding the requested rank, clamped to what was actually seen
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = self.bounds[bucket] if bucket < len(self.bounds) else self.max
+                return min(max(bound, self.min), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+class Metrics:
+    def __init__(self):
+        self.counters: Dict[str, Counter] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        # Components that already keep their own counters are read lazily at snapshot time
+        self.sources: Dict[str, Callable[[], Any]] = {}
+        self.started = time.time()
+
+    def counter(self, name: str) -> Counter:
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = Counter()
+        return counter
+
+    def histogram(self, name: str, bounds: Sequence[float] = LATENCY_BOUNDS) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(bounds)
+        return histogram
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        self.counter(name).inc(amount)
+
+    def observe(self, name: str, value: float) -> None:
+        self.histogram(name).record(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).record(time.perf_counter() - start)
+
+    def add_source(self, name: str, source: Callable[[], Any]) -> None:
+        self.sources[name] = source
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+        self.started = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot: Dict[str, Any] = {
+            'uptime': time.time() - self.started,
+            'counters': {name: counter.value for name, counter in sorted(self.counters.items())},
+            'histograms': {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())},
+        }
+        for name, source in self.sources.items():
+            try:
+                snapshot[name] = source()
+            except Exception as e:
+                snapshot[name] = {'error': str(e)}
+        return snapshot
+
+    def dump(self, path: str, snapshot: Optional[Dict[str, Any]] = None) -> None:
+        # Take the snapshot on the loop thread and pass it in when writing from an executor
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot() if snapshot is None else snapshot, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+class LoopLagMonitor:
+    # A sleep that wakes late means something blocked the event loop for the difference
+    def __init__(self, registry: Metrics, interval: float = 0.25):
+        self.registry = registry
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        histogram = self.registry.histogram('loop.lag')
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            histogram.record(max(0.0, time.perf_counter() - start - self.interval))
+
+class ProfileSampler:
+    # cProfile costs too much to leave on, so profile `duration` out of every `period` seconds
+    def __init__(self, period: float = 10.0, duration: float = 1.0, top: int = 25):
+        self.period = period
+        self.duration = duration
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.windows = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.period - self.duration)
+            self.profile.enable()
+            try:
+                await asyncio.sleep(self.duration)
+            finally:
+                self.profile.disable()
+            self.windows += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        functions: List[Dict[str, Any]] = []
+        if self.windows:
+            stats = pstats.Stats(self.profile)
+            ranked = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)  # Cumulative time
+            for (filename, line, name), (_, calls, own, cumulative, _) in ranked[:self.top]:
+                functions.append({'function': f"{filename}:{line}({name})", 'calls': calls,
+                                  'own': own, 'cumulative': cumulative})
+        return {'windows': self.windows, 'sampled_seconds': self.windows * self.duration, 'top': functions}
+
+metrics = Metrics()
@@ -0,0 +1,185 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS offline_tracks (
+    title TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    artist TEXT,
+    album TEXT,
+    file_path TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    size INTEGER,
+    last_played REAL,
+    play_count INTEGER NOT NULL DEFAULT 0,
+    pinned INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS offline_tracks_id ON offline_tracks (id);
+CREATE TABLE IF NOT EXISTS play_history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    track_id TEXT NOT NULL,
+    title TEXT,
+    event TEXT NOT NULL,
+    played_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS local_tracks (
+    path TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    genre TEXT,
+    duration REAL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS local_tracks_id ON local_tracks (id);
+CREATE INDEX IF NOT EXISTS local_tracks_artist ON local_tracks (artist, album);
+"""
+
+TRACK_COLUMNS = ('title', 'id', 'artist', 'album', 'file_path', 'size')
+# Columns added after the first release, created on open for older databases
+MIGRATED_COLUMNS = {
+    'size': "INTEGER",
+    'last_played': "REAL",
+    'play_count': "INTEGER NOT NULL DEFAULT 0",
+    'pinned': "INTEGER NOT NULL DEFAULT 0",
+}
+# Re-downloading a track refreshes its file but keeps its play statistics and pin
+UPSERT_TRACK = (
+    "INSERT INTO offline_tracks (title, id, artist, album, file_path, size, added_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (title) DO UPDATE SET id = excluded.id, artist = excluded.artist, album = excluded.album, "
+    "file_path = excluded.file_path, size = excluded.size, added_at = excluded.added_at"
+)
+LOCAL_COLUMNS = ('file_path', 'id', 'title', 'artist', 'album', 'genre', 'duration')
+
+class OfflineStore:
+    def __init__(self, path: str = 'library.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        # Shared with executor threads; every access goes through self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL only fsyncs at checkpoints, so each append is a cheap sequential write
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(offline_tracks)")}
+        for column, definition in MIGRATED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE offline_tracks ADD COLUMN {column} {definition}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def put_track(self, track: Dict) -> None:
+        with self._lock:
+            self._conn.execute(UPSERT_TRACK, (*(track.get(column) for column in TRACK_COLUMNS), time.time()))
+
+    def put_tracks(self, tracks: Iterable[Dict]) -> None:
+        rows = [(*(track.get(column) for column in TRACK_COLUMNS), time.time()) for track in tracks]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(UPSERT_TRACK, rows)
+            self._conn.execute("COMMIT")
+
+    def remove_track(self, title: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM offline_tracks WHERE title = ?", (title,))
+
+    def get_track(self, title: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, id, artist, album, file_path, size FROM offline_tracks WHERE title = ?",
+                (title,)).fetchone()
+        return dict(zip(TRACK_COLUMNS, row)) if row else None
+
+    def load_tracks(self) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT title, id, artist, album, file_path, size FROM offline_tracks").fetchall()
+        return {row[0]: dict(zip(TRACK_COLUMNS, row)) for row in rows}
+
+    def load_usage(self) -> List[Tuple[str, str, Optional[int], int, bool]]:
+        # (title, file_path, size, play_count, pinned), least recently played first
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, file_path, size, play_count, pinned FROM offline_tracks "
+                "ORDER BY COALESCE(last_played, added_at)").fetchall()
+        return [(title, file_path, size, play_count, bool(pinned))
+                for title, file_path, size, play_count, pinned in rows]
+
+    def record_offline_play(self, title: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE offline_tracks SET last_played = ?, play_count = play_count + 1 WHERE title = ?",
+                (time.time(), title))
+
+    def set_pinned(self, title: str, pinned: bool) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE offline_tracks SET pinned = ? WHERE title = ?", (int(pinned), title))
+
+    def set_sizes(self, sizes: Dict[str, int]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE offline_tracks SET size = ? WHERE title = ?",
+                                   [(size, title) for title, size in sizes.items()])
+            self._conn.execute("COMMIT")
+
+    def remove_tracks(self, titles: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM offline_tracks WHERE title = ?", ((title,) for title in titles))
+            self._conn.execute("COMMIT")
+
+    def count_tracks(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM offline_tracks").fetchone()[0]
+
+    def append_play(self, track: Dict, event: str = 'play') -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO play_history (track_id, title, event, played_at) VALUES (?, ?, ?, ?)",
+                (track['id'], track.get('title'), event, time.time()))
+
+    def recent_plays(self, limit: int = 200) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT track_id, title FROM play_history WHERE event != 'skip' ORDER BY seq DESC LIMIT ?",
+                (limit,)).fetchall()
+        return [{'id': track_id, 'title': title} for track_id, title in reversed(rows)]
+
+    def put_local_tracks(self, tracks: Iterable[Dict]) -> None:
+        rows = [(*(track.get(column) for column in LOCAL_COLUMNS), track['mtime'], track['size']) for track in tracks]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO local_tracks (path, id, title, artist, album, genre, duration, mtime, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def remove_local_tracks(self, paths: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM local_tracks WHERE path = ?", ((path,) for path in paths))
+            self._conn.execute("COMMIT")
+
+    def local_file_state(self) -> Dict[str, Tuple[float, int, str]]:
+        # Just what a rescan needs to decide whether a file changed: path -> (mtime, size, id)
+        with self._lock:
+            rows = self._conn.execute("SELECT path, mtime, size, id FROM local_tracks").fetchall()
+        return {path: (mtime, size, track_id) for path, mtime, size, track_id in rows}
+
+    def load_local_tracks(self) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, id, title, artist, album, genre, duration FROM local_tracks").fetchall()
+        return {row[1]: dict(zip(LOCAL_COLUMNS, row)) for row in rows}
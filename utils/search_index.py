@@ -0,0 +1,189 @@
+import re
+import heapq
+from bisect import bisect_left
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+
+DEFAULT_FIELDS = {'title': 3.0, 'artist': 2.0, 'album': 1.0}
+MAX_COMBINATIONS = 4096  # Score-level combinations walked before falling back to scoring each candidate
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+class SearchIndex:
+    def __init__(self, fields: Optional[Dict[str, float]] = None):
+        self.fields = dict(fields or DEFAULT_FIELDS)
+        self._keys: Dict[int, Hashable] = {}
+        self._doc_ids: Dict[Hashable, int] = {}
+        self._doc_tokens: Dict[int, Dict[str, float]] = {}
+        # Token -> field weight -> docs, so a term's score levels come straight from set unions
+        self._postings: Dict[str, Dict[float, Set[int]]] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._next_doc = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._doc_ids
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._doc_ids.clear()
+        self._doc_tokens.clear()
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._vocabulary_dirty = False
+        self._next_doc = 0
+
+    def add(self, key: Hashable, track: Dict) -> None:
+        if key in self._doc_ids:
+            self.remove(key)
+        doc = self._next_doc
+        self._next_doc += 1
+        # Each token keeps the weight of the strongest field it appeared in
+        weights: Dict[str, float] = {}
+        for field, weight in self.fields.items():
+            for token in tokenize(str(track.get(field) or '')):
+                if weights.get(token, 0.0) < weight:
+                    weights[token] = weight
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._vocabulary.append(token)
+                self._vocabulary_dirty = True
+            postings.setdefault(weight, set()).add(doc)
+        self._keys[doc] = key
+        self._doc_ids[key] = doc
+        self._doc_tokens[doc] = weights
+
+    def add_many(self, items: Iterable[Tuple[Hashable, Dict]]) -> None:
+        for key, track in items:
+            self.add(key, track)
+
+    def remove(self, key: Hashable) -> None:
+        doc = self._doc_ids.pop(key, None)
+        if doc is None:
+            return
+        del self._keys[doc]
+        for token, weight in self._doc_tokens.pop(doc).items():
+            postings = self._postings[token]
+            docs = postings[weight]
+            docs.discard(doc)
+            if not docs:
+                del postings[weight]
+            if not postings:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+
+    def _refresh_vocabulary(self) -> None:
+        # New tokens are appended unsorted and dead ones left behind; one sort per
+        # batch of changes keeps add() O(1) while prefix lookups can still bisect
+        self._vocabulary = sorted(token for token in self._vocabulary if token in self._postings)
+        self._vocabulary_dirty = False
+
+    def _expand(self, term: str) -> List[str]:
+        if self._vocabulary_dirty:
+            self._refresh_vocabulary()
+        start = end = bisect_left(self._vocabulary, term)
+        while end < len(self._vocabulary) and self._vocabulary[end].startswith(term):
+            end += 1
+        return self._vocabulary[start:end]
+
+    def _levels(self, term: str) -> List[Tuple[float, Set[int]]]:
+        # Every doc matching the term, grouped by what the term adds to its score (best level first).
+        # A whole-word match counts double and beats any prefix match; otherwise the strongest field wins
+        levels: Dict[float, List[Set[int]]] = {}
+        prefix: Dict[float, List[Set[int]]] = {}
+        for token in self._expand(term):
+            for weight, docs in self._postings[token].items():
+                if token == term:
+                    levels.setdefault(weight * 2, []).append(docs)
+                else:
+                    prefix.setdefault(weight, []).append(docs)
+        weights = sorted(prefix, reverse=True)
+        seen = set().union(*(docs for sets in levels.values() for docs in sets)) if weights else set()
+        for position, weight in enumerate(weights):
+            docs = _union(prefix[weight])
+            if seen:
+                docs = docs - seen
+            if docs:
+                levels.setdefault(weight, []).append(docs)
+                if position + 1 < len(weights):
+                    seen = seen | docs
+        return sorted(((score, _union(sets)) for score, sets in levels.items()), key=lambda level: level[0], reverse=True)
+
+    def search(self, query: str, limit: int = 10) -> List[Hashable]:
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+        by_term = {term: self._levels(term) for term in set(terms)}
+        levels = [by_term[term] for term in terms]
+        if not all(levels):
+            return []
+        # Intersect smallest-first so the work is bounded by the rarest term
+        matches = sorted((_union([docs for _, docs in term_levels]) for term_levels in levels), key=len)
+        candidates = matches[0]
+        for other in matches[1:]:
+            candidates = candidates & other
+            if not candidates:
+                return []
+
+        combinations = 1
+        for term_levels in levels:
+            combinations *= len(term_levels)
+        if len(candidates) <= limit * 64 or combinations > MAX_COMBINATIONS:
+            ranked = heapq.nlargest(limit, candidates, key=lambda doc: (_doc_score(doc, levels), -doc))
+        else:
+            ranked = _rank_by_levels(levels, limit, self._next_doc)
+        return [self._keys[doc] for doc in ranked]
+
+def _union(sets: List[Set[int]]) -> Set[int]:
+    # A lone set is returned as is; callers never mutate the result
+    return sets[0] if len(sets) == 1 else set().union(*sets)
+
+def _doc_score(doc: int, levels: List[List[Tuple[float, Set[int]]]]) -> float:
+    return sum(next(score for score, docs in term_levels if doc in docs) for term_levels in levels)
+
+def _smallest(docs: Set[int], count: int, bound: int) -> List[int]:
+    # Doc numbers only grow, so in a dense set the smallest are found faster by counting up
+    if count * bound < len(docs) * len(docs) // 8:
+        found: List[int] = []
+        for doc in range(min(bound, len(docs) // 4)):
+            if doc in docs:
+                found.append(doc)
+                if len(found) == count:
+                    return found
+    return heapq.nsmallest(count, docs)
+
+def _rank_by_levels(levels: List[List[Tuple[float, Set[int]]]], limit: int, bound: int) -> List[int]:
+    # Broad queries: walk combinations of per-term score levels best-first, so only the docs in the
+    # winning groups are looked at individually. Within a score, earlier-indexed docs come first
+    def total(combination: Tuple[int, ...]) -> float:
+        return round(sum(term_levels[i][0] for term_levels, i in zip(levels, combination)), 9)
+
+    start = (0,) * len(levels)
+    heap = [(-total(start), start)]
+    queued = {start}
+    ranked: List[int] = []
+    while heap and len(ranked) < limit:
+        score = heap[0][0]
+        group: List[Set[int]] = []
+        while heap and heap[0][0] == score:
+            _, combination = heapq.heappop(heap)
+            sets = sorted((term_levels[i][1] for term_levels, i in zip(levels, combination)), key=len)
+            docs = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+            if docs:
+                group.append(docs)
+            for position in range(len(combination)):
+                if combination[position] + 1 < len(levels[position]):
+                    following = combination[:position] + (combination[position] + 1,) + combination[position + 1:]
+                    if following not in queued:
+                        queued.add(following)
+                        heapq.heappush(heap, (-total(following), following))
+        if group:
+            ranked.extend(_smallest(_union(group), limit - len(ranked), bound))
+    return ranked
@@ -0,0 +1,37 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+class StartupProfiler:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float, float]] = []  # (name, start offset, duration)
+        self.marks: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start - self.started, time.perf_counter() - start))
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = time.perf_counter() - self.started
+
+    def report(self) -> str:
+        lines = [f"{'phase':<32} {'start (ms)':>11} {'took (ms)':>10}"]
+        for name, start, duration in sorted(self.phases, key=lambda phase: phase[1]):
+            lines.append(f"{name:<32} {start * 1e3:>11.1f} {duration * 1e3:>10.1f}")
+        for name, offset in sorted(self.marks.items(), key=lambda mark: mark[1]):
+            lines.append(f"{name:<32} {offset * 1e3:>11.1f}")
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'phases': {name: duration for name, _, duration in self.phases},
+            'marks': self.marks,
+        })
+
+startup_profiler = StartupProfiler()